@@ -0,0 +1,120 @@
+"""
+Latency benchmark of `find_entity_paths` on a synthetic graph of persons, organizations and events.
+
+Edges are drawn with a preferential-attachment bias so the graph has hubs, like real OSINT data.
+
+Usage:
+    docker compose up -d
+    python benchmarks/bench_entity_paths.py --edges 1000000
+"""
+
+import argparse
+import random
+import time
+
+from common import measure, report, setup_clients
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_tools.entity_paths import find_entity_paths
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE, relation_weight
+
+# (relation name, from collection, to collection)
+RELATIONS = [
+    ("involves", EntityNameConstant.EVENT, EntityNameConstant.PERSON),
+    ("involves", EntityNameConstant.EVENT, EntityNameConstant.ORGANIZATION),
+    ("follows", EntityNameConstant.EVENT, EntityNameConstant.EVENT),
+    ("member", EntityNameConstant.PERSON, EntityNameConstant.ORGANIZATION),
+]
+
+
+def load_graph(vertices: int, edges: int, batch_size: int, rng: random.Random) -> dict:
+    client = ArangoDBClient()
+    ids = {}
+    for name in (EntityNameConstant.EVENT, EntityNameConstant.PERSON, EntityNameConstant.ORGANIZATION):
+        count = vertices if name == EntityNameConstant.EVENT else vertices // 2
+        collection = client.get_collection(name)
+        docs = [{"_key": str(i), "name": f"{name} {i}", "owner": "bench"} for i in range(count)]
+        for offset in range(0, count, batch_size):
+            collection.import_bulk(docs[offset : offset + batch_size])
+        ids[name] = [f"{name}/{i}" for i in range(count)]
+
+    start = time.perf_counter()
+    per_relation = edges // len(RELATIONS)
+    for name, from_coll, to_coll in RELATIONS:
+        collection = client.get_edge_collection(name, from_coll, to_coll)
+        # Endpoints repeat the ids of earlier edges, which yields a heavy-tailed degree distribution
+        recent = []
+        batch = []
+        for _ in range(per_relation):
+            to_id = rng.choice(recent) if recent and rng.random() < 0.5 else rng.choice(ids[to_coll])
+            recent.append(to_id)
+            confidence = rng.randrange(0, 101)
+            batch.append(
+                {
+                    "_from": rng.choice(ids[from_coll]),
+                    "_to": to_id,
+                    "name": name,
+                    "confidence": confidence,
+                    WEIGHT_ATTRIBUTE: relation_weight(confidence),
+                }
+            )
+            if len(batch) >= batch_size:
+                collection.import_bulk(batch)
+                batch = []
+        if batch:
+            collection.import_bulk(batch)
+    print(f"Loaded {per_relation * len(RELATIONS)} edges in {time.perf_counter() - start:.1f}s")
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=200_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--time-budget-ms", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    setup_clients("bench_entity_paths")
+    OsintDataAccessLayer().init()
+    ids = load_graph(args.vertices, args.edges, args.batch_size, rng)
+
+    pairs = [
+        (rng.choice(ids[EntityNameConstant.PERSON]), rng.choice(ids[EntityNameConstant.EVENT]))
+        for _ in range(args.queries)
+    ]
+    scenarios = {
+        "shortest": {"k": 1},
+        "5 shortest": {"k": 5},
+        "weighted shortest": {"k": 1, "weighted": True},
+        "weighted 5 shortest": {"k": 5, "weighted": True},
+    }
+
+    rows = []
+    for scenario, options in scenarios.items():
+        found = timeouts = 0
+
+        def run(pair):
+            nonlocal found, timeouts
+            try:
+                paths = find_entity_paths(
+                    *pair, max_depth=args.max_depth, time_budget_ms=args.time_budget_ms, **options
+                )
+                found += bool(paths)
+            except TimeoutError:
+                timeouts += 1
+
+        it = iter(pairs)
+        timing = measure(lambda: run(next(it)), len(pairs))
+        rows.append({"scenario": scenario, "connected": found, "timeouts": timeouts, **timing})
+
+    report(f"find_entity_paths over {args.edges} edges, max depth {args.max_depth}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Memory and latency benchmark of the in-memory `GraphIndex` on a synthetic relation graph.
+
+Relations are added in-process with `add_edge` and merged into the CSR arrays, so no ArangoDB is needed. Endpoints
+are drawn with a preferential-attachment bias, like `bench_entity_paths.py`, so the graph has hubs.
+
+Usage:
+    python benchmarks/bench_graph_index.py --vertices 1000000 --relations 1000000
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from common import measure, report
+
+from omni_python_library.graph import GraphIndex
+from omni_python_library.utils.singleton import Singleton
+
+COLLECTION = "person_knows_person"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=1_000_000)
+    parser.add_argument("--relations", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    Singleton._instances = {}
+    index = GraphIndex()
+    index.init(collections=[COLLECTION])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    recent = []
+    for i in range(args.relations):
+        to_id = rng.choice(recent) if recent and rng.random() < 0.5 else f"person/{rng.randrange(args.vertices)}"
+        recent.append(to_id)
+        index.add_edge(f"{COLLECTION}/{i}", f"person/{rng.randrange(args.vertices)}", to_id)
+    index.compact()
+    seconds = time.perf_counter() - start
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    vertices = len(index._vertex_ids)
+    print(f"Indexed {args.relations} relations between {vertices} vertices in {seconds:.1f}s")
+    print(f"memory_usage(): {index.memory_usage() / 1e6:.0f} MB, traced allocations: {traced / 1e6:.0f} MB")
+
+    starts = [index._vertex_ids[rng.randrange(vertices)] for _ in range(args.queries)]
+    rows = []
+    for name, lookup in (
+        ("1-hop neighbors", index.neighbors),
+        ("2-hop neighborhood", lambda vertex_id: index.neighborhood(vertex_id, depth=2)),
+    ):
+        it = iter(starts)
+        rows.append({"lookup": name, **measure(lambda: lookup(next(it)), len(starts))})
+    report(f"GraphIndex over {args.relations} relations", rows)
+
+
+if __name__ == "__main__":
+    main()
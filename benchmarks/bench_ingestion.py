@@ -0,0 +1,108 @@
+"""
+Throughput benchmark of the write paths on a firehose of events, each reported by its own source.
+
+Compares one `create_*` call per document, a unit of work per batch, and `ingest`, which does not read the
+written documents back nor populate the cache. Embeddings are random vectors generated locally, standing
+in for the embedding service so that only the write path is measured, with realistic document sizes.
+
+Usage:
+    docker compose up -d
+    python benchmarks/bench_ingestion.py --records 20000
+"""
+
+import argparse
+import random
+import time
+
+from common import random_unit_vector, report, setup_clients
+
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.osint import EventMainData, RelationMainData, SourceMainData
+
+
+def fake_embeddings(dal: OsintDataAccessLayer, dimension: int, rng: random.Random) -> None:
+    vectors = [random_unit_vector(dimension, rng) for _ in range(64)]
+    dal.generate_embedding = lambda text: rng.choice(vectors) if text else None
+    dal.generate_embeddings = lambda texts: [rng.choice(vectors) if text else None for text in texts]
+
+
+def records(mode: str, count: int):
+    for i in range(count):
+        event = EventMainData(title=f"{mode} event {i}", description="Protest in the city center", type="protest")
+        source = SourceMainData(url=f"https://example.com/{mode}/{i}", name=f"{mode} source {i}")
+        yield event, source
+
+
+def create_each(dal: OsintDataAccessLayer, count: int, batch_size: int) -> None:
+    for event_data, source_data in records("create", count):
+        event = dal.create_event(event_data, owner="bench")
+        source = dal.create_source(source_data, owner="bench")
+        dal.create_relation(RelationMainData(name="reported_by", from_id=event.id, to_id=source.id), owner="bench")
+
+
+def unit_of_work(dal: OsintDataAccessLayer, count: int, batch_size: int) -> None:
+    batch = list(records("unit", count))
+    for offset in range(0, count, batch_size):
+        with dal.unit_of_work() as unit:
+            for event_data, source_data in batch[offset : offset + batch_size]:
+                event = unit.create_event(event_data, owner="bench")
+                source = unit.create_source(source_data, owner="bench")
+                unit.create_relation(
+                    RelationMainData(name="reported_by", from_id=event.id, to_id=source.id), owner="bench"
+                )
+
+
+def check_written(handles: list) -> list:
+    """
+    Fails the run when `ingest` rejected documents, which would otherwise be left out of the measured throughput.
+    """
+    failed = sum(handle is None for handle in handles)
+    if failed:
+        raise SystemExit(f"ingest failed to write {failed} of {len(handles)} documents, see the error log")
+    return handles
+
+
+def ingest(dal: OsintDataAccessLayer, count: int, batch_size: int) -> None:
+    batch = list(records("ingest", count))
+    for offset in range(0, count, batch_size):
+        chunk = batch[offset : offset + batch_size]
+        handles = check_written(
+            dal.ingest([data for pair in chunk for data in pair], owner="bench", batch_size=2 * batch_size)
+        )
+        relations = [
+            RelationMainData(name="reported_by", from_id=event.id, to_id=source.id)
+            for event, source in zip(handles[::2], handles[1::2])
+        ]
+        check_written(dal.ingest(relations, owner="bench", batch_size=batch_size))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--create-records", type=int, default=2_000, help="Records written one call at a time")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--embedding-dimension", type=int, default=1536)
+    args = parser.parse_args()
+
+    setup_clients("bench_ingestion", embedding_dimension=args.embedding_dimension)
+    dal = OsintDataAccessLayer()
+    dal.init()
+    fake_embeddings(dal, args.embedding_dimension, random.Random(42))
+
+    rows = []
+    for name, write, count in (
+        ("create_* per document", create_each, args.create_records),
+        ("unit of work", unit_of_work, args.records),
+        ("ingest", ingest, args.records),
+    ):
+        start = time.perf_counter()
+        write(dal, count, args.batch_size)
+        seconds = time.perf_counter() - start
+        # Each record is an event, a source and a relation
+        rows.append({"write path": name, "documents": 3 * count, "docs_per_s": 3 * count / seconds})
+
+    report(f"Ingestion of events with sources, {args.embedding_dimension}-dimension embeddings", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of the relations join in `search_events` when the selected events include high-degree hubs.
+
+Compares the previous per-event graph traversal with the edge-index lookup.
+
+Usage:
+    docker compose up -d
+    python benchmarks/bench_relation_join.py --hubs 5 --hub-degree 20000
+"""
+
+import argparse
+import random
+
+from common import measure, report, setup_clients
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_tools.event_search import search_events
+from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
+
+TRAVERSAL_QUERY = f"""
+LET events = (
+    FOR doc IN {EntityNameConstant.EVENT}
+        FILTER doc.location.country_code == @country_code
+        LIMIT @limit
+        RETURN doc
+)
+LET event_ids = events[*]._id
+LET relations = (
+    FOR event IN events
+        FOR v, e IN 1..1 ANY event GRAPH '{ArangoDBConstant.EVENT_GRAPH}'
+        FILTER e._from IN event_ids AND e._to IN event_ids
+        RETURN DISTINCT e
+)
+FOR result IN APPEND(events, relations)
+    RETURN result
+"""
+
+
+def load_graph(selected: int, hubs: int, hub_degree: int, local_edges: int, rng: random.Random) -> None:
+    events = ArangoDBClient().get_collection(EntityNameConstant.EVENT)
+    edges = ArangoDBClient().get_edge_collection("link", EntityNameConstant.EVENT, EntityNameConstant.EVENT)
+
+    selected_ids = []
+    for i in range(selected):
+        meta = events.insert({"title": f"Selected {i}", "location": {"country_code": "US"}, "owner": "bench"})
+        selected_ids.append(meta["_id"])
+
+    leaves = [{"_key": f"leaf{i}", "title": f"Leaf {i}", "location": {"country_code": "ZZ"}} for i in range(hub_degree)]
+    for offset in range(0, len(leaves), 10_000):
+        events.import_bulk(leaves[offset : offset + 10_000])
+
+    batch = []
+    for hub in selected_ids[:hubs]:
+        for i in range(hub_degree):
+            batch.append({"_from": hub, "_to": f"{EntityNameConstant.EVENT}/leaf{i}", "name": "link"})
+            if len(batch) >= 10_000:
+                edges.import_bulk(batch)
+                batch = []
+    for _ in range(local_edges):
+        a, b = rng.sample(selected_ids, 2)
+        batch.append({"_from": a, "_to": b, "name": "link"})
+    edges.import_bulk(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--selected", type=int, default=200)
+    parser.add_argument("--hubs", type=int, default=5)
+    parser.add_argument("--hub-degree", type=int, default=20_000)
+    parser.add_argument("--local-edges", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_clients("bench_relation_join")
+    OsintDataAccessLayer().init()
+    load_graph(args.selected, args.hubs, args.hub_degree, args.local_edges, random.Random(42))
+
+    bind_vars = {"country_code": "US", "limit": args.selected}
+    traversal = list(ArangoDBClient().db.aql.execute(TRAVERSAL_QUERY, bind_vars=bind_vars))
+    lookup = search_events(country_code="US", limit=args.selected, relation_limit=args.local_edges * 2)
+    assert len(traversal) == len(lookup), (len(traversal), len(lookup))
+
+    rows = [
+        {
+            "join": "traversal",
+            **measure(lambda: list(ArangoDBClient().db.aql.execute(TRAVERSAL_QUERY, bind_vars=bind_vars)), args.repeat),
+        },
+        {
+            "join": "edge index",
+            **measure(
+                lambda: search_events(country_code="US", limit=args.selected, relation_limit=args.local_edges * 2),
+                args.repeat,
+            ),
+        },
+        {
+            "join": "none",
+            **measure(
+                lambda: search_events(country_code="US", limit=args.selected, include_relations=False), args.repeat
+            ),
+        },
+    ]
+    report(f"{args.selected} events, {args.hubs} hubs with {args.hub_degree} edges each", rows)
+
+
+if __name__ == "__main__":
+    main()
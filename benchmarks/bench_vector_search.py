@@ -0,0 +1,128 @@
+"""
+Recall / latency benchmark of `search_events` exact versus vector-index search.
+
+Usage:
+    docker compose up -d
+    python benchmarks/bench_vector_search.py --events 1000000
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from common import measure, random_unit_vector, report, setup_clients
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_tools.event_search import search_events
+from omni_python_library.utils.config_registry import EntityNameConstant
+
+COUNTRIES = ["US", "UK", "FR", "DE", "CN", "JP", "IN", "BR", "RU", "UA", "IL", "IR", "TR", "EG", "NG", "ZA"]
+
+
+def load_corpus(events: int, dimension: int, clusters: int, batch_size: int, rng: random.Random) -> None:
+    centers = [random_unit_vector(dimension, rng) for _ in range(clusters)]
+    collection = ArangoDBClient().get_collection(EntityNameConstant.EVENT)
+
+    start = time.perf_counter()
+    for offset in range(0, events, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, events)):
+            center = centers[rng.randrange(clusters)]
+            embedding = [c + rng.gauss(0.0, 0.1) for c in center]
+            batch.append(
+                {
+                    "title": f"Event {i}",
+                    "happened_at": rng.randrange(0, 10_000_000),
+                    "location": {"country_code": rng.choice(COUNTRIES)},
+                    "embedding": embedding,
+                    "owner": "bench",
+                }
+            )
+        collection.import_bulk(batch)
+    print(f"Loaded {events} events in {time.perf_counter() - start:.1f}s")
+
+
+class FallbackCounter(logging.Handler):
+    """
+    Counts the approximate searches that fell back to an exact scan because no vector index applied.
+    """
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.getMessage().startswith("No vector index for approximate search"):
+            self.count += 1
+
+
+def event_ids(results) -> list:
+    return [r.id for r in results if r.id and r.id.startswith(f"{EntityNameConstant.EVENT}/")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    setup_clients("bench_vector_search", embedding_dimension=args.dimension)
+    OsintDataAccessLayer().init()
+    load_corpus(args.events, args.dimension, args.clusters, args.batch_size, rng)
+
+    start = time.perf_counter()
+    n_lists = max(1, int(args.events**0.5))
+    if not ArangoDBClient().init_vector_index(
+        EntityNameConstant.EVENT, n_lists=n_lists, stored_values=["happened_at", "location.country_code"]
+    ):
+        raise SystemExit("The vector index was not created, the approximate rows would time the exact scan")
+    print(f"Trained vector index with {n_lists} lists in {time.perf_counter() - start:.1f}s")
+    fallbacks = FallbackCounter()
+    logging.getLogger("omni_python_library.dal.query_tools.event_search").addHandler(fallbacks)
+
+    queries = [random_unit_vector(args.dimension, rng) for _ in range(args.queries)]
+    scenarios = {
+        "unfiltered": {},
+        "country+range": {"country_code": "US", "date_range": (0, 5_000_000)},
+    }
+
+    rows = []
+    for scenario, filters in scenarios.items():
+        exact = [
+            set(event_ids(search_events(vector=q, limit=args.top_k, exact_threshold=args.events, **filters)))
+            for q in queries
+        ]
+        it = iter(queries)
+        timing = measure(
+            lambda: search_events(vector=next(it), limit=args.top_k, exact_threshold=args.events, **filters),
+            len(queries),
+        )
+        rows.append({"scenario": scenario, "mode": "exact", "n_probe": "-", "recall": 1.0, **timing})
+
+        for n_probe in (1, 4, 16, 64):
+            found = [
+                set(event_ids(search_events(vector=q, limit=args.top_k, n_probe=n_probe, exact_threshold=0, **filters)))
+                for q in queries
+            ]
+            recall = sum(len(f & e) / max(len(e), 1) for f, e in zip(found, exact)) / len(queries)
+            it = iter(queries)
+            timing = measure(
+                lambda: search_events(vector=next(it), limit=args.top_k, n_probe=n_probe, exact_threshold=0, **filters),
+                len(queries),
+            )
+            rows.append({"scenario": scenario, "mode": "approx", "n_probe": n_probe, "recall": recall, **timing})
+            if fallbacks.count:
+                raise SystemExit(f"{fallbacks.count} approximate searches fell back to the exact scan ({scenario})")
+
+    report(f"search_events top-{args.top_k} over {args.events} events", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import math
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from arango import ArangoClient as PyArangoClient
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.clients.openai import OpenAIClient
+from omni_python_library.clients.redis import RedisClient
+from omni_python_library.utils.singleton import Singleton
+
+# Benchmarks run against the docker-compose services, like the integration tests.
+
+
+def setup_clients(db_name: str, embedding_dimension: int = 1536) -> None:
+    Singleton._instances = {}
+    OpenAIClient().init()
+
+    RedisClient().init(host="localhost", port=6379, db=0)
+    RedisClient().client.flushdb()
+
+    sys_db = PyArangoClient(hosts="http://localhost:8529").db("_system", username="root", password="")
+    if sys_db.has_database(db_name):
+        sys_db.delete_database(db_name)
+    sys_db.create_database(db_name)
+
+    ArangoDBClient().init(
+        host="http://localhost:8529",
+        username="root",
+        password="",
+        db_name=db_name,
+        embedding_dimension=embedding_dimension,
+    )
+
+
+def random_unit_vector(dimension: int, rng: random.Random) -> List[float]:
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "mean_ms": statistics.fmean(timings),
+    }
+
+
+def report(title: str, rows: List[Dict[str, object]]) -> None:
+    print(f"\n== {title}")
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    print(" | ".join(columns))
+    for row in rows:
+        print(" | ".join(f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns))
@@ -0,0 +1,70 @@
+"""
+CPU profile of the client side of `create_event`, the serialization and validation passes of each write.
+
+Prints the functions with the most own time over `--creates` calls. Embeddings are disabled so the profile
+only covers the write path.
+
+Usage:
+    docker compose up -d
+    python benchmarks/profile_creates.py --creates 10000
+"""
+
+import argparse
+import cProfile
+import pstats
+import time
+
+from common import setup_clients
+
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.common import LocationData
+from omni_python_library.models.osint import EventMainData
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--creates", type=int, default=10_000)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    setup_clients("bench_profile_creates")
+    dal = OsintDataAccessLayer()
+    dal.init()
+
+    location = LocationData(
+        latitude=48.86,
+        longitude=2.35,
+        country_code="FR",
+        administrative_area="Ile-de-France",
+        sub_administrative_area="Paris",
+        locality="Paris",
+        sub_locality="1er",
+        address="Rue de Rivoli",
+        postal_code=75001,
+    )
+    events = [
+        EventMainData(
+            title=f"Event {i}",
+            description="Protest in the city center",
+            type="protest",
+            location=location,
+            happened_at=1_700_000_000_000 + i,
+            tags=["protest", "paris"],
+        )
+        for i in range(args.creates)
+    ]
+
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    profile.enable()
+    for event in events:
+        dal.create_event(event, owner="bench")
+    profile.disable()
+    seconds = time.perf_counter() - start
+
+    print(f"{args.creates} creates in {seconds:.2f}s, {seconds / args.creates * 1e6:.0f}us per create")
+    pstats.Stats(profile).sort_stats("tottime").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,8 @@ def init_omni_library() -> None:
         password=ConfigRegistry().get("ARANGODB_PASSWORD"),
         db_name=ConfigRegistry().get("ARANGODB_DB_NAME"),
         embedding_dimension=int(ConfigRegistry().get("ARANGODB_EMBEDDING_DIMENSION")),
+        query_max_runtime=float(ConfigRegistry().get("ARANGODB_QUERY_MAX_RUNTIME", default="0")),
+        query_memory_limit=int(ConfigRegistry().get("ARANGODB_QUERY_MEMORY_LIMIT", default="0")),
     )
 
     # Initialize Redis Client
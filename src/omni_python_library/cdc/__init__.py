@@ -0,0 +1,4 @@
+from omni_python_library.cdc.consumer import ChangeHandler, ChangeStreamConsumer
+from omni_python_library.cdc.publisher import DEFAULT_STREAM, ChangeStreamPublisher, change_record
+
+__all__ = ["DEFAULT_STREAM", "ChangeHandler", "ChangeStreamConsumer", "ChangeStreamPublisher", "change_record"]
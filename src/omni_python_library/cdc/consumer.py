@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from redis.exceptions import ResponseError
+
+from omni_python_library.cdc.publisher import DEFAULT_STREAM, decode_record, encode_record
+from omni_python_library.clients.redis import RedisClient
+from omni_python_library.models.change_stream import ChangeRecord
+
+logger = logging.getLogger(__name__)
+
+# Called with a batch of records. The batch is acknowledged once the handler returned without raising.
+ChangeHandler = Callable[[List[ChangeRecord]], None]
+
+
+class ChangeStreamConsumer:
+    """
+    Reads the change stream as a member of a Redis consumer group: the consumers of a group share the
+    records, each record being delivered to one of them until it is acknowledged.
+
+    Records read but not acknowledged, e.g. because the consumer crashed while handling them, stay pending:
+    the consumer reads its own pending records again first, and `claim_stale` takes over those of consumers
+    that went away. Handlers must therefore be idempotent. Records a handler keeps failing on are moved to a
+    dead-letter stream, see `run`.
+
+    Example:
+        consumer = ChangeStreamConsumer("search-indexer", consumer="indexer-1")
+        consumer.run(lambda records: index([r.id for r in records if r.collection == "event"]))
+    """
+
+    def __init__(
+        self,
+        group: str,
+        consumer: str,
+        stream: str = DEFAULT_STREAM,
+        batch_size: int = 100,
+        block_ms: int = 5000,
+        start_id: str = "$",
+        max_attempts: int = 5,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        dead_letter_stream: Optional[str] = None,
+    ):
+        """
+        :param group: The consumer group, one per downstream service.
+        :param consumer: The name of this consumer within the group, stable across restarts.
+        :param stream: The stream key.
+        :param batch_size: Maximum number of records per batch.
+        :param block_ms: Milliseconds to wait for new records before returning an empty batch.
+        :param start_id: Where a new group starts reading: `$` for the records appended from now on, `0` for
+                         all the records kept in the stream.
+        :param max_attempts: Number of times `run` hands a batch to the handler before isolating the records
+                             that fail and moving them to the dead-letter stream.
+        :param retry_delay: Seconds to wait after the first failure of a batch, doubled on each next failure.
+        :param max_retry_delay: Maximum seconds to wait between two attempts.
+        :param dead_letter_stream: The stream records that keep failing are moved to. Defaults to
+                                   `<stream>:dead:<group>`.
+        """
+        self.group = group
+        self.consumer = consumer
+        self.stream = stream
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self._start_id = start_id
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dead_letter_stream = dead_letter_stream or f"{stream}:dead:{group}"
+        self._group_created = False
+        # Read the pending records first, then the new ones
+        self._backlog = True
+
+    def ensure_group(self):
+        if self._group_created:
+            return
+        try:
+            RedisClient().client.xgroup_create(self.stream, self.group, id=self._start_id, mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_created = True
+
+    def read(self) -> List[ChangeRecord]:
+        """
+        Returns the next batch: the pending records of this consumer while there are any, then new records,
+        waiting up to `block_ms` for them.
+        """
+        self.ensure_group()
+        if self._backlog:
+            records = self._read("0", block=None)
+            if records:
+                return records
+            self._backlog = False
+        return self._read(">", block=self.block_ms)
+
+    def ack(self, records: List[ChangeRecord]):
+        entry_ids = [record.entry_id for record in records if record.entry_id]
+        if entry_ids:
+            RedisClient().client.xack(self.stream, self.group, *entry_ids)
+
+    def claim_stale(self, min_idle_ms: int = 60_000) -> int:
+        """
+        Takes over the records that other consumers of the group read but did not acknowledge for
+        `min_idle_ms`. They are returned by the next `read`.
+
+        :return: The number of claimed records.
+        """
+        self.ensure_group()
+        claimed = 0
+        start = "0-0"
+        while True:
+            response = RedisClient().client.xautoclaim(
+                self.stream, self.group, self.consumer, min_idle_ms, start_id=start, count=self.batch_size, justid=True
+            )
+            start, entry_ids = response[0], response[1]
+            claimed += len(entry_ids)
+            if start == "0-0":
+                break
+        if claimed:
+            logger.debug(f"Consumer {self.consumer} claimed {claimed} stale records of {self.stream}")
+            self._backlog = True
+        return claimed
+
+    def run(self, handler: ChangeHandler, stop: Optional[threading.Event] = None, claim_every: int = 60):
+        """
+        Hands batches to `handler` and acknowledges them, until `stop` is set.
+
+        A batch whose handler raised is not acknowledged: it is handed over again after a delay growing with
+        each failure. After `max_attempts` failures, its records are handed over one by one, and those still
+        failing are moved to the dead-letter stream, so that one bad record does not stall the group.
+
+        :param claim_every: Number of reads between two `claim_stale` calls. 0 disables claiming.
+        """
+        reads = 0
+        failures = 0
+        while stop is None or not stop.is_set():
+            if claim_every and reads % claim_every == 0:
+                self.claim_stale()
+            reads += 1
+            records = self.read()
+            if not records:
+                continue
+            try:
+                handler(records)
+            except Exception as e:
+                failures += 1
+                if failures < self.max_attempts:
+                    delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+                    logger.exception(
+                        f"Change handler of {self.group} failed on {len(records)} records "
+                        f"({failures}/{self.max_attempts}), retrying in {delay:.1f}s"
+                    )
+                    self._backlog = True
+                    if stop is not None:
+                        stop.wait(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+                logger.error(f"Change handler of {self.group} failed {failures} times, isolating the failing records")
+                self._isolate(handler, records, e)
+                failures = 0
+                continue
+            failures = 0
+            self.ack(records)
+
+    def dead_letter(self, records: List[ChangeRecord], error: Exception):
+        """
+        Moves records to the dead-letter stream with the error that stopped them, and acknowledges them.
+        """
+        pipeline = RedisClient().client.pipeline(transaction=True)
+        for record in records:
+            fields = {**encode_record(record), "entry_id": record.entry_id or "", "error": repr(error)}
+            pipeline.xadd(self.dead_letter_stream, fields)
+        entry_ids = [record.entry_id for record in records if record.entry_id]
+        if entry_ids:
+            pipeline.xack(self.stream, self.group, *entry_ids)
+        pipeline.execute()
+        logger.error(f"Moved {len(records)} records of {self.stream} to {self.dead_letter_stream}: {error!r}")
+
+    def _isolate(self, handler: ChangeHandler, records: List[ChangeRecord], error: Exception):
+        if len(records) == 1:
+            self.dead_letter(records, error)
+            return
+        for record in records:
+            try:
+                handler([record])
+            except Exception as e:
+                logger.exception(f"Change handler of {self.group} failed on {record.id}")
+                self.dead_letter([record], e)
+                continue
+            self.ack([record])
+
+    def _read(self, entry_id: str, block: Optional[int]) -> List[ChangeRecord]:
+        response = RedisClient().client.xreadgroup(
+            self.group, self.consumer, {self.stream: entry_id}, count=self.batch_size, block=block
+        )
+        records = []
+        trimmed = []
+        for _, entries in response or []:
+            for stream_entry_id, fields in entries:
+                if not fields:
+                    # Pending record trimmed from the stream meanwhile
+                    trimmed.append(stream_entry_id)
+                    continue
+                records.append(decode_record(stream_entry_id, fields))
+        if trimmed:
+            RedisClient().client.xack(self.stream, self.group, *trimmed)
+        return records
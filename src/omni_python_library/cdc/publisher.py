@@ -0,0 +1,118 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from omni_python_library.clients.redis import RedisClient
+from omni_python_library.dal.change_notifier import Change
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.change_stream import ChangeOperation, ChangeRecord
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.instrumentation import timed
+from omni_python_library.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM = "omni:changes"
+# Attributes left out of the changed fields: they change on every write
+_SYSTEM_ATTRIBUTES = frozenset({"_id", "_key", "_rev"})
+
+
+def change_record(collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> ChangeRecord:
+    """
+    Summarizes a change notified by the data access layers into a compact record.
+    """
+    doc = new if new is not None else old
+    if old is None:
+        operation = ChangeOperation.CREATE
+        fields = sorted(new.keys() - _SYSTEM_ATTRIBUTES)
+    elif new is None:
+        operation = ChangeOperation.DELETE
+        fields = []
+    else:
+        operation = ChangeOperation.UPDATE
+        fields = sorted(k for k in (old.keys() | new.keys()) - _SYSTEM_ATTRIBUTES if old.get(k) != new.get(k))
+    return ChangeRecord(
+        id=doc["_id"],
+        collection=collection,
+        operation=operation,
+        rev=doc.get("_rev"),
+        fields=fields,
+        timestamp=int(time.time() * 1000),
+    )
+
+
+def encode_record(record: ChangeRecord) -> Dict[str, str]:
+    """
+    Returns the flat string fields of the stream entry of a record.
+    """
+    return {
+        "id": record.id,
+        "collection": record.collection,
+        "op": record.operation.value,
+        "rev": record.rev or "",
+        "fields": ",".join(record.fields),
+        "ts": str(record.timestamp),
+    }
+
+
+def decode_record(entry_id: str, fields: Dict[str, str]) -> ChangeRecord:
+    return ChangeRecord(
+        entry_id=entry_id,
+        id=fields["id"],
+        collection=fields["collection"],
+        operation=fields["op"],
+        rev=fields.get("rev") or None,
+        fields=fields["fields"].split(",") if fields.get("fields") else [],
+        timestamp=int(fields["ts"]),
+    )
+
+
+class ChangeStreamPublisher(Singleton):
+    """
+    Appends a record of every document written through the data access layers to a Redis Stream, so that
+    other services follow the changes with a `ChangeStreamConsumer` instead of polling ArangoDB.
+
+    Disabled until `init` is called. The records of one write, e.g. a bulk update, are appended in one
+    pipelined round trip after the write succeeded. Publishing is best effort: when Redis fails, the error
+    is logged and the write is not undone, so consumers needing exactness reconcile periodically.
+
+    Example:
+        ChangeStreamPublisher().init(max_length=1_000_000)
+    """
+
+    def init(
+        self,
+        stream: str = DEFAULT_STREAM,
+        max_length: Optional[int] = 1_000_000,
+        collections: Optional[Sequence[str]] = None,
+    ):
+        """
+        :param stream: The stream key. A `{collection}` placeholder gives each collection its own stream.
+        :param max_length: Approximate number of entries kept, oldest trimmed first. None keeps all entries.
+        :param collections: Only publish the changes of these collections. Defaults to all.
+        """
+        self._stream = stream
+        self._max_length = max_length
+        self._collections = frozenset(collections) if collections is not None else None
+        # The listeners are shared by all data access layers, views and relations included
+        OsintDataAccessLayer().add_changes_listener(self.on_changes)
+
+    def disable(self):
+        OsintDataAccessLayer().remove_changes_listener(self.on_changes)
+
+    def stream_key(self, collection: str) -> str:
+        return self._stream.format(collection=collection)
+
+    def on_changes(self, collection: str, changes: List[Change]):
+        if self._collections is not None and collection not in self._collections:
+            return
+        key = self.stream_key(collection)
+        try:
+            pipeline = RedisClient().client.pipeline(transaction=False)
+            for old, new in changes:
+                entry = encode_record(change_record(collection, old, new))
+                pipeline.xadd(key, entry, maxlen=self._max_length, approximate=True)
+            with timed(Tier.REDIS, "xadd"):
+                pipeline.execute()
+        except Exception:
+            logger.exception(f"Error publishing {len(changes)} changes of {collection} to {key}")
@@ -1,10 +1,217 @@
-from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, TypeVar, Union
 
 from arango import ArangoClient
+from arango.client import default_serializer
 from arango.collection import StandardCollection
+from arango.cursor import Cursor
+from arango.exceptions import AQLQueryExecuteError, AQLQueryKillError, ArangoServerError, CursorNextError
+from cachetools import TTLCache
 
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.instrumentation import active_instrumentation
 from omni_python_library.utils.singleton import Singleton
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# ArangoDB error numbers of a query killed (max runtime exceeded or killed explicitly) and of a memory limit hit
+QUERY_KILLED = 1500
+RESOURCE_LIMIT = 32
+# ArangoDB error number of an insert conflicting with a unique index
+UNIQUE_CONSTRAINT_VIOLATED = 1210
+# Vertex-centric indexes of the edge collections: the edges of a vertex ordered by the vertex at their other
+# end, so that paging through the neighbors of a hub or matching both ends reads only the matching edges
+EDGE_INDICES = [("persistent", ["_from", "_to"]), ("persistent", ["_to", "_from"])]
+# ArangoDB error number of an APPROX_NEAR_* search without a usable vector index, e.g. not created yet
+VECTOR_SEARCH_NOT_APPLIED = 1554
+
+
+class QueryTimeoutError(TimeoutError):
+    """
+    Raised when an AQL query exceeded its time budget, or was killed because its caller was cancelled.
+    """
+
+
+class QueryMemoryLimitError(Exception):
+    """
+    Raised when an AQL query exceeded its memory limit.
+    """
+
+
+class _QueryScope(NamedTuple):
+    max_runtime: Optional[float]
+    memory_limit: Optional[int]
+    tag: Optional[str]
+    cancelled: Optional[threading.Event]
+
+
+_query_scope: contextvars.ContextVar[Optional[_QueryScope]] = contextvars.ContextVar("query_scope", default=None)
+
+
+def _tightest(*limits: Optional[float]) -> Optional[Any]:
+    """
+    Returns the tightest of explicit limits, None meaning not set and 0 no limit. None when none is set.
+    """
+    explicit = [limit for limit in limits if limit is not None]
+    if not explicit:
+        return None
+    bounded = [limit for limit in explicit if limit > 0]
+    return min(bounded) if bounded else 0
+
+
+def _limit_error(
+    error: ArangoServerError, max_runtime: Optional[float], memory_limit: Optional[int]
+) -> Optional[Exception]:
+    if error.error_code == QUERY_KILLED:
+        return QueryTimeoutError(f"Query killed after exceeding {max_runtime}s or on cancellation")
+    if error.error_code == RESOURCE_LIMIT:
+        return QueryMemoryLimitError(f"Query exceeded its memory limit of {memory_limit} bytes")
+    return None
+
+
+class LimitedCursor:
+    """
+    Cursor of a streamed query, which runs while its batches are fetched: a query killed or over its memory
+    limit then fails on a later batch, raising QueryTimeoutError or QueryMemoryLimitError like `execute`.
+    Other attributes are those of the wrapped cursor.
+    """
+
+    def __init__(self, cursor: Cursor, max_runtime: Optional[float], memory_limit: Optional[int]):
+        self._cursor = cursor
+        self._max_runtime = max_runtime
+        self._memory_limit = memory_limit
+
+    def __iter__(self) -> "LimitedCursor":
+        return self
+
+    def __next__(self) -> Any:
+        return self.next()
+
+    def __enter__(self) -> "LimitedCursor":
+        return self
+
+    def __exit__(self, *exc: Any):
+        self._cursor.__exit__(*exc)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def next(self) -> Any:
+        return self._translated(self._cursor.next)
+
+    def fetch(self) -> Dict[str, Any]:
+        return self._translated(self._cursor.fetch)
+
+    def _translated(self, call: Callable[[], T]) -> T:
+        try:
+            return call()
+        except CursorNextError as e:
+            error = _limit_error(e, self._max_runtime, self._memory_limit)
+            if error is None:
+                raise
+            raise error from e
+
+
+def _option(options: Dict[str, Any], name: str) -> Optional[float]:
+    """
+    Pops a limit option, an explicit None becoming 0 (no limit) to tell it apart from a missing option.
+    """
+    if name not in options:
+        return None
+    return options.pop(name) or 0
+
+
+@contextmanager
+def query_limits(max_runtime: Optional[float] = None, memory_limit: Optional[int] = None):
+    """
+    Applies a time budget and a memory limit to every AQL query executed in the block, including the queries
+    of the query tools. They replace the defaults of the client, so a block may also raise them; nested blocks
+    and explicit `max_runtime`/`memory_limit` options keep the tightest limits.
+
+    Example:
+        with query_limits(max_runtime=10, memory_limit=512 * 1024 * 1024):
+            events = search_events(text="protest")
+
+    :param max_runtime: Maximum runtime of each query in seconds, 0 for none. None keeps the enclosing limit.
+    :param memory_limit: Maximum memory of each query in bytes, 0 for none. None keeps the enclosing limit.
+    """
+    outer = _query_scope.get()
+    scope = _QueryScope(
+        max_runtime=_tightest(max_runtime, outer.max_runtime if outer else None),
+        memory_limit=_tightest(memory_limit, outer.memory_limit if outer else None),
+        tag=outer.tag if outer else None,
+        cancelled=outer.cancelled if outer else None,
+    )
+    token = _query_scope.set(scope)
+    try:
+        yield
+    finally:
+        _query_scope.reset(token)
+
+
+async def run_cancellable(
+    func: Callable[..., T],
+    *args: Any,
+    max_runtime: Optional[float] = None,
+    memory_limit: Optional[int] = None,
+    **kwargs: Any,
+) -> T:
+    """
+    Runs a blocking data access layer call in a worker thread, with `query_limits` applied. When the calling
+    task is cancelled, the AQL queries started by the call are killed server-side and the queries it would
+    still start fail with QueryTimeoutError, so the thread stops promptly.
+
+    Queries are found through the running-queries list of ArangoDB, which needs query tracking (the default).
+
+    Example:
+        events = await run_cancellable(search_events, text="protest", max_runtime=10)
+
+    :param func: The function to call, e.g. a query tool.
+    :param max_runtime: Maximum runtime of each query in seconds.
+    :param memory_limit: Maximum memory of each query in bytes.
+    :return: The result of `func`.
+    """
+    tag = f"omni-query:{uuid.uuid4().hex}"
+    cancelled = threading.Event()
+
+    def call() -> T:
+        with query_limits(max_runtime, memory_limit):
+            scope = _query_scope.get()
+            _query_scope.set(scope._replace(tag=tag, cancelled=cancelled))
+            return func(*args, **kwargs)
+
+    try:
+        return await asyncio.to_thread(call)
+    except asyncio.CancelledError:
+        cancelled.set()
+        killed = await asyncio.to_thread(ArangoDBClient().kill_queries, tag)
+        logger.debug(f"Killed {killed} queries of a cancelled call to {func}")
+        raise
+
+
+class SerializedDocument(dict):
+    """
+    A document sent with JSON the caller already serialized, instead of dumping the dict again.
+    """
+
+    def __init__(self, document: Dict[str, Any], serialized: str):
+        super().__init__(document)
+        self.serialized = serialized
+
+
+def _serialize(obj: Any) -> str:
+    if isinstance(obj, SerializedDocument):
+        return obj.serialized
+    return default_serializer(obj)
+
 
 class ArangoDBClient(Singleton):
     def init(
@@ -14,14 +221,26 @@ class ArangoDBClient(Singleton):
         password: str = "",
         db_name: str = "osint_db",
         embedding_dimension: int = 1536,
+        vector_n_lists: int = 100,
+        vector_default_n_probe: int = 10,
+        query_max_runtime: float = 0,
+        query_memory_limit: int = 0,
     ):
+        """
+        :param query_max_runtime: Default maximum runtime of each AQL query in seconds, 0 for none.
+        :param query_memory_limit: Default maximum memory of each AQL query in bytes, 0 for none.
+        """
         self._host = host
         self._username = username
         self._password = password
         self._db_name = db_name
         self._embedding_dimension = int(embedding_dimension)
+        self._vector_n_lists = int(vector_n_lists)
+        self._vector_default_n_probe = int(vector_default_n_probe)
+        self._query_max_runtime = float(query_max_runtime)
+        self._query_memory_limit = int(query_memory_limit)
 
-        self._client = ArangoClient(hosts=self._host)
+        self._client = ArangoClient(hosts=self._host, serializer=_serialize)
         self._db = self._client.db(
             self._db_name,
             username=self._username,
@@ -29,46 +248,107 @@ class ArangoDBClient(Singleton):
         )
         self._collections: Dict[str, StandardCollection] = {}
         self._graph_callbacks: List[Callable[[str, str], Optional[str]]] = []
+        # Edge collections get_edge_collection created with their indexes and added to their graphs
+        self._set_up_edge_collections: Set[str] = set()
+        # Other processes may add edge definitions, so the per-graph definitions are refreshed periodically.
+        # The "*" entry holds the names of all edge collections.
+        self._graph_edge_collections: TTLCache = TTLCache(maxsize=64, ttl=60)
 
     def init_collection(
-        self, name: str, edge: bool = False, indices: List[Tuple[str, str]] = [], vector_index: bool = False
+        self,
+        name: str,
+        edge: bool = False,
+        indices: List[Union[Tuple[str, Union[str, List[str]]], Tuple[str, Union[str, List[str]], Dict[str, Any]]]] = [],
+        vector_index: bool = False,
+        vector_stored_values: Optional[List[str]] = None,
     ):
+        """
+        :param indices: (type, fields) or (type, fields, options) of the indexes, e.g.
+                        ("persistent", "url", {"unique": True, "sparse": True}).
+        """
         col_name = name.lower()
         if not self._db.has_collection(col_name):
             self._db.create_collection(col_name, edge=edge)
 
         col = self._db.collection(col_name)
 
-        for type, index in indices:
-            col.add_index(
-                {
-                    "type": type,
-                    "fields": [index],
-                }
-            )
-
-        if vector_index:
+        for type, index, *options in indices:
+            definition = {"type": type, "fields": index if isinstance(index, list) else [index]}
+            if not options:
+                col.add_index(definition)
+                continue
             try:
-                col.add_index(
-                    {
-                        "type": "vector",
-                        "fields": ["embedding"],
-                        "dimension": self._embedding_dimension,
-                        "metric": "cosine",
-                    }
-                )
-            except Exception:
-                pass
+                col.add_index({**definition, **options[0]})
+            except Exception as e:
+                # e.g. a unique index over existing duplicates, which have to be merged first
+                logger.warning(f"Index on {col_name} {definition['fields']} with {options[0]} not created: {e}")
 
         self._collections[col_name] = col
+
+        if vector_index:
+            self.init_vector_index(col_name, stored_values=vector_stored_values)
+
         return col
 
+    def init_vector_index(
+        self,
+        name: str,
+        n_lists: Optional[int] = None,
+        default_n_probe: Optional[int] = None,
+        stored_values: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        Creates the IVF vector index on `embedding` used by the APPROX_NEAR_* AQL functions.
+
+        The index is trained on the documents present when it is created, so creation fails on an
+        empty or small collection. Call this again after loading data when it was not created at init.
+
+        :param name: Collection name.
+        :param n_lists: Number of IVF centroids. Defaults to the client setting.
+        :param default_n_probe: Number of centroids probed when a query does not pass `nProbe`.
+        :param stored_values: Attributes stored in the index so filters on them are applied during the search.
+        :return: True if the index exists after the call.
+        """
+        col = self.get_collection(name)
+        index: Dict[str, Any] = {
+            "type": "vector",
+            "fields": ["embedding"],
+            "params": {
+                "metric": "cosine",
+                "dimension": self._embedding_dimension,
+                "nLists": n_lists or self._vector_n_lists,
+                "defaultNProbe": default_n_probe or self._vector_default_n_probe,
+            },
+        }
+        if stored_values:
+            index["storedValues"] = stored_values
+
+        try:
+            col.add_index(index)
+            return True
+        except Exception as e:
+            logger.warning(f"Vector index on {col.name} not created: {e}")
+            return False
+
+    def drop_indices(self, name: str, indices: List[Tuple[str, Union[str, List[str]]]]):
+        """
+        Drops the indexes of a collection with exactly the given (type, fields), e.g. indexes superseded by a
+        newer definition, which `init_collection` would otherwise keep maintaining.
+        """
+        col = self.get_collection(name)
+        dropped = {(type, tuple(index if isinstance(index, list) else [index])) for type, index in indices}
+        for index in col.indexes():
+            fields = tuple(f["name"] if isinstance(f, dict) else f for f in index.get("fields", []))
+            if (index["type"], fields) in dropped:
+                col.delete_index(index["id"])
+                logger.info(f"Dropped {index['type']} index on {col.name} {list(fields)}")
+
     def init_graph(self, graph_name: str, callback: Callable[[str, str], Optional[str]]):
         if not self._db.has_graph(graph_name):
             self._db.create_graph(graph_name)
         self._graph_callbacks.append(callback)
 
-    def init_view(self, view_name: str, properties: Dict):
+    def init_view(self, view_name: str, properties: Dict, view_type: str = "arangosearch"):
         exists = False
         if hasattr(self._db, "has_view"):
             if self._db.has_view(view_name):
@@ -84,15 +364,120 @@ class ArangoDBClient(Singleton):
 
         if not exists:
             try:
-                self._db.create_view(view_name, "arangosearch", properties)
+                self._db.create_view(view_name, view_type, properties)
             except Exception:
                 # Might fail if it already exists or other issues
                 pass
 
+    def init_search_view(
+        self,
+        view_name: str,
+        collection: str,
+        fields: List[Union[str, Dict[str, Any]]],
+        index_name: Optional[str] = None,
+    ):
+        """
+        Creates an inverted index over `fields` and a search-alias view on it, so the fields can be
+        queried with SEARCH and ranked with BM25/TFIDF.
+
+        :param view_name: Name of the search-alias view.
+        :param collection: Collection to index.
+        :param fields: Inverted index field definitions (attribute paths or dicts with per-field analyzers).
+        :param index_name: Name of the inverted index. Defaults to `<view_name>_index`.
+        """
+        col = self.get_collection(collection)
+        index_name = index_name or f"{view_name}_index"
+        try:
+            col.add_index({"type": "inverted", "name": index_name, "fields": fields})
+        except Exception as e:
+            logger.warning(f"Inverted index {index_name} on {col.name} not created: {e}")
+
+        self.init_view(
+            view_name, {"indexes": [{"collection": col.name, "index": index_name}]}, view_type="search-alias"
+        )
+
     @property
     def db(self):
         return self._db
 
+    @property
+    def embedding_dimension(self) -> int:
+        return self._embedding_dimension
+
+    def execute(self, query: str, bind_vars: Optional[Dict[str, Any]] = None, **kwargs):
+        """
+        Executes an AQL query within the time budget and memory limit of the enclosing `query_limits` block and
+        of the options, whichever are tightest, or else within the defaults of the client. Records its latency
+        and slow-query details when instrumentation is enabled.
+
+        :param query: The AQL query string.
+        :param bind_vars: Bind variables of the query.
+        :param kwargs: Options of `AQL.execute`, e.g. `batch_size`, `stream` or `max_runtime` in seconds. A
+                       `max_runtime` or `memory_limit` of None lifts the default of the client, e.g. for
+                       streamed bulk reads whose runtime includes the time spent consuming them.
+        :return: The result cursor, a `LimitedCursor` for streamed queries.
+        :raises QueryTimeoutError: If the query exceeded its time budget or was killed.
+        :raises QueryMemoryLimitError: If the query exceeded its memory limit.
+        """
+        scope = _query_scope.get()
+        max_runtime = _tightest(_option(kwargs, "max_runtime"), scope.max_runtime if scope else None)
+        if max_runtime is None:
+            max_runtime = self._query_max_runtime
+        memory_limit = _tightest(_option(kwargs, "memory_limit"), scope.memory_limit if scope else None)
+        if memory_limit is None:
+            memory_limit = self._query_memory_limit
+        if max_runtime:
+            kwargs["max_runtime"] = max_runtime
+        if memory_limit:
+            kwargs["memory_limit"] = memory_limit
+        text = query
+        if scope is not None and scope.tag:
+            if scope.cancelled is not None and scope.cancelled.is_set():
+                raise QueryTimeoutError("Query not started, its caller was cancelled")
+            # The tag identifies the queries of a cancellable call in the running-queries list
+            text = f"/* {scope.tag} */ {query}"
+
+        try:
+            instrumentation = active_instrumentation()
+            if instrumentation is None:
+                cursor = self._db.aql.execute(text, bind_vars=bind_vars, **kwargs)
+            else:
+                if instrumentation.profile_queries:
+                    kwargs.setdefault("profile", True)
+                start = time.perf_counter()
+                try:
+                    cursor = self._db.aql.execute(text, bind_vars=bind_vars, **kwargs)
+                except Exception:
+                    instrumentation.observe(Tier.ARANGO, "query", time.perf_counter() - start)
+                    raise
+                instrumentation.record_query(self._db, query, bind_vars or {}, cursor, time.perf_counter() - start)
+        except AQLQueryExecuteError as e:
+            error = _limit_error(e, max_runtime, memory_limit)
+            if error is None:
+                raise
+            raise error from e
+        if kwargs.get("stream"):
+            return LimitedCursor(cursor, max_runtime, memory_limit)
+        return cursor
+
+    def kill_queries(self, tag: str) -> int:
+        """
+        Kills the running AQL queries whose text contains `tag`.
+
+        :return: The number of queries killed.
+        """
+        killed = 0
+        for running in self._db.aql.queries():
+            if tag not in running["query"]:
+                continue
+            try:
+                self._db.aql.kill(running["id"])
+                killed += 1
+            except AQLQueryKillError:
+                # The query finished in the meantime
+                pass
+        return killed
+
     def get_collection(self, name: str):
         col_name = name.lower()
         if col_name in self._collections:
@@ -105,15 +490,47 @@ class ArangoDBClient(Singleton):
 
     def get_edge_collection(self, name: str, from_coll: str, to_coll: str):
         collection_name = f"{from_coll}_{name}_{to_coll}"
-        col = self.init_collection(collection_name, edge=True)
+        if collection_name in self._set_up_edge_collections:
+            return self._collections[collection_name]
+        self._graph_edge_collections.pop("*", None)
+        col = self.init_collection(collection_name, edge=True, indices=EDGE_INDICES)
 
         for callback in self._graph_callbacks:
             graph_name = callback(from_coll, to_coll)
             if graph_name:
                 self._ensure_in_graph(graph_name, collection_name, from_coll, to_coll)
 
+        self._set_up_edge_collections.add(collection_name)
         return col
 
+    def get_graph_edge_collections(self, graph_name: str) -> List[str]:
+        """
+        Returns the names of the edge collections defined in `graph_name`.
+        """
+        return sorted(definition["edge_collection"] for definition in self.get_graph_edge_definitions(graph_name))
+
+    def get_graph_edge_definitions(self, graph_name: str) -> List[Dict[str, Any]]:
+        """
+        Returns the edge definitions of `graph_name`, with the `edge_collection`, `from_vertex_collections`
+        and `to_vertex_collections` of each.
+        """
+        if graph_name not in self._graph_edge_collections:
+            self._graph_edge_collections[graph_name] = self._db.graph(graph_name).edge_definitions()
+        return self._graph_edge_collections[graph_name]
+
+    def get_edge_collection_names(self, refresh: bool = False) -> List[str]:
+        """
+        Returns the names of all non-system edge collections, including those outside of any graph.
+
+        :param refresh: List the collections again instead of using the cached names, which miss the edge
+                        collections created by other processes for up to a minute.
+        """
+        if refresh or "*" not in self._graph_edge_collections:
+            self._graph_edge_collections["*"] = sorted(
+                c["name"] for c in self._db.collections() if c["type"] == "edge" and not c["system"]
+            )
+        return self._graph_edge_collections["*"]
+
     def parse_id(self, id: str):
         col_name = id.split("/")[0]
         key = id.split("/")[-1]
@@ -134,3 +551,4 @@ class ArangoDBClient(Singleton):
             graph.create_edge_definition(
                 edge_collection=edge_collection, from_vertex_collections=[from_coll], to_vertex_collections=[to_coll]
             )
+            self._graph_edge_collections.pop(graph_name, None)
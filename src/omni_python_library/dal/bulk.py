@@ -0,0 +1,82 @@
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.models.bulk import BulkProgress, BulkResult
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Called after each batch of a bulk operation
+ProgressCallback = Callable[[BulkProgress], None]
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def batched(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def group_by_collection(items: Sequence[Tuple[str, T]]) -> Dict[str, List[Tuple[str, str, T]]]:
+    """
+    Groups (id, value) pairs into (id, key, value) triples by collection, keeping their order.
+    """
+    groups: Dict[str, List[Tuple[str, str, T]]] = {}
+    for id, value in items:
+        col_name, key = ArangoDBClient().parse_id(id)
+        groups.setdefault(col_name, []).append((id, key, value))
+    return groups
+
+
+def report_progress(progress: Optional[ProgressCallback], result: BulkResult, total: int):
+    done = len(result.ids) + len(result.errors)
+    logger.debug(f"Bulk operation processed {done}/{total} documents, {len(result.errors)} failed")
+    if progress is None:
+        return
+    try:
+        progress(BulkProgress(done=done, total=total, failed=len(result.errors)))
+    except Exception:
+        logger.exception(f"Progress callback {progress} failed")
+
+
+def match_ids(collection: str, filters: Optional[Dict[str, Any]] = None, related_to: Optional[str] = None) -> List[str]:
+    """
+    Returns the IDs of the documents of `collection` matching all the filters.
+
+    :param collection: The collection of the documents, e.g. "event".
+    :param filters: Attribute values the documents must have. Nested attributes are written with dots,
+                    e.g. {"location.country_code": "FR"}.
+    :param related_to: Only match documents linked by a relation to this entity ID, e.g. the events of a
+                       source.
+    :return: The matching document IDs.
+    """
+    bind_vars: Dict[str, Any] = {}
+    conditions = []
+    for i, (attribute, value) in enumerate((filters or {}).items()):
+        conditions.append(f"doc.@attribute_{i} == @value_{i}")
+        bind_vars[f"attribute_{i}"] = attribute.split(".")
+        bind_vars[f"value_{i}"] = value
+    filter_clause = f"FILTER {' AND '.join(conditions)}" if conditions else ""
+
+    if related_to is None:
+        query = f"FOR doc IN @@collection {filter_clause} RETURN doc._id"
+        bind_vars["@collection"] = collection
+    else:
+        edges = ArangoDBClient().get_edge_collection_names()
+        if not edges:
+            return []
+        for i, name in enumerate(edges):
+            bind_vars[f"@edge_{i}"] = name
+        query = f"""
+        FOR doc IN 1..1 ANY @related_to {", ".join(f"@@edge_{i}" for i in range(len(edges)))}
+            FILTER IS_SAME_COLLECTION(@collection, doc)
+            {filter_clause}
+            RETURN DISTINCT doc._id
+        """
+        bind_vars.update({"related_to": related_to, "collection": collection})
+
+    ids = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+    logger.debug(f"Matched {len(ids)} {collection} documents")
+    return ids
@@ -1,10 +1,12 @@
 import json
 import logging
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 from cachetools import LRUCache
 
 from omni_python_library.clients.redis import RedisClient
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.instrumentation import timed
 from omni_python_library.utils.singleton import Singleton
 
 logger = logging.getLogger(__name__)
@@ -18,13 +20,16 @@ class Cacher(Singleton):
 
     def get(self, key: str) -> Optional[Any]:
         # Check local cache first
-        if key in self._local_cache:
+        with timed(Tier.LOCAL_CACHE, "get"):
+            data = self._local_cache.get(key)
+        if data is not None:
             logger.debug(f"Key {key} found in local cache")
-            return self._local_cache[key]
+            return data
 
         # Check Redis
         try:
-            val = RedisClient().client.get(key)
+            with timed(Tier.REDIS, "get"):
+                val = RedisClient().client.get(key)
             if val:
                 # Assuming JSON storage for complex objects
                 try:
@@ -42,18 +47,24 @@ class Cacher(Singleton):
 
         return None
 
-    def set(self, key: str, value: Any, ttl: int = 3600):
+    def set(self, key: str, value: Any, ttl: int = 3600, serialized: Optional[str] = None):
+        """
+        :param serialized: The JSON of `value` if the caller already has it, stored in Redis as is.
+        """
         logger.debug(f"Setting key: {key} with ttl: {ttl}")
         # Set local
         self._local_cache[key] = value
 
         # Set Redis
         try:
-            if isinstance(value, (dict, list)):
+            if serialized is not None:
+                val_str = serialized
+            elif isinstance(value, (dict, list)):
                 val_str = json.dumps(value)
             else:
                 val_str = str(value)
-            RedisClient().client.setex(key, ttl, val_str)
+            with timed(Tier.REDIS, "set"):
+                RedisClient().client.setex(key, ttl, val_str)
         except Exception:
             logger.exception(f"Error setting key {key} in Redis")
             pass
@@ -63,11 +74,42 @@ class Cacher(Singleton):
         if key in self._local_cache:
             del self._local_cache[key]
         try:
-            RedisClient().client.delete(key)
+            with timed(Tier.REDIS, "delete"):
+                RedisClient().client.delete(key)
         except Exception:
             logger.exception(f"Error deleting key {key} from Redis")
             pass
 
+    def set_many(self, values: Dict[str, Any], ttl: int = 3600):
+        """
+        Sets several keys with one Redis round trip.
+        """
+        logger.debug(f"Setting {len(values)} keys with ttl: {ttl}")
+        self._local_cache.update(values)
+        try:
+            pipeline = RedisClient().client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipeline.setex(key, ttl, json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+            with timed(Tier.REDIS, "set_many"):
+                pipeline.execute()
+        except Exception:
+            logger.exception(f"Error setting {len(values)} keys in Redis")
+
+    def expel_many(self, keys: List[str]):
+        """
+        Expels several keys with one Redis round trip.
+        """
+        logger.debug(f"Expelling {len(keys)} keys")
+        for key in keys:
+            self._local_cache.pop(key, None)
+        if not keys:
+            return
+        try:
+            with timed(Tier.REDIS, "delete_many"):
+                RedisClient().client.delete(*keys)
+        except Exception:
+            logger.exception(f"Error deleting {len(keys)} keys from Redis")
+
     def clear_local(self):
         logger.debug("Clearing local cache")
         self._local_cache.clear()
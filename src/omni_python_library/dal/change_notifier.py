@@ -0,0 +1,58 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Called with (collection_name, old_doc, new_doc). old_doc is None on create, new_doc is None on delete.
+ChangeListener = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+Change = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+# Called once with (collection_name, [(old_doc, new_doc), ...]) for all the documents of a bulk write
+ChangesListener = Callable[[str, List[Change]], None]
+
+
+class ChangeNotifier:
+    """
+    Mixin of the data access layers that notifies in-process listeners of every document they write.
+    """
+
+    # Shared by all data access layers, like the Singleton instances
+    _change_listeners: List[ChangeListener] = []
+    _changes_listeners: List[ChangesListener] = []
+
+    def add_change_listener(self, listener: ChangeListener):
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: ChangeListener):
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def add_changes_listener(self, listener: ChangesListener):
+        """
+        Registers a listener called once per write with all its changes, e.g. to invalidate a collection once
+        for a bulk update instead of once per document.
+        """
+        if listener not in self._changes_listeners:
+            self._changes_listeners.append(listener)
+
+    def remove_changes_listener(self, listener: ChangesListener):
+        if listener in self._changes_listeners:
+            self._changes_listeners.remove(listener)
+
+    def _notify_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        self._notify_changes(collection, [(old, new)])
+
+    def _notify_changes(self, collection: str, changes: List[Change]):
+        if not changes:
+            return
+        for listener in list(self._change_listeners):
+            for old, new in changes:
+                try:
+                    listener(collection, old, new)
+                except Exception:
+                    logger.exception(f"Change listener {listener} failed for {collection}")
+        for changes_listener in list(self._changes_listeners):
+            try:
+                changes_listener(collection, changes)
+            except Exception:
+                logger.exception(f"Change listener {changes_listener} failed for {collection}")
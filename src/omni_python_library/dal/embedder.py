@@ -0,0 +1,72 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from omni_python_library.clients.openai import OpenAIClient
+from omni_python_library.dal.embedding_text import EMBEDDING_HASH_ATTRIBUTE, embedding_hash, embedding_text
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.config_registry import LLMConstant
+from omni_python_library.utils.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+def generate_embedding(text: Optional[str]) -> Optional[List[float]]:
+    client_tuple = OpenAIClient().get_client(LLMConstant.EMBEDDING)
+    if not client_tuple or not text:
+        return None
+
+    client, model = client_tuple
+    if not client:
+        return None
+
+    try:
+        with timed(Tier.EMBEDDING, "create"):
+            response = client.embeddings.create(input=text, model=model)
+        return response.data[0].embedding
+    except Exception:
+        logger.exception("Error generating embedding")
+        return None
+
+
+def generate_embeddings(texts: List[Optional[str]]) -> List[Optional[List[float]]]:
+    """
+    Embeds several texts in one request. Empty texts and failed requests yield None.
+    """
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    client_tuple = OpenAIClient().get_client(LLMConstant.EMBEDDING)
+    indexes = [i for i, text in enumerate(texts) if text]
+    if not client_tuple or not client_tuple[0] or not indexes:
+        return embeddings
+
+    client, model = client_tuple
+    try:
+        with timed(Tier.EMBEDDING, "create_many"):
+            response = client.embeddings.create(input=[texts[i] for i in indexes], model=model)
+        for item in response.data:
+            embeddings[indexes[item.index]] = item.embedding
+    except Exception:
+        logger.exception("Error generating embeddings")
+    return embeddings
+
+
+def embed_documents(collection: str, docs: List[Dict[str, Any]], force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Sets the embedding and its text hash on the documents whose embedded text changed since their embedding
+    was generated, with one embedding request.
+
+    :param docs: Complete documents of `collection`, updated in place.
+    :param force: Embed every document with a text, e.g. after switching the embedding model.
+    :return: The embedded documents.
+    """
+    texts: List[Optional[str]] = []
+    for doc in docs:
+        text = embedding_text(collection, doc)
+        texts.append(text if force or doc.get(EMBEDDING_HASH_ATTRIBUTE) != embedding_hash(text) else None)
+
+    embedded = []
+    for doc, text, embedding in zip(docs, texts, generate_embeddings(texts)):
+        if embedding:
+            doc["embedding"] = embedding
+            doc[EMBEDDING_HASH_ATTRIBUTE] = embedding_hash(text)
+            embedded.append(doc)
+    return embedded
@@ -0,0 +1,90 @@
+import hashlib
+from typing import Any, Callable, Dict, FrozenSet, Optional, Type
+
+from pydantic import BaseModel
+
+from omni_python_library.models.osint import (
+    EventMainData,
+    OrganizationMainData,
+    PersonMainData,
+    SourceMainData,
+    WebsiteMainData,
+)
+from omni_python_library.utils.config_registry import EntityNameConstant
+
+# Document attribute holding the hash of the text the embedding of the document was generated from
+EMBEDDING_HASH_ATTRIBUTE = "embedding_hash"
+
+# Each entity is embedded from a text built out of a few of its fields. `data` is the entity or its main data.
+
+
+def event_text(data: Any) -> str:
+    parts = [data.title, data.description, data.type]
+    if data.location:
+        parts.append(str(data.location.model_dump()))
+    return " ".join([str(p) for p in parts if p])
+
+
+def source_text(data: Any) -> str:
+    return f"{data.title} {data.description} {data.name} {data.url}"
+
+
+def person_text(data: Any) -> str:
+    aliases = " ".join(data.aliases) if data.aliases else ""
+    return f"{data.name} {data.role} {data.nationality} {aliases}"
+
+
+def organization_text(data: Any) -> str:
+    tags = " ".join(data.tags) if data.tags else ""
+    return f"{data.name} {data.type} {tags}"
+
+
+def website_text(data: Any) -> str:
+    return f"{data.title} {data.description} {data.url}"
+
+
+EMBEDDING_TEXT: Dict[str, Callable[[Any], str]] = {
+    EntityNameConstant.EVENT: event_text,
+    EntityNameConstant.SOURCE: source_text,
+    EntityNameConstant.PERSON: person_text,
+    EntityNameConstant.ORGANIZATION: organization_text,
+    EntityNameConstant.WEBSITE: website_text,
+}
+
+# The fields read by each text builder: updates touching none of them keep the embedding as is
+EMBEDDING_FIELDS: Dict[str, FrozenSet[str]] = {
+    EntityNameConstant.EVENT: frozenset({"title", "description", "type", "location"}),
+    EntityNameConstant.SOURCE: frozenset({"title", "description", "name", "url"}),
+    EntityNameConstant.PERSON: frozenset({"name", "role", "nationality", "aliases"}),
+    EntityNameConstant.ORGANIZATION: frozenset({"name", "type", "tags"}),
+    EntityNameConstant.WEBSITE: frozenset({"title", "description", "url"}),
+}
+
+_MAIN_DATA: Dict[str, Type[BaseModel]] = {
+    EntityNameConstant.EVENT: EventMainData,
+    EntityNameConstant.SOURCE: SourceMainData,
+    EntityNameConstant.PERSON: PersonMainData,
+    EntityNameConstant.ORGANIZATION: OrganizationMainData,
+    EntityNameConstant.WEBSITE: WebsiteMainData,
+}
+
+
+def embedding_text(collection: str, data: Any) -> Optional[str]:
+    """
+    Returns the text embedded for an entity of `collection`, or None for collections without embeddings.
+
+    :param data: The entity, its main data, or its document.
+    """
+    builder = EMBEDDING_TEXT.get(collection)
+    if not builder:
+        return None
+    if isinstance(data, dict):
+        data = _MAIN_DATA[collection](**data)
+    return builder(data)
+
+
+def embedding_hash(text: Optional[str]) -> Optional[str]:
+    """
+    Returns the hash stored next to an embedding, to detect when the embedded text changed.
+    """
+    return hashlib.sha256(text.encode()).hexdigest() if text else None
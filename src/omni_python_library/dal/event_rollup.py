@@ -0,0 +1,207 @@
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.models.aggregation import HistogramDimension, HistogramInterval
+from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_MS = {
+    HistogramInterval.HOUR: 3_600_000,
+    HistogramInterval.DAY: 86_400_000,
+    HistogramInterval.WEEK: 604_800_000,
+}
+# Buckets are aligned to UTC, weeks start on Monday (1970-01-05)
+INTERVAL_OFFSET_MS = {
+    HistogramInterval.HOUR: 0,
+    HistogramInterval.DAY: 0,
+    HistogramInterval.WEEK: 4 * 86_400_000,
+}
+
+# AQL expressions of the values an event is counted under for each dimension. Empty values are skipped.
+DIMENSION_VALUES = {
+    HistogramDimension.COUNTRY_CODE: "[doc.location.country_code]",
+    HistogramDimension.TYPE: "[doc.type]",
+    HistogramDimension.TAGS: "UNIQUE(IS_ARRAY(doc.tags) ? doc.tags : [])",
+}
+
+# Rollup documents of the dimension "" hold the total count of each bucket
+TOTAL = ""
+
+_UPSERT = """
+FOR c IN @changes
+    UPSERT { _key: c.doc._key }
+    INSERT MERGE(c.doc, { count: c.delta })
+    UPDATE { count: OLD.count + c.delta }
+    IN @@rollup
+    OPTIONS { exclusive: true }
+"""
+
+
+def bucket_start(timestamp: int, interval: HistogramInterval) -> int:
+    """
+    Returns the start timestamp of the `interval` bucket containing `timestamp`.
+    """
+    width, offset = INTERVAL_MS[interval], INTERVAL_OFFSET_MS[interval]
+    return (int(timestamp) - offset) // width * width + offset
+
+
+def bucket_expression(interval: HistogramInterval, timestamp: str = "doc.happened_at") -> str:
+    """
+    Returns the AQL expression computing the same bucket as `bucket_start`.
+    """
+    width, offset = INTERVAL_MS[interval], INTERVAL_OFFSET_MS[interval]
+    return f"FLOOR(({timestamp} - {offset}) / {width}) * {width} + {offset}"
+
+
+def rollup_key(interval: str, dimension: str, bucket: int, value: str) -> str:
+    return hashlib.sha1(f"{interval}|{dimension}|{bucket}|{value}".encode()).hexdigest()
+
+
+def rollup_entries(doc: Optional[Dict[str, Any]]) -> Counter:
+    """
+    Returns the (interval, dimension, bucket, value) rollup entries an event document counts towards.
+    """
+    entries: Counter = Counter()
+    if not doc or doc.get("happened_at") is None:
+        return entries
+
+    values = [(TOTAL, "")]
+    country_code = (doc.get("location") or {}).get("country_code")
+    if country_code:
+        values.append((HistogramDimension.COUNTRY_CODE.value, country_code))
+    if doc.get("type"):
+        values.append((HistogramDimension.TYPE.value, doc["type"]))
+    tags = doc.get("tags") if isinstance(doc.get("tags"), list) else []
+    for tag in set(tags):
+        if tag:
+            values.append((HistogramDimension.TAGS.value, tag))
+
+    for interval in HistogramInterval:
+        bucket = bucket_start(doc["happened_at"], interval)
+        for dimension, value in values:
+            entries[(interval.value, dimension, bucket, value)] += 1
+    return entries
+
+
+def update_event_rollup(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+    """
+    Applies the change of an event document from `old` to `new` to the histogram rollup.
+
+    Pass `old=None` for a created event and `new=None` for a deleted one. Failures are logged and do not
+    fail the write; `rebuild_event_rollup` recomputes the rollup from the events.
+    """
+    update_event_rollups([(old, new)])
+
+
+def update_event_rollups(changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+    """
+    Applies the changes of several event documents to the histogram rollup with one query.
+
+    :param changes: (old, new) pairs as passed to `update_event_rollup`.
+    """
+    deltas: Counter = Counter()
+    for old, new in changes:
+        deltas.update(rollup_entries(new))
+        deltas.subtract(rollup_entries(old))
+    entries = []
+    for (interval, dimension, bucket, value), delta in deltas.items():
+        if not delta:
+            continue
+        doc = {
+            "_key": rollup_key(interval, dimension, bucket, value),
+            "interval": interval,
+            "dimension": dimension,
+            "bucket": bucket,
+            "value": value,
+        }
+        entries.append({"doc": doc, "delta": delta})
+    if not entries:
+        return
+
+    logger.debug(f"Updating {len(entries)} event rollup entries")
+    try:
+        ArangoDBClient().execute(_UPSERT, bind_vars={"changes": entries, "@rollup": ArangoDBConstant.EVENT_ROLLUP})
+    except Exception:
+        logger.exception("Error updating event rollup")
+
+
+def rebuild_event_rollup(lock_timeout: Optional[int] = None, max_size: Optional[int] = None) -> None:
+    """
+    Recomputes the histogram rollup from all events, e.g. after a bulk import that bypassed the DAL.
+
+    The rows are replaced in one stream transaction holding an exclusive lock on the rollup. Readers see the
+    old rows until it commits, and the rollup updates of events written meanwhile wait for it, then apply on
+    top of the rebuilt rows, which were counted from the events of the transaction snapshot.
+
+    :param lock_timeout: Seconds to wait for the exclusive lock on the rollup.
+    :param max_size: Maximum transaction size in bytes, which must hold all the rollup rows.
+    """
+    transaction = ArangoDBClient().db.begin_transaction(
+        read=[EntityNameConstant.EVENT],
+        exclusive=[ArangoDBConstant.EVENT_ROLLUP],
+        lock_timeout=lock_timeout,
+        max_size=max_size,
+    )
+    try:
+        _rebuild_event_rollup(transaction)
+        transaction.commit_transaction()
+    except Exception:
+        logger.exception("Error rebuilding event rollup, aborting")
+        try:
+            transaction.abort_transaction()
+        except Exception:
+            logger.exception("Error aborting event rollup rebuild")
+        raise
+    logger.debug("Rebuilt event rollup")
+
+
+def _rebuild_event_rollup(transaction: Any) -> None:
+    transaction.aql.execute(
+        "FOR row IN @@rollup REMOVE row IN @@rollup", bind_vars={"@rollup": ArangoDBConstant.EVENT_ROLLUP}
+    )
+    for interval in HistogramInterval:
+        for dimension in [TOTAL, *HistogramDimension]:
+            values = DIMENSION_VALUES.get(dimension, '[""]')
+            dimension_name = dimension.value if dimension else TOTAL
+            query = f"""
+            FOR doc IN {EntityNameConstant.EVENT}
+                FILTER doc.happened_at != null
+                LET b = {bucket_expression(interval)}
+                FOR value IN {values}
+                    FILTER value != null AND (value != "" OR @dimension == "")
+                    COLLECT bucket = b, v = value WITH COUNT INTO count
+                    INSERT {{
+                        _key: SHA1(CONCAT_SEPARATOR("|", @interval, @dimension, bucket, v)),
+                        interval: @interval,
+                        dimension: @dimension,
+                        bucket,
+                        value: v,
+                        count
+                    }} INTO @@rollup
+            """
+            bind_vars = {
+                "interval": interval.value,
+                "dimension": dimension_name,
+                "@rollup": ArangoDBConstant.EVENT_ROLLUP,
+            }
+            transaction.aql.execute(query, bind_vars=bind_vars)
+
+
+def rollup_range(
+    interval: HistogramInterval, date_range: Optional[Tuple[Optional[int], Optional[int]]]
+) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Returns the bucket range covering exactly `date_range`, or None when its bounds are not bucket-aligned.
+
+    The end of `date_range` is inclusive, so an aligned range ends 1 ms before a bucket start.
+    """
+    start, end = date_range or (None, None)
+    if start is not None and bucket_start(start, interval) != start:
+        return None
+    if end is not None and bucket_start(end + 1, interval) != end + 1:
+        return None
+    return start, None if end is None else bucket_start(end, interval)
@@ -5,7 +5,7 @@ from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.dal.monitoring_source_data_destroyer import MonitoringSourceDataDestroyer
 from omni_python_library.dal.monitoring_source_data_factory import MonitoringSourceDataFactory
 from omni_python_library.dal.monitoring_source_data_mutator import MonitoringSourceDataMutator
-from omni_python_library.models.monitor import MonitoringSource
+from omni_python_library.models.monitor import MonitoringSource, SourceType
 from omni_python_library.utils.config_registry import EntityNameConstant
 
 logger = logging.getLogger(__name__)
@@ -39,7 +39,7 @@ class MonitoringSourceDataAccessLayer(
         """
         bind_vars = {"user_id": user_id}
         try:
-            cursor = ArangoDBClient().db.aql.execute(query, bind_vars=bind_vars)
+            cursor = ArangoDBClient().execute(query, bind_vars=bind_vars)
             results = []
             for doc in cursor:
                 if isinstance(doc, dict):
@@ -49,6 +49,36 @@ class MonitoringSourceDataAccessLayer(
             logger.exception("Error getting monitoring sources by user")
             raise
 
+    def list_monitoring_sources(
+        self, user_id: Optional[str] = None, source_type: Optional[SourceType] = None
+    ) -> List[MonitoringSource]:
+        logger.debug(f"Listing monitoring sources for user: {user_id}, type: {source_type}")
+        filters = []
+        bind_vars: Dict[str, Any] = {}
+        if user_id:
+            filters.append("FILTER doc.user_id == @user_id")
+            bind_vars["user_id"] = user_id
+        if source_type:
+            filters.append("FILTER doc.type == @type")
+            bind_vars["type"] = SourceType(source_type).value
+
+        filter_str = "\n".join(filters)
+        query = f"""
+            FOR doc IN {EntityNameConstant.MONITORING_SOURCE}
+                {filter_str}
+                RETURN doc
+        """
+        try:
+            cursor = ArangoDBClient().execute(query, bind_vars=bind_vars)
+            results = []
+            for doc in cursor:
+                if isinstance(doc, dict):
+                    results.append(MonitoringSource(**doc))
+            return results
+        except Exception:
+            logger.exception("Error listing monitoring sources")
+            raise
+
     def query_monitoring_sources(self, text: str, user_id: str, limit: int = 100) -> List[MonitoringSource]:
         logger.debug(f"Querying monitoring sources by text: {text} and user_id: {user_id}")
 
@@ -70,7 +100,7 @@ class MonitoringSourceDataAccessLayer(
 
         bind_vars = {"text": text, "user_id": user_id, "limit": limit}
         try:
-            cursor = ArangoDBClient().db.aql.execute(query, bind_vars=bind_vars)
+            cursor = ArangoDBClient().execute(query, bind_vars=bind_vars)
             results = []
             for doc in cursor:
                 if isinstance(doc, dict):
@@ -1,10 +1,11 @@
 import logging
 from typing import Any, Dict, List, Optional, Type, Union
 
-from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.clients.arangodb import EDGE_INDICES, ArangoDBClient, query_limits
 from omni_python_library.dal.osint_data_destroyer import OsintDataDestroyer
 from omni_python_library.dal.osint_data_factory import OsintDataFactory
 from omni_python_library.dal.osint_data_mutator import OsintDataMutator
+from omni_python_library.dal.query_cache import QueryCache
 from omni_python_library.models.osint import Event, Organization, Person, Relation, Source, Website
 from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
 
@@ -14,20 +15,41 @@ logger = logging.getLogger(__name__)
 class OsintDataAccessLayer(OsintDataFactory, OsintDataMutator, OsintDataDestroyer):
     def init(self):
         super().init()
+        QueryCache().init()
+        self.add_changes_listener(QueryCache().on_changes)
         client = ArangoDBClient()
         client.init_collection(EntityNameConstant.PERSON, indices=[("inverted", "name")], vector_index=True)
         client.init_collection(EntityNameConstant.ORGANIZATION, indices=[("inverted", "name")], vector_index=True)
-        client.init_collection(EntityNameConstant.WEBSITE, indices=[("persistent", "url")], vector_index=True)
-        client.init_collection(EntityNameConstant.SOURCE, indices=[("persistent", "url")], vector_index=True)
+        # url is the natural key of websites and sources, see upsert_website
+        url_index = ("persistent", "url", {"unique": True, "sparse": True})
+        client.init_collection(EntityNameConstant.WEBSITE, indices=[url_index], vector_index=True)
+        client.init_collection(EntityNameConstant.SOURCE, indices=[url_index], vector_index=True)
         client.init_collection(
             EntityNameConstant.EVENT,
             indices=[
-                ("inverted", "title"),
-                ("inverted", "description"),
-                ("persistent", "happened_at"),
+                # _key breaks ties of keyset pagination, see search_events_page
+                ("persistent", ["happened_at", "_key"]),
                 ("persistent", "location.country_code"),
+                ("geo", ["location.latitude", "location.longitude"]),
             ],
             vector_index=True,
+            vector_stored_values=["happened_at", "location.country_code"],
+        )
+        # Text search goes through the text_en inverted index of EVENT_SEARCH_VIEW, these identity-analyzer
+        # indexes from before it are not queried anymore but would still be updated on every event write
+        client.drop_indices(EntityNameConstant.EVENT, [("inverted", "title"), ("inverted", "description")])
+        client.init_collection(
+            ArangoDBConstant.EVENT_ROLLUP, indices=[("persistent", ["interval", "dimension", "bucket"])]
+        )
+        client.init_search_view(
+            ArangoDBConstant.EVENT_SEARCH_VIEW,
+            EntityNameConstant.EVENT,
+            fields=[
+                {"name": "title", "analyzer": "text_en", "features": ["frequency", "norm", "position"]},
+                {"name": "description", "analyzer": "text_en", "features": ["frequency", "norm", "position"]},
+                "happened_at",
+                "location.country_code",
+            ],
         )
         client.init_graph(
             ArangoDBConstant.EVENT_RELATED_GRAPH,
@@ -45,9 +67,19 @@ class OsintDataAccessLayer(OsintDataFactory, OsintDataMutator, OsintDataDestroye
                 else None
             ),
         )
+        # Edge collections created before EDGE_INDICES, or only ever read by this process, still need them:
+        # the neighborhood and event search lookups probe them instead of the _from/_to edge indexes
+        for name in client.get_edge_collection_names(refresh=True):
+            client.init_collection(name, edge=True, indices=EDGE_INDICES)
 
     def query(
-        self, query_str: str, bind_vars: Optional[Dict[str, Any]] = None
+        self,
+        query_str: str,
+        bind_vars: Optional[Dict[str, Any]] = None,
+        cache: bool = False,
+        cache_collections: Optional[List[str]] = None,
+        max_runtime: Optional[float] = None,
+        memory_limit: Optional[int] = None,
     ) -> List[Union[Relation, Event, Source, Person, Organization, Website]]:
         """
         Executes an AQL query and returns a list of strongly-typed OSINT objects.
@@ -68,6 +100,12 @@ class OsintDataAccessLayer(OsintDataFactory, OsintDataMutator, OsintDataDestroye
             results = dal.query(query_str, bind_vars={"name": "John Doe"})
 
         :param bind_vars: Optional dictionary of bind variables to substitute into the query string.
+        :param cache: Whether to serve the results from the query cache while the collections the query
+                      reads are unchanged, see `QueryCache`.
+        :param cache_collections: Collections the query reads, for queries whose plan does not list all of
+                                  them (DOCUMENT() calls). Defaults to the collections of the query plan.
+        :param max_runtime: Maximum runtime of the query in seconds, see `query_limits`.
+        :param memory_limit: Maximum memory of the query in bytes.
         :return: A list of mapped objects (Relation, Person, Organization, Website, Source, or Event).
                  Documents that do not match the expected schema or collection types are skipped.
         """
@@ -75,29 +113,17 @@ class OsintDataAccessLayer(OsintDataFactory, OsintDataMutator, OsintDataDestroye
         if bind_vars is None:
             bind_vars = {}
         try:
-            cursor = ArangoDBClient().db.aql.execute(query_str, bind_vars=bind_vars)
-            results = []
-
-            for doc in cursor:
-                if not isinstance(doc, dict):
-                    continue
-
-                if "_from" in doc and "_to" in doc:
-                    results.append(Relation(**doc))
-                    continue
-
-                if "_id" in doc:
-                    col_name, _ = ArangoDBClient().parse_id(doc["_id"])
-                    if col_name == "person":
-                        results.append(Person(**doc))
-                    elif col_name == "organization":
-                        results.append(Organization(**doc))
-                    elif col_name == "website":
-                        results.append(Website(**doc))
-                    elif col_name == "source":
-                        results.append(Source(**doc))
-                    elif col_name == "event":
-                        results.append(Event(**doc))
+            with query_limits(max_runtime, memory_limit):
+                if cache:
+                    cursor = QueryCache().execute(query_str, bind_vars, cache_collections)
+                else:
+                    cursor = ArangoDBClient().execute(query_str, bind_vars=bind_vars)
+                results = []
+
+                for doc in cursor:
+                    result = self.parse_document(doc)
+                    if result is not None:
+                        results.append(result)
 
             logger.debug(f"Query returned {len(results)} results")
             return results
@@ -105,6 +131,33 @@ class OsintDataAccessLayer(OsintDataFactory, OsintDataMutator, OsintDataDestroye
             logger.exception("Error executing query")
             raise
 
+    def parse_document(self, doc: Any) -> Optional[Union[Relation, Event, Source, Person, Organization, Website]]:
+        """
+        Maps an ArangoDB document to its OSINT model, see `query` for the expected schema.
+
+        :param doc: The document.
+        :return: The mapped object, or None if the document does not match a supported type.
+        """
+        if not isinstance(doc, dict):
+            return None
+
+        if "_from" in doc and "_to" in doc:
+            return Relation(**doc)
+
+        if "_id" in doc:
+            col_name, _ = ArangoDBClient().parse_id(doc["_id"])
+            if col_name == "person":
+                return Person(**doc)
+            elif col_name == "organization":
+                return Organization(**doc)
+            elif col_name == "website":
+                return Website(**doc)
+            elif col_name == "source":
+                return Source(**doc)
+            elif col_name == "event":
+                return Event(**doc)
+        return None
+
     def get_relation(self, id: str) -> Optional[Relation]:
         return self._get(Relation, id)
 
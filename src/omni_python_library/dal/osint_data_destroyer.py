@@ -1,33 +1,215 @@
 import logging
+from typing import Any, Dict, List, Optional, Tuple
 
 from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.bulk import (
+    DEFAULT_BATCH_SIZE,
+    ProgressCallback,
+    batched,
+    group_by_collection,
+    match_ids,
+    report_progress,
+)
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import Change, ChangeNotifier
+from omni_python_library.dal.event_rollup import update_event_rollup, update_event_rollups
+from omni_python_library.models.bulk import BulkResult
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.instrumentation import timed
 
 logger = logging.getLogger(__name__)
 
+# Removes the edges of collection `i` from or to the vertices `@ids`. Each edge collection is read, then
+# modified, in its own subquery, as AQL does not allow reading a collection after modifying it.
+_REMOVE_EDGES = """
+LET removed_{i} = (
+    FOR key IN UNION_DISTINCT(
+        (FOR id IN @ids FOR e IN @@edges_{i} FILTER e._from == id RETURN e._key),
+        (FOR id IN @ids FOR e IN @@edges_{i} FILTER e._to == id RETURN e._key)
+    )
+        REMOVE key IN @@edges_{i}
+        RETURN OLD
+)
+"""
 
-class OsintDataDestroyer(Cacher):
+
+class OsintDataDestroyer(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
-    def delete_entity(self, id: str) -> bool:
-        col_name, key = ArangoDBClient().parse_id(id)
-        return self._delete(col_name, key)
+    def delete_entity(self, id: str, cascade: bool = True) -> bool:
+        """
+        Deletes an entity.
+
+        :param cascade: Also delete the relations from and to the entity, which would be left dangling.
+        """
+        if not cascade:
+            col_name, key = ArangoDBClient().parse_id(id)
+            return self._delete(col_name, key)
+        return id in self.delete_many([id]).ids
 
     def delete_relation(self, id: str) -> bool:
         col_name, key = ArangoDBClient().parse_id(id)
         return self._delete(col_name, key)
 
+    def delete_many(
+        self,
+        ids: List[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+        cascade: bool = True,
+    ) -> BulkResult:
+        """
+        Deletes many entities or relations, each batch with one request per collection and one Redis round trip.
+
+        :param ids: The IDs of the documents.
+        :param batch_size: Number of documents deleted per request.
+        :param progress: Called with the progress after each batch.
+        :param cascade: Also delete the relations from and to the deleted entities, with one query per batch.
+                        They are deleted before the entities, so a failed request never leaves them dangling.
+        :return: The deleted IDs and the errors of the documents that could not be deleted.
+        """
+        result = BulkResult()
+        for batch in batched(ids, batch_size):
+            changes: Dict[str, List[Change]] = {}
+            if cascade:
+                try:
+                    incident = self._delete_incident_edges(batch)
+                except Exception as e:
+                    logger.exception(f"Error deleting the relations of {len(batch)} documents")
+                    result.errors.update({id: str(e) for id in batch})
+                    report_progress(progress, result, len(ids))
+                    continue
+                requested = set(batch)
+                for edge_col, edge_changes in incident.items():
+                    changes[edge_col] = edge_changes
+                    for old, _ in edge_changes:
+                        # Relations of the batch linking other entities of the batch are deleted here already
+                        (result.ids if old["_id"] in requested else result.cascaded).append(old["_id"])
+                removed = {old["_id"] for edge_changes in incident.values() for old, _ in edge_changes}
+                batch = [id for id in batch if id not in removed]
+
+            for col_name, entries in group_by_collection([(id, None) for id in batch]).items():
+                deleted = self._delete_batch(col_name, [(id, key) for id, key, _ in entries], result)
+                changes.setdefault(col_name, []).extend(deleted)
+
+            self.expel_many([old["_id"] for col_changes in changes.values() for old, _ in col_changes])
+            for col_name, col_changes in changes.items():
+                self._notify_changes(col_name, col_changes)
+            report_progress(progress, result, len(ids))
+        return result
+
+    def delete_where(
+        self,
+        collection: str,
+        filters: Optional[Dict[str, Any]] = None,
+        related_to: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+        cascade: bool = True,
+    ) -> BulkResult:
+        """
+        Deletes all the documents of `collection` matching the filters, see `match_ids`.
+
+        Example:
+            dal.delete_where("event", related_to="source/123")
+        """
+        return self.delete_many(match_ids(collection, filters, related_to), batch_size, progress, cascade)
+
+    def delete_dangling_relations(self) -> int:
+        """
+        Deletes the relations whose source or target entity no longer exists, e.g. left behind by deletes
+        made without cascade.
+
+        :return: The number of deleted relations.
+        """
+        count = 0
+        for edge_col in ArangoDBClient().get_edge_collection_names(refresh=True):
+            query = """
+            FOR e IN @@edges
+                FILTER DOCUMENT(e._from) == null OR DOCUMENT(e._to) == null
+                REMOVE e IN @@edges
+                RETURN OLD
+            """
+            with timed(Tier.ARANGO, "delete_many"):
+                # Scans whole edge collections, so the default query time budget does not apply
+                olds = list(ArangoDBClient().execute(query, bind_vars={"@edges": edge_col}, max_runtime=None))
+            if olds:
+                self.expel_many([old["_id"] for old in olds])
+                self._notify_changes(edge_col, [(old, None) for old in olds])
+                count += len(olds)
+        logger.debug(f"Deleted {count} dangling relations")
+        return count
+
+    def _delete_batch(self, col_name: str, entries: List[Tuple[str, str]], result: BulkResult) -> List[Change]:
+        collection = ArangoDBClient().get_collection(col_name)
+        try:
+            with timed(Tier.ARANGO, "delete_many"):
+                metas = collection.delete_many([{"_key": key} for _, key in entries], return_old=True)
+        except Exception as e:
+            logger.exception(f"Error deleting {len(entries)} documents of {col_name}")
+            result.errors.update({id: str(e) for id, _ in entries})
+            return []
+
+        changes = []
+        for (id, _), meta in zip(entries, metas):
+            if isinstance(meta, Exception):
+                logger.debug(f"Error deleting document {id}: {meta}")
+                result.errors[id] = str(meta)
+                continue
+            result.ids.append(id)
+            changes.append((meta["old"], None))
+
+        if col_name == EntityNameConstant.EVENT:
+            update_event_rollups(changes)
+        return changes
+
+    def _delete_incident_edges(self, ids: List[str]) -> Dict[str, List[Change]]:
+        """
+        Deletes the relations from and to the given entities with one query, using the edge index of each edge
+        collection that can link them. Edge collections are named `<from>_<relation>_<to>`.
+
+        :return: The deletions by edge collection.
+        """
+        vertex_cols = {ArangoDBClient().parse_id(id)[0] for id in ids}
+        edge_cols = [
+            name
+            for name in ArangoDBClient().get_edge_collection_names(refresh=True)
+            if any(name.startswith(f"{col}_") or name.endswith(f"_{col}") for col in vertex_cols)
+        ]
+        if not edge_cols:
+            return {}
+
+        bind_vars: Dict[str, Any] = {"ids": ids}
+        for i, name in enumerate(edge_cols):
+            bind_vars[f"@edges_{i}"] = name
+        removed = ", ".join(f"removed_{i}" for i in range(len(edge_cols)))
+        query = "".join(_REMOVE_EDGES.format(i=i) for i in range(len(edge_cols)))
+        query += f"FOR old IN FLATTEN([{removed}]) RETURN old"
+
+        with timed(Tier.ARANGO, "delete_many"):
+            olds = ArangoDBClient().execute(query, bind_vars=bind_vars)
+        changes: Dict[str, List[Change]] = {}
+        for old in olds:
+            changes.setdefault(ArangoDBClient().parse_id(old["_id"])[0], []).append((old, None))
+        logger.debug(f"Deleted {sum(map(len, changes.values()))} relations of {len(ids)} entities")
+        return changes
+
     def _delete(self, col_name: str, key: str) -> bool:
         logger.debug(f"Internal delete: col={col_name}, key={key}")
         collection = ArangoDBClient().get_collection(col_name)
 
         # Delete from Arango
         try:
-            collection.delete({"_key": key})
+            with timed(Tier.ARANGO, "delete"):
+                meta = collection.delete({"_key": key}, return_old=True)
+            if collection.name == EntityNameConstant.EVENT:
+                update_event_rollup(meta["old"], None)
 
             # Delete from cache
             self.expel(f"{collection.name}/{key}")
+            self._notify_change(collection.name, meta["old"], None)
 
             return True
         except Exception:
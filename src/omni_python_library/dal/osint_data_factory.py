@@ -1,9 +1,30 @@
+import json
 import logging
-from typing import Any, List, Optional, Type, Union
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
 
-from omni_python_library.clients.arangodb import ArangoDBClient
-from omni_python_library.clients.openai import OpenAIClient
+from arango.collection import StandardCollection
+from arango.exceptions import AQLQueryExecuteError
+
+from omni_python_library.clients.arangodb import UNIQUE_CONSTRAINT_VIOLATED, ArangoDBClient, SerializedDocument
+from omni_python_library.dal.bulk import DEFAULT_BATCH_SIZE
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import ChangeNotifier
+from omni_python_library.dal.embedder import embed_documents, generate_embedding, generate_embeddings
+from omni_python_library.dal.embedding_text import (
+    EMBEDDING_HASH_ATTRIBUTE,
+    embedding_hash,
+    embedding_text,
+    event_text,
+    organization_text,
+    person_text,
+    source_text,
+    website_text,
+)
+from omni_python_library.dal.event_rollup import update_event_rollup, update_event_rollups
+from omni_python_library.dal.unit_of_work import UnitOfWork
+from omni_python_library.models.bulk import UpsertResult
+from omni_python_library.models.common import ArangoData
+from omni_python_library.models.instrumentation import Tier
 from omni_python_library.models.osint import (
     Event,
     EventMainData,
@@ -18,17 +39,46 @@ from omni_python_library.models.osint import (
     Website,
     WebsiteMainData,
 )
-from omni_python_library.utils.config_registry import LLMConstant
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.instrumentation import timed
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE, relation_weight
 
 logger = logging.getLogger(__name__)
 
+EntityMainData = Union[EventMainData, SourceMainData, PersonMainData, OrganizationMainData, WebsiteMainData]
+
+# Fields of the models set from the ArangoDB system attributes, ignored in the data of new documents
+_SYSTEM_FIELDS = {"id", "key", "rev"}
+
+# Inserts documents with keys, leaving those whose key exists untouched: NEW is null for them
+_INSERT_KEYED = """
+FOR doc IN @docs
+    INSERT doc INTO @@collection OPTIONS { overwriteMode: "ignore", ignoreErrors: true }
+    RETURN { key: doc._key, rev: NEW._rev }
+"""
+_EXISTING_REVS = """
+FOR key IN @keys
+    LET doc = DOCUMENT(@collection, key)
+    FILTER doc != null
+    RETURN [key, doc._rev]
+"""
+
+# Collection of each entity main data model, see `ingest`
+_ENTITY_COLLECTIONS = {
+    EventMainData: EntityNameConstant.EVENT,
+    SourceMainData: EntityNameConstant.SOURCE,
+    PersonMainData: EntityNameConstant.PERSON,
+    OrganizationMainData: EntityNameConstant.ORGANIZATION,
+    WebsiteMainData: EntityNameConstant.WEBSITE,
+}
+
 
-class OsintDataFactory(Cacher):
+class OsintDataFactory(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
     def create_relation(self, data: RelationMainData, owner: str) -> Relation:
-        logger.debug(f"Creating relation: {data} with owner: {owner}")
+        logger.debug(f"Creating relation {data.name} from {data.from_id} to {data.to_id} with owner: {owner}")
         src_col_name, _ = ArangoDBClient().parse_id(data.from_id)
         to_col_name, _ = ArangoDBClient().parse_id(data.to_id)
         collection = ArangoDBClient().get_edge_collection(
@@ -36,112 +86,329 @@ class OsintDataFactory(Cacher):
             from_coll=src_col_name,
             to_coll=to_col_name,
         )
+        return self._insert(Relation, collection, data, owner, {WEIGHT_ATTRIBUTE: relation_weight(data.confidence)})
 
-        relation_data = Relation(**data.model_dump(exclude_unset=True), owner=owner)
-
-        meta = collection.insert(relation_data.model_dump(by_alias=True, exclude_unset=True), return_new=True)
-        new_doc = meta["new"]
-        new_data = Relation(
-            id=new_doc["_id"],
-            key=new_doc["_key"],
-            rev=new_doc["_rev"],
-            from_id=new_doc["_from"],
-            to_id=new_doc["_to"],
-            **new_doc,
-        )
-        # Cache the new instance
-        self.set(new_data.id, new_data.model_dump(by_alias=True))
+    def unit_of_work(self, lock_timeout: Optional[int] = None, max_size: Optional[int] = None) -> UnitOfWork:
+        """
+        Returns a unit of work creating entities and relations in one transaction, see `UnitOfWork`.
 
-        return new_data
+        :param lock_timeout: Seconds to wait for the collection locks of the transaction.
+        :param max_size: Maximum transaction size in bytes.
+        """
+        return UnitOfWork(self, lock_timeout=lock_timeout, max_size=max_size)
 
     def create_event(self, data: EventMainData, owner: str) -> Event:
-        parts = [data.title, data.description, data.type]
-        if data.location:
-            parts.append(str(data.location.model_dump()))
-        text = " ".join([str(p) for p in parts if p])
-
-        return self._create(
-            Event,
-            Event(**data.model_dump(exclude_unset=True), owner=owner),
-            text,
-        )
+        return self._create(Event, data, owner, event_text(data))
 
     def create_source(self, data: SourceMainData, owner: str) -> Source:
-        text = f"{data.title} {data.description} {data.name} {data.url}"
-
-        return self._create(
-            Source,
-            Source(**data.model_dump(exclude_unset=True), owner=owner),
-            text,
-        )
+        return self._create(Source, data, owner, source_text(data))
 
     def create_person(self, data: PersonMainData, owner: str) -> Person:
-        aliases = " ".join(data.aliases) if data.aliases else ""
-        text = f"{data.name} {data.role} {data.nationality} {aliases}"
-
-        return self._create(
-            Person,
-            Person(**data.model_dump(exclude_unset=True), owner=owner),
-            text,
-        )
+        return self._create(Person, data, owner, person_text(data))
 
     def create_organization(self, data: OrganizationMainData, owner: str) -> Organization:
-        tags = " ".join(data.tags) if data.tags else ""
-        text = f"{data.name} {data.type} {tags}"
-
-        return self._create(
-            Organization,
-            Organization(**data.model_dump(exclude_unset=True), owner=owner),
-            text,
-        )
+        return self._create(Organization, data, owner, organization_text(data))
 
     def create_website(self, data: WebsiteMainData, owner: str) -> Website:
-        text = f"{data.title} {data.description} {data.url}"
-        return self._create(
-            Website,
-            Website(**data.model_dump(exclude_unset=True), owner=owner),
-            text,
-        )
+        return self._create(Website, data, owner, website_text(data))
+
+    def upsert_website(self, data: WebsiteMainData, owner: str) -> Website:
+        """
+        Creates the website with `data.url`, or updates the existing one with the fields set in `data`.
+        The embedding is only regenerated when the embedded fields change.
+        """
+        return self._upsert(Website, [data], owner)[0][0]
+
+    def upsert_source(self, data: SourceMainData, owner: str) -> Source:
+        """
+        Creates the source with `data.url`, or updates the existing one with the fields set in `data`.
+        The embedding is only regenerated when the embedded fields change.
+        """
+        return self._upsert(Source, [data], owner)[0][0]
+
+    def upsert_websites(self, items: List[WebsiteMainData], owner: str) -> UpsertResult:
+        return self._upsert(Website, items, owner)[1]
+
+    def upsert_sources(self, items: List[SourceMainData], owner: str) -> UpsertResult:
+        return self._upsert(Source, items, owner)[1]
+
+    def ingest(
+        self,
+        items: List[Union[EntityMainData, RelationMainData]],
+        owner: str,
+        embed: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        keys: Optional[List[str]] = None,
+        embeddings: Optional[List[Optional[List[float]]]] = None,
+    ) -> List[Optional[ArangoData]]:
+        """
+        Creates entities and relations for high-throughput ingestion. Each batch is embedded with one request
+        and written with one insert per collection, and the written documents are not sent back.
+
+        Unlike `create_*`, no model is built from the written documents and the cache is not populated: the
+        documents are read from ArangoDB on first access. The event rollup and the change listeners are
+        updated as usual.
+
+        :param items: Entity main data (EventMainData, SourceMainData, ...) and RelationMainData, in any mix.
+                      Relations can only link entities of earlier batches or existing ones.
+        :param owner: The owner of the created documents.
+        :param embed: Embed the entities. Pass False and call `reembed` later to defer the embedding requests.
+        :param batch_size: Number of items written per request.
+        :param keys: Document keys aligned with the items. An item whose key already exists is not written again
+                     and gets the handle of the existing document, without counting it in the event rollup or
+                     notifying it, which makes replaying a batch idempotent.
+        :param embeddings: Embeddings computed beforehand, aligned with the items. No embedding request is made
+                           when given.
+        :return: The id, key and revision of each created document, None for the items that failed.
+        """
+        handles: List[Optional[ArangoData]] = [None] * len(items)
+        edge_collections: Dict[Tuple[str, str, str], str] = {}
+        for start in range(0, len(items), batch_size):
+            groups: Dict[str, List[Tuple[int, Dict[str, Any], Optional[str]]]] = {}
+            for index in range(start, min(start + batch_size, len(items))):
+                collection, doc, text = self._ingest_doc(items[index], owner, edge_collections)
+                if keys is not None:
+                    doc["_key"] = keys[index]
+                if embeddings is not None:
+                    if embeddings[index]:
+                        doc["embedding"] = embeddings[index]
+                        doc[EMBEDDING_HASH_ATTRIBUTE] = embedding_hash(text)
+                    text = None
+                groups.setdefault(collection, []).append((index, doc, text if embed else None))
+            for collection, entries in groups.items():
+                self._ingest_batch(collection, entries, handles, keyed=keys is not None)
+        logger.debug(f"Ingested {sum(h is not None for h in handles)} of {len(items)} documents")
+        return handles
 
     def generate_embedding(self, text: Optional[str]) -> Union[List[float] | None]:
-        client_tuple = OpenAIClient().get_client(LLMConstant.EMBEDDING)
-        if not client_tuple or not text:
-            return None
+        return generate_embedding(text)
 
-        client, model = client_tuple
-        if not client:
-            return None
+    def generate_embeddings(self, texts: List[Optional[str]]) -> List[Optional[List[float]]]:
+        """
+        Embeds several texts in one request. Empty texts and failed requests yield None.
+        """
+        return generate_embeddings(texts)
 
+    def _ingest_doc(
+        self,
+        item: Union[EntityMainData, RelationMainData],
+        owner: str,
+        edge_collections: Dict[Tuple[str, str, str], str],
+    ) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        """
+        :param edge_collections: Edge collection names by (relation name, from collection, to collection),
+                                 filled as relations are met so each edge collection is set up once.
+        :return: The collection, the document and the embedded text of an item to ingest.
+        """
+        doc = item.model_dump(by_alias=True, exclude_unset=True)
+        doc["owner"] = owner
+        if isinstance(item, RelationMainData):
+            edge = (item.name, ArangoDBClient().parse_id(item.from_id)[0], ArangoDBClient().parse_id(item.to_id)[0])
+            if edge not in edge_collections:
+                edge_collections[edge] = ArangoDBClient().get_edge_collection(*edge).name
+            doc[WEIGHT_ATTRIBUTE] = relation_weight(item.confidence)
+            return edge_collections[edge], doc, None
+
+        for model_cls, collection in _ENTITY_COLLECTIONS.items():
+            if isinstance(item, model_cls):
+                return collection, doc, embedding_text(collection, item)
+        raise TypeError(f"Cannot ingest {type(item).__name__}")
+
+    def _ingest_batch(
+        self,
+        collection: str,
+        entries: List[Tuple[int, Dict[str, Any], Optional[str]]],
+        handles: List[Optional[ArangoData]],
+        keyed: bool = False,
+    ):
+        """
+        :param keyed: The documents have keys, and those already existing are left as they are.
+        """
+        texts = [text for _, _, text in entries]
+        if any(texts):
+            for (_, doc, text), embedding in zip(entries, self.generate_embeddings(texts)):
+                if embedding:
+                    doc["embedding"] = embedding
+                    doc[EMBEDDING_HASH_ATTRIBUTE] = embedding_hash(text)
+
+        docs = [doc for _, doc, _ in entries]
+        with timed(Tier.ARANGO, "insert_many"):
+            if keyed:
+                metas = self._insert_keyed(collection, docs)
+            else:
+                metas = ArangoDBClient().get_collection(collection).insert_many(docs)
+
+        changes = []
+        for (index, doc, _), meta in zip(entries, metas):
+            if isinstance(meta, Exception):
+                logger.warning(f"Error ingesting item {index} into {collection}: {meta}")
+                continue
+            handles[index] = ArangoData(id=meta["_id"], key=meta["_key"], rev=meta["_rev"])
+            if meta.get("existing"):
+                continue
+            doc.update(_id=meta["_id"], _key=meta["_key"], _rev=meta["_rev"])
+            changes.append((None, doc))
+
+        if collection == EntityNameConstant.EVENT:
+            update_event_rollups(changes)
+        self._notify_changes(collection, changes)
+
+    def _insert_keyed(self, collection: str, docs: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Inserts documents with keys in one query, skipping those whose key exists.
+
+        :return: The metadata of each document, flagged "existing" when it was skipped, or the error of the
+                 documents neither inserted nor existing, e.g. for violating a unique index.
+        """
+        rows = ArangoDBClient().execute(_INSERT_KEYED, bind_vars={"docs": docs, "@collection": collection})
+        revs = {row["key"]: row["rev"] for row in rows}
+        skipped = [doc["_key"] for doc in docs if not revs.get(doc["_key"])]
+        existing = {}
+        if skipped:
+            existing = dict(
+                ArangoDBClient().execute(_EXISTING_REVS, bind_vars={"keys": skipped, "collection": collection})
+            )
+
+        metas: List[Union[Dict[str, Any], Exception]] = []
+        for doc in docs:
+            key = doc["_key"]
+            meta = {"_id": f"{collection}/{key}", "_key": key}
+            if revs.get(key):
+                metas.append({**meta, "_rev": revs[key]})
+            elif key in existing:
+                metas.append({**meta, "_rev": existing[key], "existing": True})
+            else:
+                metas.append(ValueError(f"Document {key} not inserted"))
+        return metas
+
+    def _upsert(
+        self, model_cls: Type[Union[Source, Website]], items: List[Any], owner: str
+    ) -> Tuple[List[Any], UpsertResult]:
+        """
+        Upserts documents by url with one lookup query, one batched embedding request and one UPSERT query.
+
+        Items with the same url are merged, later fields winning. `owner` is only set on created documents.
+        """
+        collection = ArangoDBClient().get_collection(model_cls.__name__.lower())
+        merged: Dict[str, Dict[str, Any]] = {}
+        for data in items:
+            if not data.url:
+                raise ValueError(f"Cannot upsert a {collection.name} without url")
+            merged.setdefault(data.url, {}).update(data.model_dump(by_alias=True, exclude_unset=True))
+        logger.debug(f"Upserting {len(merged)} {collection.name} documents with owner: {owner}")
+
+        existing = {
+            doc["url"]: doc
+            for doc in ArangoDBClient().execute(
+                "FOR doc IN @@collection FILTER doc.url IN @urls RETURN UNSET(doc, 'embedding')",
+                bind_vars={"@collection": collection.name, "urls": list(merged)},
+            )
+        }
+
+        # Embed created documents, and existing ones whose embedded text changed
+        docs = list(merged.values())
+        complete = [{**existing.get(doc["url"], {}), **doc} for doc in docs]
+        embedded = len(embed_documents(collection.name, complete))
+        for doc, complete_doc in zip(docs, complete):
+            if "embedding" in complete_doc:
+                doc["embedding"] = complete_doc["embedding"]
+                doc[EMBEDDING_HASH_ATTRIBUTE] = complete_doc[EMBEDDING_HASH_ATTRIBUTE]
+
+        query = """
+        FOR doc IN @docs
+            UPSERT { url: doc.url }
+            INSERT MERGE(doc, { owner: @owner })
+            UPDATE doc
+            IN @@collection
+            RETURN { old: OLD, new: NEW }
+        """
+        bind_vars = {"@collection": collection.name, "docs": docs, "owner": owner}
         try:
-            response = client.embeddings.create(input=text, model=model)
-            return response.data[0].embedding
-        except Exception:
-            logger.exception("Error generating embedding")
-            return None
+            with timed(Tier.ARANGO, "upsert"):
+                rows = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+        except AQLQueryExecuteError as e:
+            if e.error_code != UNIQUE_CONSTRAINT_VIOLATED:
+                raise
+            # A concurrent writer inserted one of the urls between the lookup and the insert: it is updated now
+            logger.debug(f"Retrying upsert of {collection.name} after a concurrent insert")
+            with timed(Tier.ARANGO, "upsert"):
+                rows = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+
+        instances = {}
+        for row in rows:
+            new_doc = row["new"]
+            instance = model_cls(**new_doc)
+            instances[instance.url] = instance
+            self.set(instance.id, instance.model_dump(by_alias=True))
+            self._notify_change(collection.name, row["old"], new_doc)
+
+        inserted = sum(1 for row in rows if row["old"] is None)
+        result = UpsertResult(
+            ids=[instances[data.url].id for data in items],
+            inserted=inserted,
+            updated=len(rows) - inserted,
+            embedded=embedded,
+        )
+        return [instances[data.url] for data in items], result
 
     def _create(
         self,
         model_cls: Type[Union[Event, Source, Person, Organization, Website]],
-        data: Union[Event, Source, Person, Organization, Website],
+        data: EntityMainData,
+        owner: str,
         text: Optional[str] = None,
     ) -> Any:
         collection = ArangoDBClient().get_collection(model_cls.__name__.lower())
-        logger.debug(f"Creating {collection.name}: {data} with owner: {data.owner}")
+        logger.debug(f"Creating {collection.name} with owner: {owner}")
 
         # Generate embedding
         embedding = self.generate_embedding(text)
+        stored = {"embedding": embedding, EMBEDDING_HASH_ATTRIBUTE: embedding_hash(text)} if embedding else {}
+        return self._insert(model_cls, collection, data, owner, stored)
+
+    def _insert(
+        self,
+        model_cls: Type[Union[Event, Source, Person, Organization, Website, Relation]],
+        collection: StandardCollection,
+        data: Union[EntityMainData, RelationMainData],
+        owner: str,
+        stored: Dict[str, Any],
+    ) -> Any:
+        """
+        Inserts a document built from one dump of `data`, and caches it without reading it back: the returned
+        instance is built from the fields of `data` and the system attributes returned by ArangoDB. The dump
+        is serialized once, that JSON is both the request body and the cached value.
 
-        # Insert into Arango
-        doc = data.model_dump(by_alias=True, exclude_unset=True)
-        if embedding:
-            doc["embedding"] = embedding
+        :param stored: Attributes stored with the document but not cached, e.g. the embedding.
+        """
+        doc = data.model_dump(by_alias=True, exclude_unset=True, exclude=_SYSTEM_FIELDS)
+        doc["owner"] = owner
+        serialized = json.dumps(doc)
 
-        meta = collection.insert(doc, return_new=True)
-        new_doc = meta["new"]
+        new_doc = {**doc, **stored}
+        with timed(Tier.ARANGO, "insert"):
+            meta = collection.insert(SerializedDocument(new_doc, _append_json(serialized, stored)))
+        system = {"_id": meta["_id"], "_key": meta["_key"], "_rev": meta["_rev"]}
+        doc.update(system)
+        new_doc.update(system)
+        if collection.name == EntityNameConstant.EVENT:
+            update_event_rollup(None, new_doc)
 
-        instance = model_cls(id=new_doc["_id"], key=new_doc["_key"], rev=new_doc["_rev"], **new_doc)
+        # Nested models of `data` are reused as is, pydantic does not revalidate model instances
+        fields = {name: getattr(data, name) for name in data.model_fields_set - _SYSTEM_FIELDS - {"owner"}}
+        instance = model_cls(**fields, owner=owner, id=meta["_id"], key=meta["_key"], rev=meta["_rev"])
 
         # Cache the new instance
-        self.set(instance.id, instance.model_dump(by_alias=True))
+        self.set(instance.id, doc, serialized=_append_json(serialized, system))
+        self._notify_change(collection.name, None, new_doc)
 
         return instance
+
+
+def _append_json(serialized: str, fields: Dict[str, Any]) -> str:
+    """
+    Appends attributes to a serialized, non-empty JSON object.
+    """
+    if not fields:
+        return serialized
+    return f"{serialized[:-1]}, {json.dumps(fields)[1:]}"
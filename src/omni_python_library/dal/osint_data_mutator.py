@@ -1,9 +1,28 @@
+import asyncio
 import logging
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from arango.collection import StandardCollection
+from arango.exceptions import DocumentRevisionError
+from pydantic import BaseModel
 
 from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.bulk import (
+    DEFAULT_BATCH_SIZE,
+    ProgressCallback,
+    batched,
+    group_by_collection,
+    match_ids,
+    report_progress,
+)
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import ChangeNotifier
+from omni_python_library.dal.embedder import embed_documents
+from omni_python_library.dal.embedding_text import EMBEDDING_FIELDS, EMBEDDING_HASH_ATTRIBUTE
+from omni_python_library.dal.event_rollup import update_event_rollup, update_event_rollups
+from omni_python_library.models.bulk import BulkResult
 from omni_python_library.models.common import Permissive
+from omni_python_library.models.instrumentation import Tier
 from omni_python_library.models.osint import (
     Event,
     EventMainData,
@@ -18,45 +37,220 @@ from omni_python_library.models.osint import (
     Website,
     WebsiteMainData,
 )
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.instrumentation import timed
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE, relation_weight
 
 logger = logging.getLogger(__name__)
 
+# Updates a batch without sending the embeddings back, which are neither needed nor cached
+_UPDATE_BATCH = """
+FOR patch IN @patches
+    UPDATE patch IN @@collection OPTIONS { mergeObjects: true, ignoreErrors: true }
+    RETURN { old: UNSET(OLD, "embedding"), new: UNSET(NEW, "embedding") }
+"""
+
 
-class OsintDataMutator(Cacher):
+class OsintDataMutator(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
     def update_relation(self, id: str, data: Union[RelationMainData, Permissive]) -> Relation:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        update = data.model_dump(exclude_unset=True)
+        if "confidence" in update:
+            update[WEIGHT_ATTRIBUTE] = relation_weight(update["confidence"])
+        final_data = self._update(col_name, key, update)
         return Relation(**final_data)
 
-    def update_event(self, id: str, data: Union[EventMainData, Permissive]) -> Event:
+    def update_event(self, id: str, data: Union[EventMainData, Permissive], reembed: bool = True) -> Event:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True), reembed)
         return Event(**final_data)
 
-    def update_source(self, id: str, data: Union[SourceMainData, Permissive]) -> Source:
+    def update_source(self, id: str, data: Union[SourceMainData, Permissive], reembed: bool = True) -> Source:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True), reembed)
         return Source(**final_data)
 
-    def update_person(self, id: str, data: Union[PersonMainData, Permissive]) -> Person:
+    def update_person(self, id: str, data: Union[PersonMainData, Permissive], reembed: bool = True) -> Person:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True), reembed)
         return Person(**final_data)
 
-    def update_organization(self, id: str, data: Union[OrganizationMainData, Permissive]) -> Organization:
+    def update_organization(
+        self, id: str, data: Union[OrganizationMainData, Permissive], reembed: bool = True
+    ) -> Organization:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True), reembed)
         return Organization(**final_data)
 
-    def update_website(self, id: str, data: Union[WebsiteMainData, Permissive]) -> Website:
+    def update_website(self, id: str, data: Union[WebsiteMainData, Permissive], reembed: bool = True) -> Website:
         col_name, key = ArangoDBClient().parse_id(id)
-        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True))
+        final_data = self._update(col_name, key, data.model_dump(exclude_unset=True), reembed)
         return Website(**final_data)
 
-    def _update(self, col_name: str, key: str, data: Dict[str, Any]) -> Any:
+    def reembed(self, ids: List[str], batch_size: int = 64, force: bool = False) -> int:
+        """
+        Regenerates the embeddings of the given entities whose embedded text changed, e.g. after updates made
+        with `reembed=False`. Each batch of entities is embedded with one request and written with one request
+        per collection.
+
+        :param ids: The IDs of the entities. Relations and missing documents are skipped.
+        :param batch_size: Number of entities embedded per request.
+        :param force: Re-embed every entity, e.g. after switching the embedding model.
+        :return: The number of re-embedded entities.
+        """
+        query = "FOR id IN @ids LET doc = DOCUMENT(id) FILTER doc != null RETURN doc"
+        count = 0
+        for batch in batched(ids, batch_size):
+            docs = ArangoDBClient().execute(query, bind_vars={"ids": batch})
+            by_collection: Dict[str, List[Dict[str, Any]]] = {}
+            for doc in docs:
+                col_name, _ = ArangoDBClient().parse_id(doc["_id"])
+                if col_name in EMBEDDING_FIELDS:
+                    by_collection.setdefault(col_name, []).append(doc)
+
+            for col_name, col_docs in by_collection.items():
+                old_docs = {doc["_key"]: dict(doc) for doc in col_docs}
+                written = self._write_embeddings(col_name, embed_documents(col_name, col_docs, force))
+                self.set_many({doc["_id"]: doc for doc in written})
+                self._notify_changes(col_name, [(old_docs[doc["_key"]], doc) for doc in written])
+                count += len(written)
+        logger.debug(f"Re-embedded {count} of {len(ids)} entities")
+        return count
+
+    async def reembed_async(self, ids: List[str], batch_size: int = 64, force: bool = False) -> int:
+        """
+        Runs `reembed` in a worker thread, so that bulk updates made with `reembed=False` can return before
+        their embeddings are refreshed.
+        """
+        return await asyncio.to_thread(self.reembed, ids, batch_size, force)
+
+    def update_many(
+        self,
+        updates: Dict[str, Union[BaseModel, Dict[str, Any]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        reembed: bool = True,
+        progress: Optional[ProgressCallback] = None,
+    ) -> BulkResult:
+        """
+        Updates many documents, each batch with one request per collection and one Redis round trip.
+
+        :param updates: The fields to set by document ID, as main data models or dicts.
+        :param batch_size: Number of documents written per request.
+        :param reembed: Re-embed the entities whose embedded text changed. Pass False and call `reembed_async`
+                        to return before the embeddings are refreshed.
+        :param progress: Called with the progress after each batch.
+        :return: The updated IDs and the errors of the documents that could not be updated.
+        """
+        result = BulkResult()
+        items = list(updates.items())
+        for batch in batched(items, batch_size):
+            for col_name, entries in group_by_collection(batch).items():
+                self._update_batch(col_name, entries, reembed, result)
+            report_progress(progress, result, len(items))
+        return result
+
+    def update_where(
+        self,
+        collection: str,
+        data: Union[BaseModel, Dict[str, Any]],
+        filters: Optional[Dict[str, Any]] = None,
+        related_to: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        reembed: bool = True,
+        progress: Optional[ProgressCallback] = None,
+    ) -> BulkResult:
+        """
+        Sets the same fields on all the documents of `collection` matching the filters, see `match_ids`.
+
+        Example:
+            dal.update_where("event", {"tags": ["retracted"]}, related_to="source/123")
+        """
+        ids = match_ids(collection, filters, related_to)
+        return self.update_many({id: data for id in ids}, batch_size, reembed, progress)
+
+    def _update_batch(
+        self,
+        col_name: str,
+        entries: List[Tuple[str, str, Union[BaseModel, Dict[str, Any]]]],
+        reembed: bool,
+        result: BulkResult,
+    ):
+        patches = []
+        for _, key, data in entries:
+            patch = data.model_dump(exclude_unset=True) if isinstance(data, BaseModel) else dict(data)
+            if "confidence" in patch:
+                patch[WEIGHT_ATTRIBUTE] = relation_weight(patch["confidence"])
+            patches.append({**patch, "_key": key})
+
+        try:
+            with timed(Tier.ARANGO, "update_many"):
+                rows = ArangoDBClient().execute(_UPDATE_BATCH, bind_vars={"patches": patches, "@collection": col_name})
+                updated = {row["new"]["_key"]: row for row in rows}
+        except Exception as e:
+            logger.exception(f"Error updating {len(entries)} documents of {col_name}")
+            result.errors.update({id: str(e) for id, _, _ in entries})
+            return
+
+        changes = []
+        stale = []
+        for (id, key, _), patch in zip(entries, patches):
+            row = updated.get(key)
+            if row is None:
+                result.errors[id] = "Document not updated, it does not exist or violates a unique index"
+                continue
+            result.ids.append(id)
+            changes.append((row["old"], row["new"]))
+            if reembed and patch.keys() & EMBEDDING_FIELDS.get(col_name, frozenset()):
+                stale.append(row["new"])
+
+        if stale:
+            written = {doc["_key"] for doc in self._write_embeddings(col_name, embed_documents(col_name, stale))}
+            for old, new in changes:
+                # The new embeddings were only needed for the write, the cached documents leave them out
+                new.pop("embedding", None)
+                if new["_key"] not in written:
+                    new[EMBEDDING_HASH_ATTRIBUTE] = old.get(EMBEDDING_HASH_ATTRIBUTE)
+        if col_name == EntityNameConstant.EVENT:
+            update_event_rollups(changes)
+        self.set_many({new["_id"]: new for _, new in changes})
+        self._notify_changes(col_name, changes)
+
+    def _write_embeddings(self, col_name: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Writes the embeddings of documents with one request, unless they were updated meanwhile.
+
+        :return: The written documents, with their new revision.
+        """
+        if not docs:
+            return []
+        collection = ArangoDBClient().get_collection(col_name)
+        updates = [
+            {
+                "_key": doc["_key"],
+                "_rev": doc["_rev"],
+                "embedding": doc["embedding"],
+                EMBEDDING_HASH_ATTRIBUTE: doc[EMBEDDING_HASH_ATTRIBUTE],
+            }
+            for doc in docs
+        ]
+        with timed(Tier.ARANGO, "update_many"):
+            metas = collection.update_many(updates, merge=False)
+
+        written = []
+        for doc, meta in zip(docs, metas):
+            if isinstance(meta, DocumentRevisionError):
+                logger.debug(f"Skipping embedding of {doc['_id']} changed concurrently")
+            elif isinstance(meta, Exception):
+                logger.error(f"Error writing embedding of {doc['_id']}: {meta}")
+            else:
+                doc["_rev"] = meta["_rev"]
+                written.append(doc)
+        return written
+
+    def _update(self, col_name: str, key: str, data: Dict[str, Any], reembed: bool = True) -> Any:
         logger.debug(f"Internal update: col={col_name}, key={key}")
         try:
             collection = ArangoDBClient().get_collection(col_name)
@@ -65,16 +259,43 @@ class OsintDataMutator(Cacher):
             # return_new=True gives us the updated document
             update_doc = data.copy()
             update_doc["_key"] = key
-            meta = collection.update(update_doc, merge=True, return_new=True)
+            with timed(Tier.ARANGO, "update"):
+                meta = collection.update(update_doc, merge=True, return_new=True, return_old=True)
+            old_doc = meta["old"]
             updated_doc = meta["new"]
+            if collection.name == EntityNameConstant.EVENT:
+                update_event_rollup(old_doc, updated_doc)
             updated_doc["_id"] = meta["_id"]
             updated_doc["_key"] = meta["_key"]
             updated_doc["_rev"] = meta["_rev"]
 
+            # Re-embed only when a field of the embedded text was set and the text actually changed
+            if reembed and data.keys() & EMBEDDING_FIELDS.get(collection.name, frozenset()):
+                self._refresh_embedding(collection, old_doc, updated_doc)
+
             # Update cache
             self.set(updated_doc["_id"], updated_doc)
+            self._notify_change(collection.name, old_doc, updated_doc)
 
             return updated_doc
         except Exception:
             logger.exception(f"Error updating document {col_name}/{key}")
             raise
+
+    def _refresh_embedding(self, collection: StandardCollection, old_doc: Dict[str, Any], doc: Dict[str, Any]):
+        """
+        Re-embeds an updated document if its embedded text changed, unless it was updated again meanwhile.
+        """
+        if not embed_documents(collection.name, [doc]):
+            return
+        update = {"_key": doc["_key"], "_rev": doc["_rev"], "embedding": doc["embedding"]}
+        update[EMBEDDING_HASH_ATTRIBUTE] = doc[EMBEDDING_HASH_ATTRIBUTE]
+        try:
+            with timed(Tier.ARANGO, "update"):
+                meta = collection.update(update, merge=False, check_rev=True)
+            doc["_rev"] = meta["_rev"]
+        except DocumentRevisionError:
+            # The concurrent update re-embeds the text it wrote
+            logger.debug(f"Skipping embedding of {doc['_id']} changed concurrently")
+            doc["embedding"] = old_doc.get("embedding")
+            doc[EMBEDDING_HASH_ATTRIBUTE] = old_doc.get(EMBEDDING_HASH_ATTRIBUTE)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from cachetools import LRUCache
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.clients.redis import RedisClient
+from omni_python_library.dal.change_notifier import Change
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils.instrumentation import timed
+from omni_python_library.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of collection name -> version, bumped on every write through the data access layers
+VERSIONS_KEY = "aql:versions"
+RESULT_KEY_PREFIX = "aql:result:"
+
+# String literals and comments are kept verbatim, whitespace elsewhere is collapsed
+_LITERAL = re.compile(
+    r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`|´(?:\\.|[^´\\])*´|/\*.*?\*/|//[^\n]*", re.S
+)
+# DOCUMENT() calls and traversals read collections that the query plan does not necessarily list
+_DYNAMIC_READS = re.compile(
+    r"\bDOCUMENT\s*\(|\bIN\s+(?:\S+\s*\.\.\s*\S+\s+)?(?:OUTBOUND|INBOUND|ANY)\b|\b(?:K_)?(?:SHORTEST_PATHS?|PATHS)\b",
+    re.I,
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Collapses the whitespace of an AQL query outside of string literals, so that queries differing only
+    in indentation share their cache entries.
+    """
+    parts = []
+    position = 0
+    for match in _LITERAL.finditer(query):
+        parts.append(" ".join(query[position : match.start()].split()))
+        if not match.group().startswith(("/*", "//")):
+            parts.append(match.group())
+        position = match.end()
+    parts.append(" ".join(query[position:].split()))
+    return " ".join(part for part in parts if part)
+
+
+def query_key(query: str, bind_vars: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps([normalize_query(query), bind_vars or {}], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class QueryCache(Singleton):
+    """
+    Caches AQL query results, invalidated by per-collection version counters instead of TTLs.
+
+    Every entry records the versions of the collections the query reads at the time it was executed.
+    It is served only while all those versions are unchanged, and the data access layers bump the version of
+    a collection on each create, update and delete. Entries are stored in Redis, shared by all processes,
+    and in a local LRU that still checks the versions in Redis on every read.
+    """
+
+    def init(self, ttl: int = 86_400, local_size: int = 256):
+        """
+        :param ttl: Seconds to keep entries in Redis. Only bounds memory, stale entries are never served.
+        :param local_size: Number of entries kept in process.
+        """
+        self._ttl = ttl
+        self._local: LRUCache = LRUCache(maxsize=local_size)
+        self._plan_collections: LRUCache = LRUCache(maxsize=1024)
+
+    def execute(
+        self, query: str, bind_vars: Optional[Dict[str, Any]] = None, collections: Optional[Sequence[str]] = None
+    ) -> List[Any]:
+        """
+        Returns the results of an AQL query, from the cache when none of its collections changed.
+
+        :param query: The AQL query string.
+        :param bind_vars: Bind variables of the query.
+        :param collections: Collections the query reads. Defaults to the collections of the query plan, in
+                            which case queries using DOCUMENT() or traversals are not cached.
+        :return: The raw query results.
+        """
+        bind_vars = bind_vars or {}
+        if collections is None:
+            collections = self._collections_of(query, bind_vars)
+            if collections is None:
+                return list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+        collections = sorted(set(collections))
+
+        key = RESULT_KEY_PREFIX + query_key(query, bind_vars)
+        # Versions are read before executing, so a write during execution invalidates the stored entry
+        try:
+            versions = self.versions(collections)
+        except Exception:
+            logger.exception("Error reading query cache versions, executing without cache")
+            return list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+
+        entry = self._get(key, versions)
+        if entry is not None:
+            logger.debug(f"Query cache hit for {key}")
+            return entry["results"]
+
+        logger.debug(f"Query cache miss for {key}")
+        results = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+        self._set(key, {"versions": versions, "results": results})
+        return results
+
+    def versions(self, collections: Sequence[str]) -> Dict[str, int]:
+        if not collections:
+            return {}
+        with timed(Tier.REDIS, "hmget"):
+            values = RedisClient().client.hmget(VERSIONS_KEY, list(collections))
+        return {name: int(value or 0) for name, value in zip(collections, values)}
+
+    def bump(self, collection: str):
+        """
+        Invalidates the cached results of every query reading `collection`.
+        """
+        try:
+            with timed(Tier.REDIS, "hincrby"):
+                RedisClient().client.hincrby(VERSIONS_KEY, collection, 1)
+        except Exception:
+            logger.exception(f"Error bumping query cache version of {collection}")
+
+    def on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        self.bump(collection)
+
+    def on_changes(self, collection: str, changes: List[Change]):
+        self.bump(collection)
+
+    def _collections_of(self, query: str, bind_vars: Dict[str, Any]) -> Optional[List[str]]:
+        if _DYNAMIC_READS.search(query):
+            logger.debug("Not caching a query using DOCUMENT() without explicit collections")
+            return None
+
+        bound = sorted(str(v) for k, v in bind_vars.items() if k.startswith("@"))
+        plan_key = query_key(query, {"collections": bound})
+        if plan_key not in self._plan_collections:
+            plan = ArangoDBClient().db.aql.explain(query, bind_vars=bind_vars)
+            self._plan_collections[plan_key] = sorted({c["name"] for c in plan.get("collections", [])} | set(bound))
+        return self._plan_collections[plan_key]
+
+    def _get(self, key: str, versions: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry of `key` computed at `versions`, from the local LRU or else from Redis.
+        """
+        entry = self._local.get(key)
+        if entry is not None and entry["versions"] == versions:
+            return entry
+        try:
+            with timed(Tier.REDIS, "get"):
+                value = RedisClient().client.get(key)
+        except Exception:
+            logger.exception(f"Error reading query cache entry {key}")
+            return None
+        if not value:
+            return None
+        entry = json.loads(value)
+        if entry["versions"] != versions:
+            return None
+        self._local[key] = entry
+        return entry
+
+    def _set(self, key: str, entry: Dict[str, Any]):
+        self._local[key] = entry
+        try:
+            with timed(Tier.REDIS, "set"):
+                RedisClient().client.setex(key, self._ttl, json.dumps(entry))
+        except Exception:
+            logger.exception(f"Error writing query cache entry {key}")
@@ -1,4 +1,18 @@
-from omni_python_library.dal.query_tools.entity_neighborhood import search_entity_neighborhood
-from omni_python_library.dal.query_tools.event_search import search_events
+from omni_python_library.dal.query_tools.entity_neighborhood import (
+    explore_entity_neighborhood,
+    search_entity_neighborhood,
+)
+from omni_python_library.dal.query_tools.entity_paths import find_entity_paths
+from omni_python_library.dal.query_tools.event_histogram import event_histogram
+from omni_python_library.dal.query_tools.event_search import SearchMode, search_events
+from omni_python_library.dal.query_tools.event_tiles import aggregate_event_tiles
 
-__all__ = ["search_events", "search_entity_neighborhood"]
+__all__ = [
+    "SearchMode",
+    "aggregate_event_tiles",
+    "event_histogram",
+    "explore_entity_neighborhood",
+    "find_entity_paths",
+    "search_events",
+    "search_entity_neighborhood",
+]
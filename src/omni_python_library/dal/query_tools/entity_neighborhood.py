@@ -1,9 +1,18 @@
-from typing import Annotated, List, Union
+import base64
+import binascii
+import json
+import logging
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Union
 
 from pydantic import Field
 
-from omni_python_library.dal.osint_data_access_layer import EVENT_RELATED_GRAPH_NAME, OsintDataAccessLayer
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.graph import NeighborhoodPage
 from omni_python_library.models.osint import Event, Organization, Person, Relation, Source, Website
+from omni_python_library.utils.config_registry import ArangoDBConstant
+
+logger = logging.getLogger(__name__)
 
 
 def search_entity_neighborhood(
@@ -18,9 +27,233 @@ def search_entity_neighborhood(
     :return: A list of entities found 1 edge away.
     """
     query = f"""
-    FOR v, e IN 1..1 ANY @entity_id GRAPH '{EVENT_RELATED_GRAPH_NAME}'
+    FOR v, e IN 1..1 ANY @entity_id GRAPH '{ArangoDBConstant.EVENT_RELATED_GRAPH}'
         LIMIT @limit
         RETURN v
     """
 
     return OsintDataAccessLayer().query(query, bind_vars={"entity_id": entity_id, "limit": limit})
+
+
+def explore_entity_neighborhood(
+    entity_id: Annotated[str, Field(description="The ID of the entity to start the exploration from.")],
+    depth: Annotated[int, Field(description="Maximum number of hops from the entity.", ge=1, le=5)] = 2,
+    fan_out: Annotated[int, Field(description="Maximum number of new vertices per hop.", ge=1)] = 50,
+    type_limits: Annotated[
+        Optional[Dict[str, int]],
+        Field(description="Maximum number of new vertices per hop for each collection, 0 to skip a collection."),
+    ] = None,
+    prune_types: Annotated[
+        Optional[List[str]],
+        Field(description="Collections whose vertices are returned but not expanded further."),
+    ] = None,
+    min_confidence: Annotated[
+        Optional[int], Field(description="Only follow relations with at least this confidence.")
+    ] = None,
+    continuation: Annotated[
+        Optional[str], Field(description="Token of a previous page to continue the exploration.")
+    ] = None,
+) -> NeighborhoodPage:
+    """
+    Explores the entities up to `depth` relations away from the given entity, hop by hop.
+
+    Each hop expands the current frontier with one AQL query over the edge collections of the event graphs.
+    New vertices are ordered by id within each collection; at most `type_limits[collection]` (default
+    `fan_out`) are kept per collection, and the collections are interleaved until `fan_out` vertices are
+    kept, so a hub with thousands of sources still returns its persons. Vertices of `prune_types` are
+    returned but their neighbors are not explored, like a PRUNE condition of a traversal.
+
+    Vertices left out by the caps are returned by the next page: pass the returned `continuation` with the
+    same arguments. A vertex reachable over several paths can appear again in a later page.
+
+    :param entity_id: The ID of the entity to start the exploration from.
+    :param depth: Maximum number of hops from the entity.
+    :param fan_out: Maximum number of new vertices per hop.
+    :param type_limits: Maximum number of new vertices per hop for each collection, 0 to skip a collection.
+    :param prune_types: Collections whose vertices are returned but not expanded further.
+    :param min_confidence: Only follow relations with at least this confidence.
+    :param continuation: Token of a previous page to continue the exploration.
+    :return: A NeighborhoodPage with vertices, edges and the token of the next page.
+    """
+    if continuation:
+        pending = _decode_token(continuation, entity_id)
+    else:
+        pending = [{"hop": 1, "frontier": [entity_id], "visited": [entity_id], "after": {}}]
+
+    edge_definitions = _edge_definitions()
+    if not edge_definitions:
+        return NeighborhoodPage()
+
+    type_limits = type_limits or {}
+    prune = set(prune_types or [])
+    hops: Dict[str, int] = {}
+    edge_ids: List[str] = []
+
+    queue = [pending.pop(0)]
+    while queue:
+        task = queue.pop(0)
+        kept, after, truncated = _expand(task, edge_definitions, fan_out, type_limits, min_confidence)
+        if truncated:
+            pending.append({**task, "after": after})
+
+        for vertex_id, edges in kept:
+            hops.setdefault(vertex_id, task["hop"])
+            edge_ids.extend(edges)
+
+        frontier = [vertex_id for vertex_id, _ in kept if vertex_id.split("/")[0] not in prune]
+        if frontier and task["hop"] < depth:
+            visited = task["visited"] + [vertex_id for vertex_id, _ in kept]
+            queue.append({"hop": task["hop"] + 1, "frontier": frontier, "visited": visited, "after": {}})
+
+    page = NeighborhoodPage(hops=hops, continuation=_encode_token(entity_id, pending) if pending else None)
+    ids = list(hops) + list(dict.fromkeys(edge_ids))
+    query = """
+    FOR id IN @ids
+        LET doc = DOCUMENT(id)
+        FILTER doc != null
+        RETURN doc
+    """
+    for result in OsintDataAccessLayer().query(query, bind_vars={"ids": ids}):
+        if isinstance(result, Relation):
+            page.edges.append(result)
+        else:
+            page.vertices.append(result)
+    return page
+
+
+def _edge_definitions() -> List[Tuple[str, List[str], List[str]]]:
+    """
+    Returns the (edge collection, from collections, to collections) of the event graphs.
+    """
+    client = ArangoDBClient()
+    definitions = {}
+    for graph in (ArangoDBConstant.EVENT_RELATED_GRAPH, ArangoDBConstant.EVENT_GRAPH):
+        for definition in client.get_graph_edge_definitions(graph):
+            definitions[definition["edge_collection"]] = (
+                definition["edge_collection"],
+                definition["from_vertex_collections"],
+                definition["to_vertex_collections"],
+            )
+    return [definitions[name] for name in sorted(definitions)]
+
+
+def _expand(
+    task: Dict[str, Any],
+    edge_definitions: List[Tuple[str, List[str], List[str]]],
+    fan_out: int,
+    type_limits: Dict[str, int],
+    min_confidence: Optional[int],
+) -> Tuple[List[Tuple[str, List[str]]], Dict[str, str], bool]:
+    """
+    Finds the next vertices one hop away from the task frontier.
+
+    Each frontier vertex reads the first neighbors after the cursor of every vertex collection, in the
+    [_from, _to] and [_to, _from] indexes of the edge collections (see `EDGE_INDICES`), so that the cost of a
+    page depends on the page size rather than on the degree of the frontier vertices.
+
+    :return: The kept (vertex_id, edge_ids) pairs, the per-collection cursor after them, and whether vertices
+             were left out by the caps.
+    """
+    frontier: Dict[str, List[str]] = {}
+    for vertex_id in task["frontier"]:
+        frontier.setdefault(vertex_id.split("/")[0], []).append(vertex_id)
+
+    bind_vars: Dict[str, Any] = {"exclude": task["visited"]}
+    confidence_filter = ""
+    if min_confidence is not None:
+        confidence_filter = "FILTER e.confidence >= @min_confidence"
+        bind_vars["min_confidence"] = min_confidence
+
+    limits: Dict[str, int] = {}
+    lookups = []
+    for edge_collection, from_collections, to_collections in edge_definitions:
+        # Outbound edges of frontier vertices on the _from side, inbound ones on the _to side
+        sides = [("_from", "_to", from_collections, to_collections), ("_to", "_from", to_collections, from_collections)]
+        for side, other, frontier_collections, neighbor_collections in sides:
+            for frontier_collection in frontier_collections:
+                if frontier_collection not in frontier:
+                    continue
+                for neighbor_collection in neighbor_collections:
+                    limit = min(type_limits.get(neighbor_collection, fan_out), fan_out)
+                    if limit <= 0:
+                        continue
+                    limits[neighbor_collection] = limit
+                    i = len(lookups)
+                    bind_vars.update(
+                        {
+                            f"@edge_{i}": edge_collection,
+                            f"frontier_{i}": frontier[frontier_collection],
+                            # Ids of a collection sort between "<collection>/" and "<collection>0"
+                            f"after_{i}": task["after"].get(neighbor_collection, f"{neighbor_collection}/"),
+                            f"before_{i}": f"{neighbor_collection}0",
+                            f"limit_{i}": limit + 1,
+                        }
+                    )
+                    # Each frontier vertex is looked up in a subquery of its own, for the LIMIT to apply per vertex
+                    lookups.append(f"""(
+        FOR f IN @frontier_{i}
+            FOR neighbor IN (
+                FOR e IN @@edge_{i}
+                    FILTER e.{side} == f AND e.{other} > @after_{i} AND e.{other} < @before_{i}
+                    FILTER e.{other} NOT IN @exclude AND DOCUMENT(e.{other}) != null
+                    {confidence_filter}
+                    SORT e.{other}
+                    LIMIT @limit_{i}
+                    RETURN {{ type: "{neighbor_collection}", id: e.{other}, edge: e._id }}
+            )
+            RETURN neighbor
+    )""")
+    if not lookups:
+        return [], dict(task["after"]), False
+
+    bind_vars["limits"] = limits
+    query = f"""
+    LET neighbors = (
+        FOR n IN FLATTEN([{", ".join(lookups)}])
+            COLLECT type = n.type, id = n.id INTO edge_ids = n.edge
+            RETURN {{ type, id, edges: SORTED(edge_ids) }}
+    )
+    FOR t IN SORTED_UNIQUE(neighbors[*].type)
+        RETURN {{
+            type: t,
+            members: SLICE((FOR n IN neighbors FILTER n.type == t SORT n.id RETURN n), 0, @limits[t] + 1)
+        }}
+    """
+    logger.debug(f"Expanding hop {task['hop']} from {len(task['frontier'])} vertices with {len(lookups)} lookups")
+    groups = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+
+    # Interleave the collections by rank so that the fan-out cap is shared fairly between them
+    ranked = []
+    truncated = False
+    for group in groups:
+        limit = limits[group["type"]]
+        members = group["members"]
+        if len(members) > limit:
+            truncated = True
+        ranked.extend((rank, group["type"], member) for rank, member in enumerate(members[:limit]))
+    ranked.sort(key=lambda item: (item[0], item[1]))
+    if len(ranked) > fan_out:
+        truncated = True
+        ranked = ranked[:fan_out]
+
+    after = dict(task["after"])
+    kept = []
+    for _, collection, member in ranked:
+        kept.append((member["id"], member["edges"]))
+        after[collection] = max(after.get(collection, ""), member["id"])
+    return kept, after, truncated
+
+
+def _encode_token(entity_id: str, pending: List[Dict[str, Any]]) -> str:
+    data = json.dumps({"start": entity_id, "pending": pending}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_token(token: str, entity_id: str) -> List[Dict[str, Any]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid continuation token")
+    if data.get("start") != entity_id or not data.get("pending"):
+        raise ValueError("Continuation token does not belong to this exploration")
+    return data["pending"]
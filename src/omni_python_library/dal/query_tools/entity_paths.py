@@ -0,0 +1,94 @@
+import logging
+from typing import Annotated, Any, Dict, List
+
+from pydantic import Field
+
+from omni_python_library.clients.arangodb import ArangoDBClient, QueryTimeoutError
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.graph import EntityPath
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.relation_weight import DEFAULT_WEIGHT, WEIGHT_ATTRIBUTE
+
+logger = logging.getLogger(__name__)
+
+
+def find_entity_paths(
+    from_id: Annotated[str, Field(description="The ID of the entity the paths start from.")],
+    to_id: Annotated[str, Field(description="The ID of the entity the paths lead to.")],
+    k: Annotated[int, Field(description="Maximum number of paths to return.", ge=1)] = 1,
+    max_depth: Annotated[int, Field(description="Maximum number of relations in a path.", ge=1, le=10)] = 4,
+    weighted: Annotated[
+        bool, Field(description="Rank paths by relation confidence instead of by number of hops.")
+    ] = False,
+    time_budget_ms: Annotated[int, Field(description="Maximum query runtime in milliseconds.", ge=1)] = 5000,
+) -> List[EntityPath]:
+    """
+    Finds the shortest paths between two entities over all relation collections, in either direction.
+
+    Paths are enumerated with K_PATHS up to `max_depth` relations, so the search stops at that depth.
+    Unweighted paths come shortest first. Weighted paths are all enumerated, then ranked by the sum of the
+    `path_weight` relation attribute, which is lower for more confident relations; relations created before
+    it existed count as having no confidence.
+
+    :param from_id: The ID of the entity the paths start from.
+    :param to_id: The ID of the entity the paths lead to.
+    :param k: Maximum number of paths to return. 1 returns the shortest path only.
+    :param max_depth: Maximum number of relations in a path.
+    :param weighted: Rank paths by relation confidence instead of by number of hops.
+    :param time_budget_ms: Maximum query runtime in milliseconds.
+    :return: Up to `k` paths ordered by weight, empty if the entities are not connected within `max_depth`.
+    :raises QueryTimeoutError: If the query exceeds `time_budget_ms`.
+    """
+    edge_collections = relation_collections()
+    if not edge_collections:
+        return []
+
+    bind_vars: Dict[str, Any] = {"from": from_id, "to": to_id, "k": k, "max_depth": max_depth}
+    for i, name in enumerate(edge_collections):
+        bind_vars[f"@edge_{i}"] = name
+    edges = ", ".join(f"@@edge_{i}" for i in range(len(edge_collections)))
+
+    if weighted:
+        bind_vars.update({"weight_attribute": WEIGHT_ATTRIBUTE, "default_weight": DEFAULT_WEIGHT})
+        # K_SHORTEST_PATHS has no depth limit and keeps searching longer paths when fewer than k fit in
+        # max_depth, so the bounded paths are ranked here instead
+        query = f"""
+        FOR p IN 1..@max_depth ANY K_PATHS @from TO @to {edges}
+            LET weight = SUM(p.edges[* RETURN NOT_NULL(CURRENT[@weight_attribute], @default_weight)])
+            SORT weight, LENGTH(p.edges)
+            LIMIT @k
+            RETURN {{ vertices: p.vertices, edges: p.edges, weight }}
+        """
+    else:
+        query = f"""
+        FOR p IN 1..@max_depth ANY K_PATHS @from TO @to {edges}
+            LIMIT @k
+            RETURN {{ vertices: p.vertices, edges: p.edges, weight: LENGTH(p.edges) }}
+        """
+
+    logger.debug(f"Finding paths from {from_id} to {to_id} over {len(edge_collections)} edge collections")
+    try:
+        cursor = ArangoDBClient().execute(query, bind_vars=bind_vars, max_runtime=time_budget_ms / 1000)
+        rows = list(cursor)
+    except QueryTimeoutError as e:
+        raise QueryTimeoutError(f"Path query from {from_id} to {to_id} exceeded {time_budget_ms} ms") from e
+
+    dal = OsintDataAccessLayer()
+    paths = []
+    for row in rows:
+        paths.append(
+            EntityPath(
+                vertices=[dal.parse_document(doc) for doc in row["vertices"]],
+                edges=[dal.parse_document(doc) for doc in row["edges"]],
+                weight=row["weight"],
+            )
+        )
+    return paths
+
+
+def relation_collections() -> List[str]:
+    """
+    Returns the edge collections of relations between OSINT entities, leaving out view memberships.
+    """
+    view_prefix = f"{EntityNameConstant.VIEW}_"
+    return [name for name in ArangoDBClient().get_edge_collection_names() if not name.startswith(view_prefix)]
@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from omni_python_library.utils.geo import bounding_box_circle, polygon_ring
+
+
+def event_conditions(
+    filter_vars: Dict[str, Any],
+    date_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    country_code: Optional[str] = None,
+    event_type: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Builds AQL conditions on the `happened_at`, `location.country_code`, `type` and `tags` event attributes.
+
+    The `happened_at` and `country_code` conditions are valid both in FILTER and in SEARCH on the event
+    search view, `event_type` and `tags` are not part of the view and only valid in FILTER.
+
+    :param filter_vars: Bind variables of the conditions are added to this dict.
+    :param date_range: Tuple of (start_timestamp, end_timestamp).
+    :param country_code: ISO country code to filter by.
+    :param event_type: Event type to filter by.
+    :param tags: Only match events having any of these tags.
+    :return: Conditions on `doc`, to be joined with AND.
+    """
+    conditions = []
+
+    if country_code:
+        conditions.append("doc.location.country_code == @country_code")
+        filter_vars["country_code"] = country_code
+
+    if event_type:
+        conditions.append("doc.type == @event_type")
+        filter_vars["event_type"] = event_type
+
+    if tags:
+        conditions.append("doc.tags ANY IN @tags")
+        filter_vars["tags"] = tags
+
+    if date_range:
+        start, end = date_range
+        if start is not None:
+            conditions.append("doc.happened_at >= @start")
+            filter_vars["start"] = start
+        if end is not None:
+            conditions.append("doc.happened_at <= @end")
+            filter_vars["end"] = end
+
+    return conditions
+
+
+def location_conditions(
+    filter_vars: Dict[str, Any],
+    point: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    bounding_box: Optional[Tuple[float, float, float, float]] = None,
+    polygon: Optional[List[Tuple[float, float]]] = None,
+) -> List[str]:
+    """
+    Builds AQL conditions on `doc.location` that the geo index on latitude/longitude can serve.
+
+    :param filter_vars: Bind variables of the conditions are added to this dict.
+    :param point: (latitude, longitude) center of a radius search. Requires `radius_km`.
+    :param radius_km: Radius around `point` in kilometers.
+    :param bounding_box: (min_latitude, min_longitude, max_latitude, max_longitude). A box with
+                         min_longitude > max_longitude crosses the antimeridian.
+    :param polygon: (latitude, longitude) vertices of a polygon. The ring is closed automatically.
+    :return: Conditions on `doc`, to be joined with AND.
+    """
+    conditions = []
+    if (point is None) != (radius_km is None):
+        raise ValueError("`point` and `radius_km` must be given together")
+
+    if point is not None:
+        conditions.append(f"{_DISTANCE.format(lat='@point_lat', lon='@point_lon')} <= @point_radius")
+        filter_vars.update({"point_lat": point[0], "point_lon": point[1], "point_radius": radius_km * 1000})
+
+    if bounding_box is not None:
+        min_lat, min_lon, max_lat, max_lon = bounding_box
+        center_lat, center_lon, radius = bounding_box_circle(min_lat, min_lon, max_lat, max_lon)
+        # The enclosing circle is answered by the geo index, the range checks make the result exact
+        conditions.append(f"{_DISTANCE.format(lat='@box_lat', lon='@box_lon')} <= @box_radius")
+        conditions.append("doc.location.latitude >= @box_min_lat AND doc.location.latitude <= @box_max_lat")
+        if min_lon <= max_lon:
+            conditions.append("doc.location.longitude >= @box_min_lon AND doc.location.longitude <= @box_max_lon")
+        else:
+            conditions.append("(doc.location.longitude >= @box_min_lon OR doc.location.longitude <= @box_max_lon)")
+        filter_vars.update(
+            {
+                "box_lat": center_lat,
+                "box_lon": center_lon,
+                "box_radius": radius,
+                "box_min_lat": min_lat,
+                "box_max_lat": max_lat,
+                "box_min_lon": min_lon,
+                "box_max_lon": max_lon,
+            }
+        )
+
+    if polygon is not None:
+        conditions.append("GEO_CONTAINS(GEO_POLYGON(@polygon), [doc.location.longitude, doc.location.latitude])")
+        filter_vars["polygon"] = polygon_ring(polygon)
+
+    if conditions:
+        # DISTANCE() of a missing coordinate is null, which compares as smaller than any radius
+        conditions.insert(0, "doc.location.latitude != null AND doc.location.longitude != null")
+    return conditions
+
+
+_DISTANCE = "DISTANCE(doc.location.latitude, doc.location.longitude, {lat}, {lon})"
@@ -0,0 +1,119 @@
+import logging
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+from pydantic import Field
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.event_rollup import DIMENSION_VALUES, TOTAL, bucket_expression, rollup_range
+from omni_python_library.dal.query_tools.event_filters import event_conditions
+from omni_python_library.models.aggregation import HistogramBucket, HistogramDimension, HistogramInterval
+from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
+
+logger = logging.getLogger(__name__)
+
+
+def event_histogram(
+    interval: Annotated[HistogramInterval, Field(description="Width of the time buckets.")] = HistogramInterval.DAY,
+    group_by: Annotated[
+        Optional[HistogramDimension],
+        Field(description="Count events per value of this attribute within each bucket."),
+    ] = None,
+    date_range: Annotated[
+        Optional[Tuple[Optional[int], Optional[int]]],
+        Field(description="Tuple of (start_timestamp, end_timestamp)."),
+    ] = None,
+    country_code: Annotated[Optional[str], Field(description="ISO country code to filter by.")] = None,
+    event_type: Annotated[Optional[str], Field(description="Event type to filter by.")] = None,
+    tags: Annotated[Optional[List[str]], Field(description="Only count events having any of these tags.")] = None,
+    use_rollup: Annotated[
+        bool, Field(description="Whether to read the pre-aggregated rollup when the query allows it.")
+    ] = True,
+) -> List[HistogramBucket]:
+    """
+    Counts events per hour, day or week of `happened_at`, optionally per country code, type or tag.
+
+    Without attribute filters and with a bucket-aligned `date_range` (or none), the counts are read from the
+    event rollup that is maintained on every event create, update and delete. Otherwise events are counted
+    with COLLECT ... WITH COUNT over the persistent `happened_at` index. An event with several tags counts
+    once for each of its tags when grouping by tags.
+
+    :param interval: Width of the time buckets. Buckets are aligned to UTC, weeks start on Monday.
+    :param group_by: Count events per value of this attribute within each bucket.
+    :param date_range: Tuple of (start_timestamp, end_timestamp), end inclusive.
+    :param country_code: ISO country code to filter by.
+    :param event_type: Event type to filter by.
+    :param tags: Only count events having any of these tags.
+    :param use_rollup: Whether to read the pre-aggregated rollup when the query allows it.
+    :return: Non-empty buckets ordered by bucket start and value.
+    """
+    interval = HistogramInterval(interval)
+    group_by = HistogramDimension(group_by) if group_by else None
+
+    bucket_range = rollup_range(interval, date_range)
+    if use_rollup and bucket_range is not None and not (country_code or event_type or tags):
+        return _from_rollup(interval, group_by, bucket_range)
+
+    filter_vars: Dict[str, Any] = {}
+    conditions = event_conditions(
+        filter_vars, date_range=date_range, country_code=country_code, event_type=event_type, tags=tags
+    )
+    if "start" not in filter_vars:
+        conditions.append("doc.happened_at != null")
+    filter_str = "\n".join(f"FILTER {c}" for c in conditions)
+
+    if group_by:
+        group = f"""
+            FOR v IN {DIMENSION_VALUES[group_by]}
+                FILTER v != null AND v != ""
+                COLLECT bucket = b, value = v WITH COUNT INTO count
+        """
+    else:
+        group = "COLLECT bucket = b WITH COUNT INTO count"
+
+    query = f"""
+    FOR doc IN {EntityNameConstant.EVENT}
+        {filter_str}
+        LET b = {bucket_expression(interval)}
+        {group}
+        RETURN {{ bucket, value: {"value" if group_by else "null"}, count }}
+    """
+    return _execute(query, filter_vars)
+
+
+def _from_rollup(
+    interval: HistogramInterval,
+    group_by: Optional[HistogramDimension],
+    bucket_range: Tuple[Optional[int], Optional[int]],
+) -> List[HistogramBucket]:
+    bind_vars: Dict[str, Any] = {
+        "@rollup": ArangoDBConstant.EVENT_ROLLUP,
+        "interval": interval.value,
+        "dimension": group_by.value if group_by else TOTAL,
+    }
+    conditions = ["r.interval == @interval", "r.dimension == @dimension", "r.count > 0"]
+    start, end = bucket_range
+    if start is not None:
+        conditions.append("r.bucket >= @start")
+        bind_vars["start"] = start
+    if end is not None:
+        conditions.append("r.bucket <= @end")
+        bind_vars["end"] = end
+    filter_str = "\n".join(f"FILTER {c}" for c in conditions)
+
+    query = f"""
+    FOR r IN @@rollup
+        {filter_str}
+        SORT r.bucket, r.value
+        RETURN {{ bucket: r.bucket, value: {"r.value" if group_by else "null"}, count: r.count }}
+    """
+    return _execute(query, bind_vars)
+
+
+def _execute(query: str, bind_vars: Dict[str, Any]) -> List[HistogramBucket]:
+    logger.debug(f"Executing histogram query: {query} with vars: {bind_vars}")
+    try:
+        cursor = ArangoDBClient().execute(query, bind_vars=bind_vars)
+        return [HistogramBucket(**doc) for doc in cursor]
+    except Exception:
+        logger.exception("Error computing event histogram")
+        raise
@@ -1,9 +1,30 @@
-from typing import Annotated, List, Optional, Tuple, Union
+import logging
+from enum import Enum
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Union
 
+from arango.exceptions import AQLQueryExecuteError
+from cachetools import TTLCache
 from pydantic import Field
 
-from omni_python_library.dal.osint_data_access_layer import EVENT_GRAPH_NAME, OsintDataAccessLayer
+from omni_python_library.clients.arangodb import VECTOR_SEARCH_NOT_APPLIED, ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_cache import QueryCache, query_key
+from omni_python_library.dal.query_tools.event_filters import event_conditions, location_conditions
 from omni_python_library.models.osint import Event, Relation
+from omni_python_library.models.page import EventPage
+from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
+from omni_python_library.utils.page_token import decode_page_token, encode_page_token, page_scope
+
+logger = logging.getLogger(__name__)
+
+# Candidate counts of the filters of vector searches, keyed by the event collection version, see `_count_candidates`
+_candidate_counts: TTLCache = TTLCache(maxsize=1024, ttl=600)
+
+
+class SearchMode(str, Enum):
+    VECTOR = "vector"
+    TEXT = "text"
+    HYBRID = "hybrid"
 
 
 def search_events(
@@ -17,61 +38,467 @@ def search_events(
     ] = None,
     country_code: Annotated[Optional[str], Field(description="ISO country code to filter by.")] = None,
     limit: Annotated[int, Field(description="Maximum number of events to return.", ge=1, default=50)] = 50,
+    vector: Annotated[
+        Optional[List[float]],
+        Field(description="Precomputed query embedding. Used instead of embedding `text` when given."),
+    ] = None,
+    n_probe: Annotated[
+        Optional[int],
+        Field(description="Number of vector index lists to probe. Higher values trade latency for recall.", ge=1),
+    ] = None,
+    exact_threshold: Annotated[
+        int,
+        Field(description="Use an exact similarity scan when at most this many events pass the filters.", ge=0),
+    ] = 1000,
+    mode: Annotated[
+        SearchMode,
+        Field(description="'vector' ranks by embedding similarity, 'text' by BM25, 'hybrid' fuses both."),
+    ] = SearchMode.VECTOR,
+    text_weight: Annotated[float, Field(description="Weight of the BM25 ranking in hybrid fusion.", ge=0)] = 1.0,
+    vector_weight: Annotated[float, Field(description="Weight of the vector ranking in hybrid fusion.", ge=0)] = 1.0,
+    rrf_k: Annotated[int, Field(description="Reciprocal rank fusion constant.", ge=1)] = 60,
+    lexical_max_terms: Annotated[
+        int,
+        Field(description="In hybrid mode, text with at most this many terms is searched by BM25 only.", ge=0),
+    ] = 0,
+    include_relations: Annotated[
+        bool, Field(description="Whether to return the relations between the returned events.")
+    ] = True,
+    relation_limit: Annotated[
+        int, Field(description="Maximum number of relations to return.", ge=1, default=1000)
+    ] = 1000,
+    point: Annotated[
+        Optional[Tuple[float, float]],
+        Field(description="(latitude, longitude) center of a radius search. Requires `radius_km`."),
+    ] = None,
+    radius_km: Annotated[Optional[float], Field(description="Radius around `point` in kilometers.", gt=0)] = None,
+    bounding_box: Annotated[
+        Optional[Tuple[float, float, float, float]],
+        Field(description="(min_latitude, min_longitude, max_latitude, max_longitude) box to search in."),
+    ] = None,
+    polygon: Annotated[
+        Optional[List[Tuple[float, float]]],
+        Field(description="(latitude, longitude) vertices of a polygon to search in."),
+    ] = None,
+    cache: Annotated[
+        bool, Field(description="Whether to serve the results from the query cache while no event or relation changed.")
+    ] = False,
 ) -> List[Union[Event, Relation]]:
     """
-    Queries events and their connecting relations using Vector Search.
+    Queries events and their connecting relations using Vector Search, BM25 text search, or both.
+
+    Filters on `happened_at`, `country_code` and location (radius, bounding box, polygon) are applied first.
+    When few events pass them, candidates are ranked exactly with COSINE_SIMILARITY, otherwise the vector
+    index is queried with APPROX_NEAR_COSINE and the filters are evaluated inside the index scan. Location
+    filters use the geo index on `location.latitude`/`location.longitude`.
+
+    In hybrid mode the BM25 ranking over `title`/`description` and the vector ranking are computed in the
+    same AQL query and fused with weighted reciprocal rank fusion:
+    score = text_weight / (rrf_k + text_rank) + vector_weight / (rrf_k + vector_rank).
+    Short keyword queries (see `lexical_max_terms`) skip the embedding call and use BM25 only.
 
-    :param text: Text to search for using vector search against the embedding field.
+    :param text: Text to search for.
     :param date_range: Tuple of (start_timestamp, end_timestamp).
     :param country_code: ISO country code to filter by.
     :param limit: Maximum number of events to return.
-    :return: A list of Event and Relation objects.
+    :param vector: Precomputed query embedding. Used instead of embedding `text` when given.
+    :param n_probe: Number of vector index lists to probe. Defaults to the index `defaultNProbe`.
+    :param exact_threshold: Use an exact similarity scan when at most this many events pass the filters.
+    :param mode: Ranking mode, see `SearchMode`.
+    :param text_weight: Weight of the BM25 ranking in hybrid fusion.
+    :param vector_weight: Weight of the vector ranking in hybrid fusion.
+    :param rrf_k: Reciprocal rank fusion constant. Larger values flatten the contribution of top ranks.
+    :param lexical_max_terms: In hybrid mode, text with at most this many terms is searched by BM25 only.
+    :param include_relations: Whether to return the relations between the returned events.
+    :param relation_limit: Maximum number of relations to return.
+    :param point: (latitude, longitude) center of a radius search. Requires `radius_km`.
+    :param radius_km: Radius around `point` in kilometers.
+    :param bounding_box: (min_latitude, min_longitude, max_latitude, max_longitude). A box with
+                         min_longitude > max_longitude crosses the antimeridian.
+    :param polygon: (latitude, longitude) vertices of a polygon. The ring is closed automatically.
+    :param cache: Whether to serve the results from the query cache while no event or relation changed.
+                  The embedding of `text` is still computed, it is part of the cache key.
+    :return: A list of Event and Relation objects. See `search_events_page` to paginate.
     """
-    bind_vars = {"limit": limit}
-    filters = []
-
-    if country_code:
-        filters.append("FILTER doc.location.country_code == @country_code")
-        bind_vars["country_code"] = country_code
-
-    if date_range:
-        start, end = date_range
-        if start is not None:
-            filters.append("FILTER doc.happened_at >= @start")
-            bind_vars["start"] = start
-        if end is not None:
-            filters.append("FILTER doc.happened_at <= @end")
-            bind_vars["end"] = end
-
-    vector_search = ""
-    if text:
-        vector_search = """
-            LET distance = VECTOR_DISTANCE(doc.embedding, @vector, "cosine")
-            SORT distance ASC
+    page = search_events_page(
+        text=text,
+        date_range=date_range,
+        country_code=country_code,
+        limit=limit,
+        vector=vector,
+        n_probe=n_probe,
+        exact_threshold=exact_threshold,
+        mode=mode,
+        text_weight=text_weight,
+        vector_weight=vector_weight,
+        rrf_k=rrf_k,
+        lexical_max_terms=lexical_max_terms,
+        include_relations=include_relations,
+        relation_limit=relation_limit,
+        point=point,
+        radius_km=radius_km,
+        bounding_box=bounding_box,
+        polygon=polygon,
+        cache=cache,
+    )
+    return [*page.events, *page.relations]
+
+
+def search_events_page(
+    text: Annotated[
+        Optional[str],
+        Field(description="Text to search for using vector search against the embedding field."),
+    ] = None,
+    date_range: Annotated[
+        Optional[Tuple[Optional[int], Optional[int]]],
+        Field(description="Tuple of (start_timestamp, end_timestamp)."),
+    ] = None,
+    country_code: Annotated[Optional[str], Field(description="ISO country code to filter by.")] = None,
+    limit: Annotated[int, Field(description="Maximum number of events to return.", ge=1, default=50)] = 50,
+    vector: Annotated[
+        Optional[List[float]],
+        Field(description="Precomputed query embedding. Used instead of embedding `text` when given."),
+    ] = None,
+    n_probe: Annotated[
+        Optional[int],
+        Field(description="Number of vector index lists to probe. Higher values trade latency for recall.", ge=1),
+    ] = None,
+    exact_threshold: Annotated[
+        int,
+        Field(description="Use an exact similarity scan when at most this many events pass the filters.", ge=0),
+    ] = 1000,
+    mode: Annotated[
+        SearchMode,
+        Field(description="'vector' ranks by embedding similarity, 'text' by BM25, 'hybrid' fuses both."),
+    ] = SearchMode.VECTOR,
+    text_weight: Annotated[float, Field(description="Weight of the BM25 ranking in hybrid fusion.", ge=0)] = 1.0,
+    vector_weight: Annotated[float, Field(description="Weight of the vector ranking in hybrid fusion.", ge=0)] = 1.0,
+    rrf_k: Annotated[int, Field(description="Reciprocal rank fusion constant.", ge=1)] = 60,
+    lexical_max_terms: Annotated[
+        int,
+        Field(description="In hybrid mode, text with at most this many terms is searched by BM25 only.", ge=0),
+    ] = 0,
+    include_relations: Annotated[
+        bool, Field(description="Whether to return the relations between the returned events.")
+    ] = True,
+    relation_limit: Annotated[
+        int, Field(description="Maximum number of relations to return.", ge=1, default=1000)
+    ] = 1000,
+    point: Annotated[
+        Optional[Tuple[float, float]],
+        Field(description="(latitude, longitude) center of a radius search. Requires `radius_km`."),
+    ] = None,
+    radius_km: Annotated[Optional[float], Field(description="Radius around `point` in kilometers.", gt=0)] = None,
+    bounding_box: Annotated[
+        Optional[Tuple[float, float, float, float]],
+        Field(description="(min_latitude, min_longitude, max_latitude, max_longitude) box to search in."),
+    ] = None,
+    polygon: Annotated[
+        Optional[List[Tuple[float, float]]],
+        Field(description="(latitude, longitude) vertices of a polygon to search in."),
+    ] = None,
+    cache: Annotated[
+        bool, Field(description="Whether to serve the results from the query cache while no event or relation changed.")
+    ] = False,
+    cursor: Annotated[Optional[str], Field(description="Token of the previous page to continue after.")] = None,
+) -> EventPage:
+    """
+    Returns one page of the events of `search_events`, with a token for the next page.
+
+    Pages are keyset-paginated: the token holds the sort key of the last event of the page, and is only valid
+    for the same search parameters. Searches without ranking return the most recent events first, sorted by
+    (happened_at, _key), and every page is a range scan of the `happened_at` index. Ranked searches are sorted
+    by (score, _key) and filter out the events up to the token after ranking. The vector index and hybrid
+    fusion only return top matches, so they still rank the events of the previous pages, but only the events
+    of the requested page are fetched and returned.
+
+    :param cursor: Token of the previous page to continue after, or None for the first page.
+    :return: The events and relations of the page, and the token of the next page if there may be one.
+    The other parameters are those of `search_events`.
+    """
+    filter_vars: Dict[str, Any] = {}
+    conditions = event_conditions(filter_vars, date_range=date_range, country_code=country_code)
+
+    # The geo index is not part of the search view, so location conditions are plain filters everywhere
+    geo_conditions = location_conditions(
+        filter_vars, point=point, radius_km=radius_km, bounding_box=bounding_box, polygon=polygon
+    )
+    geo_filter_str = "\n".join(f"FILTER {c}" for c in geo_conditions)
+    filter_str = "\n".join(f"FILTER {c}" for c in conditions + geo_conditions)
+    bind_vars = {"limit": limit, **filter_vars}
+    relations = relation_limit if include_relations else None
+
+    mode = SearchMode(mode)
+    if (
+        mode == SearchMode.HYBRID
+        and text
+        and vector is None
+        and lexical_max_terms
+        and len(text.split()) <= lexical_max_terms
+    ):
+        mode = SearchMode.TEXT
+
+    lexical = mode in (SearchMode.TEXT, SearchMode.HYBRID) and bool(text)
+    if mode == SearchMode.TEXT:
+        vector = None
+    elif vector is None and text:
+        vector = OsintDataAccessLayer().generate_embedding(text)
+
+    ranked = lexical or bool(vector)
+    scope = page_scope(
+        "events", mode.value, ranked, text, vector, date_range, country_code, point, radius_km, bounding_box, polygon
+    )
+    page = _Page(scope, limit, decode_page_token(cursor, scope) if cursor else None)
+    keyset = page.keyset(bind_vars, ranked)
+
+    lexical_search = ""
+    if lexical:
+        bind_vars["text"] = text
+        search_expr = " AND ".join([_TEXT_MATCH, *conditions])
+        lexical_search = f"""
+            FOR doc IN {ArangoDBConstant.EVENT_SEARCH_VIEW}
+                SEARCH {search_expr}
+                {geo_filter_str}
+                LET score = BM25(doc)
         """
-        bind_vars["vector"] = OsintDataAccessLayer().generate_embedding(text)
 
-    filter_str = "\n".join(filters) if filters else ""
+    if not vector:
+        if lexical:
+            query = f"""
+                {lexical_search}
+                {keyset.format(score="score", key="doc._key")}
+                SORT score DESC, doc._key
+                LIMIT @limit
+                RETURN {{ doc, score }}
+            """
+            return _run(query, bind_vars, relations, cache, page)
+        query = f"""
+            FOR doc IN {EntityNameConstant.EVENT}
+                {filter_str}
+                {keyset.format(score="doc.happened_at", key="doc._key")}
+                SORT doc.happened_at DESC, doc._key DESC
+                LIMIT @limit
+                RETURN {{ doc, score: doc.happened_at }}
+        """
+        return _run(query, bind_vars, relations, cache, page)
 
-    query = f"""
-    LET events = (
-        FOR doc IN event
-            {filter_str}
+    bind_vars["vector"] = vector
+    exact = _count_candidates(filter_str, filter_vars, exact_threshold) <= exact_threshold
+    # The retrievers return top matches only, so they rank the events of the previous pages again
+    if lexical:
+        bind_vars.update(
+            {
+                "candidates": (page.seen + limit) * 2,
+                "text_weight": text_weight,
+                "vector_weight": vector_weight,
+                "rrf_k": rrf_k,
+            }
+        )
+    else:
+        bind_vars["window"] = page.seen + limit
+
+    def events_query(approx: bool) -> str:
+        vector_search = f"FOR doc IN {EntityNameConstant.EVENT} {filter_str} {_vector_rank(approx, n_probe)}"
+        if not lexical:
+            return _VECTOR.format(vector_search=vector_search, keyset=keyset.format(score="score", key="key"))
+        return _FUSION.format(
+            lexical_search=f"{lexical_search} SORT score DESC",
+            vector_search=vector_search,
+            keyset=keyset.format(score="score", key="key"),
+        )
+
+    if exact:
+        return _run(events_query(False), bind_vars, relations, cache, page)
+
+    if n_probe:
+        bind_vars["n_probe"] = n_probe
+    try:
+        return _run(events_query(True), bind_vars, relations, cache, page)
+    except AQLQueryExecuteError as e:
+        # The vector index is only created once the collection holds enough documents to train it
+        if e.error_code != VECTOR_SEARCH_NOT_APPLIED:
+            raise
+        logger.warning("No vector index for approximate search, falling back to exact search")
+        bind_vars.pop("n_probe", None)
+        return _run(events_query(False), bind_vars, relations, cache, page)
+
+
+_TEXT_MATCH = """ANALYZER(
+                    doc.title IN TOKENS(@text, "text_en") OR doc.description IN TOKENS(@text, "text_en"),
+                    "text_en"
+                )"""
+
+_VECTOR = """
+        FOR hit IN (
             {vector_search}
+                LIMIT @window
+                RETURN {{ doc, score }}
+        )
+            LET score = hit.score
+            LET key = hit.doc._key
+            {keyset}
+            SORT score DESC, key
             LIMIT @limit
-            RETURN doc
+            RETURN hit
+"""
+
+# Each retriever contributes its top `@candidates` ids, ranks are 0-based from POSITION
+_FUSION = """
+        LET lexical = (
+            {lexical_search}
+                LIMIT @candidates
+                RETURN doc._id
+        )
+        LET semantic = (
+            {vector_search}
+                LIMIT @candidates
+                RETURN doc._id
+        )
+        FOR id IN UNION_DISTINCT(lexical, semantic)
+            LET text_rank = POSITION(lexical, id, true)
+            LET vector_rank = POSITION(semantic, id, true)
+            LET score = (text_rank >= 0 ? @text_weight / (@rrf_k + text_rank + 1) : 0)
+                + (vector_rank >= 0 ? @vector_weight / (@rrf_k + vector_rank + 1) : 0)
+            LET key = PARSE_IDENTIFIER(id).key
+            {keyset}
+            SORT score DESC, key
+            LIMIT @limit
+            RETURN {{ doc: DOCUMENT(id), score }}
+"""
+
+
+class _Page:
+    """
+    Keyset position of a page: the (score, _key) of the last event of the previous page, where the score is
+    `happened_at` for unranked searches, and the number of events of the previous pages.
+    """
+
+    def __init__(self, scope: str, limit: int, token: Optional[Dict[str, Any]]):
+        self.scope = scope
+        self.limit = limit
+        self.after: Optional[List[Any]] = token["after"] if token else None
+        self.seen: int = token["seen"] if token else 0
+
+    def keyset(self, bind_vars: Dict[str, Any], ranked: bool) -> str:
+        """
+        Returns the FILTER template skipping the events up to the token, formatted with the score and key
+        expressions of the query.
+        """
+        if self.after is None:
+            return ""
+        bind_vars["after_score"], bind_vars["after_key"] = self.after
+        if ranked:
+            # Scores descending, keys ascending
+            return "FILTER {score} < @after_score OR ({score} == @after_score AND {key} > @after_key)"
+        # The first condition alone is a range on the happened_at index, the second one skips the ties
+        return "FILTER {score} <= @after_score FILTER {score} < @after_score OR {key} < @after_key"
+
+    def next_token(self, count: int, last: Optional[List[Any]]) -> Optional[str]:
+        if count < self.limit or last is None:
+            return None
+        return encode_page_token(self.scope, after=last, seen=self.seen + count)
+
+
+def _vector_rank(approx: bool, n_probe: Optional[int]) -> str:
+    if not approx:
+        return """
+            FILTER doc.embedding != null
+            LET score = COSINE_SIMILARITY(doc.embedding, @vector)
+            SORT score DESC
+        """
+
+    options = ", { nProbe: @n_probe }" if n_probe else ""
+    return f"""
+            LET score = APPROX_NEAR_COSINE(doc.embedding, @vector{options})
+            SORT score DESC
+    """
+
+
+def _count_candidates(filter_str: str, filter_vars: Dict[str, Any], threshold: int) -> int:
+    """
+    Counts the events passing the filters, stopping at `threshold + 1` so the count stays cheap. Counts are
+    reused until an event is written, so repeated searches only read the event collection version from Redis.
+    """
+    if threshold <= 0:
+        return 1
+
+    query = f"""
+    RETURN LENGTH(
+        FOR doc IN {EntityNameConstant.EVENT}
+            {filter_str}
+            LIMIT @threshold
+            RETURN 1
     )
+    """
+    bind_vars = {"threshold": threshold + 1, **filter_vars}
+    try:
+        version = QueryCache().versions([EntityNameConstant.EVENT])[EntityNameConstant.EVENT]
+    except Exception:
+        logger.exception("Error reading the event collection version, counting candidates without cache")
+        return ArangoDBClient().execute(query, bind_vars=bind_vars).next()
+
+    key = query_key(query, {**bind_vars, "version": version})
+    count = _candidate_counts.get(key)
+    if count is None:
+        count = _candidate_counts[key] = ArangoDBClient().execute(query, bind_vars=bind_vars).next()
+    return count
 
+
+def _run(
+    events_query: str, bind_vars: Dict[str, Any], relation_limit: Optional[int], cache: bool, page: _Page
+) -> EventPage:
+    bind_vars = dict(bind_vars)
+    query = f"""
+    LET ranked = (
+        {events_query}
+    )
+
+    LET events = ranked[*].doc
     LET event_ids = events[*]._id
-    LET relations = (
-        FOR event IN events
-            FOR v, e IN 1..1 ANY event GRAPH '{EVENT_GRAPH_NAME}'
-            FILTER e._from IN event_ids AND e._to IN event_ids
-            RETURN DISTINCT e
+    LET relations = {_relations_query(bind_vars, relation_limit)}
+    LET last = LAST(ranked)
+
+    RETURN {{ events, relations, last: last == null ? null : [last.score, last.doc._key] }}
+    """
+
+    logger.debug(f"Searching events with vars: {list(bind_vars)}")
+    if cache:
+        # Hybrid fusion reads events through DOCUMENT(), so the collections are listed explicitly
+        edge_collections = ArangoDBClient().get_graph_edge_collections(ArangoDBConstant.EVENT_GRAPH)
+        rows = QueryCache().execute(query, bind_vars, [EntityNameConstant.EVENT, *edge_collections])
+    else:
+        rows = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+    result = rows[0]
+
+    dal = OsintDataAccessLayer()
+    events = [dal.parse_document(doc) for doc in result["events"] if doc]
+    relations = [dal.parse_document(doc) for doc in result["relations"]]
+    return EventPage(
+        events=[e for e in events if isinstance(e, Event)],
+        relations=[r for r in relations if isinstance(r, Relation)],
+        cursor=page.next_token(len(result["events"]), result["last"]),
     )
 
-    FOR result IN APPEND(events, relations)
-        RETURN result
+
+def _relations_query(bind_vars: Dict[str, Any], relation_limit: Optional[int]) -> str:
+    """
+    Looks up edges between the selected events in every event->event collection. Each selected event probes
+    the persistent [_from, _to] index with its own id and the selected ids, so the cost grows with the page
+    size and the number of matching edges, not with the degree of the events.
     """
+    edge_collections = ArangoDBClient().get_graph_edge_collections(ArangoDBConstant.EVENT_GRAPH)
+    if relation_limit is None or not edge_collections:
+        return "[]"
 
-    return OsintDataAccessLayer().query(query, bind_vars=bind_vars)
+    lookups = []
+    for i, name in enumerate(edge_collections):
+        bind_vars[f"@edge_{i}"] = name
+        lookups.append(f"""(
+            FOR from_id IN event_ids
+                FOR e IN @@edge_{i}
+                    FILTER e._from == from_id AND e._to IN event_ids
+                    LIMIT @relation_limit
+                    RETURN e
+        )""")
+    bind_vars["relation_limit"] = relation_limit
+    return f"SLICE(FLATTEN([{', '.join(lookups)}]), 0, @relation_limit)"
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+from pydantic import Field
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_cache import QueryCache
+from omni_python_library.dal.query_tools.event_filters import event_conditions, location_conditions
+from omni_python_library.models.aggregation import EventTile, TileScheme
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.geo import (
+    MAX_MERCATOR_LAT,
+    bounding_box_circle,
+    geohash,
+    geohash_bits,
+    geohash_bounds,
+    geohash_cell,
+    quadkey,
+    quadkey_bounds,
+    quadkey_cell,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cached results are stored per block of tiles (a shorter key prefix) so that panning reuses them
+QUADKEY_BLOCK_DEPTH = 3
+GEOHASH_BLOCK_DEPTH = 1
+MAX_CACHED_BLOCKS = 64
+
+
+def aggregate_event_tiles(
+    level: Annotated[
+        int, Field(description="Quadkey zoom level (0-23) or geohash precision (1-12), depending on `scheme`.")
+    ],
+    scheme: Annotated[TileScheme, Field(description="Tiling scheme.")] = TileScheme.QUADKEY,
+    bounding_box: Annotated[
+        Optional[Tuple[float, float, float, float]],
+        Field(description="(min_latitude, min_longitude, max_latitude, max_longitude) of the rendered region."),
+    ] = None,
+    date_range: Annotated[
+        Optional[Tuple[Optional[int], Optional[int]]],
+        Field(description="Tuple of (start_timestamp, end_timestamp)."),
+    ] = None,
+    tags: Annotated[Optional[List[str]], Field(description="Only count events having any of these tags.")] = None,
+    country_code: Annotated[Optional[str], Field(description="ISO country code to filter by.")] = None,
+    top_n: Annotated[int, Field(description="Number of most recent event ids returned per tile.", ge=0)] = 5,
+    static_delay: Annotated[
+        int,
+        Field(description="Milliseconds after which a closed time range is considered static and cached.", ge=0),
+    ] = 86_400_000,
+    cache_ttl: Annotated[int, Field(description="Seconds to keep cached static tiles.", ge=1)] = 86_400,
+) -> List[EventTile]:
+    """
+    Groups events into quadkey or geohash tiles inside ArangoDB and returns one aggregate per non-empty tile.
+
+    Each tile carries the event count, the centroid of its events and the ids of its `top_n` most recent
+    events, so a map can render clusters without loading the events themselves.
+
+    When `date_range` ends more than `static_delay` milliseconds ago, the result is treated as static:
+    tiles are cached in blocks (quadkey prefixes 3 levels up, geohash prefixes 1 character shorter) and
+    only blocks not cached yet are aggregated, so panning over the same area does not query ArangoDB again.
+    Cached blocks belong to a version of the event collection (see `QueryCache`), so that events created,
+    updated or deleted in the past range, e.g. by a backfill, are counted on the next call.
+
+    :param level: Quadkey zoom level (0-23) or geohash precision (1-12), depending on `scheme`.
+    :param scheme: Tiling scheme.
+    :param bounding_box: (min_latitude, min_longitude, max_latitude, max_longitude) of the rendered region.
+    :param date_range: Tuple of (start_timestamp, end_timestamp).
+    :param tags: Only count events having any of these tags.
+    :param country_code: ISO country code to filter by.
+    :param top_n: Number of most recent event ids returned per tile.
+    :param static_delay: Milliseconds after which a closed time range is considered static and cached.
+    :param cache_ttl: Seconds to keep cached tiles. Only bounds memory, stale tiles are never served.
+    :return: A list of EventTile objects ordered by tile key.
+    """
+    scheme = TileScheme(scheme)
+    if scheme == TileScheme.QUADKEY and not 0 <= level <= 23:
+        raise ValueError("Quadkey zoom level must be between 0 and 23")
+    if scheme == TileScheme.GEOHASH and not 1 <= level <= 12:
+        raise ValueError("Geohash precision must be between 1 and 12")
+
+    grid = _TileGrid(scheme, level)
+    filters = {"date_range": date_range, "tags": tags, "country_code": country_code, "top_n": top_n}
+
+    end = date_range[1] if date_range else None
+    static = end is not None and end <= time.time() * 1000 - static_delay
+    crosses_antimeridian = bounding_box is not None and bounding_box[1] > bounding_box[3]
+    if not static or crosses_antimeridian:
+        return _aggregate(grid, bounding_box, **filters)
+
+    block_grid = grid.block_grid()
+    blocks = block_grid.keys_in(bounding_box, MAX_CACHED_BLOCKS)
+    if blocks is None:
+        return _aggregate(grid, bounding_box, **filters)
+
+    filter_hash = hashlib.sha1(json.dumps(filters, sort_keys=True, default=list).encode()).hexdigest()
+    dal = OsintDataAccessLayer()
+    # Read before aggregating, so that blocks aggregated during a write are stored under the old version
+    try:
+        version = QueryCache().versions([EntityNameConstant.EVENT])[EntityNameConstant.EVENT]
+    except Exception:
+        logger.exception("Error reading the event collection version, aggregating tiles without cache")
+        return _aggregate(grid, bounding_box, **filters)
+
+    def cache_key(block: str) -> str:
+        return f"tiles:{grid.scheme.value}:{level}:{block}:{filter_hash}:{version}"
+
+    tiles: List[EventTile] = []
+    missing = []
+    for block in blocks:
+        cached = dal.get(cache_key(block))
+        if cached is None:
+            missing.append(block)
+        else:
+            tiles.extend(EventTile(**tile) for tile in cached)
+
+    if missing:
+        logger.debug(f"Aggregating {len(missing)} of {len(blocks)} tile blocks")
+        bounds = [block_grid.bounds(block) for block in missing]
+        union = (
+            min(b[0] for b in bounds),
+            min(b[1] for b in bounds),
+            max(b[2] for b in bounds),
+            max(b[3] for b in bounds),
+        )
+        by_block: Dict[str, List[EventTile]] = {block: [] for block in missing}
+        for tile in _aggregate(grid, union, **filters):
+            block_tiles = by_block.get(tile.tile[: len(missing[0])])
+            if block_tiles is not None:
+                block_tiles.append(tile)
+        for block, block_tiles in by_block.items():
+            dal.set(cache_key(block), [tile.model_dump() for tile in block_tiles], ttl=cache_ttl)
+            tiles.extend(block_tiles)
+
+    if bounding_box is not None:
+        tiles = [tile for tile in tiles if _intersects(tile.bounds, bounding_box)]
+    return sorted(tiles, key=lambda tile: tile.tile)
+
+
+def _aggregate(
+    grid: "_TileGrid",
+    bounding_box: Optional[Tuple[float, float, float, float]],
+    date_range: Optional[Tuple[Optional[int], Optional[int]]],
+    tags: Optional[List[str]],
+    country_code: Optional[str],
+    top_n: int,
+) -> List[EventTile]:
+    filter_vars: Dict[str, Any] = {}
+    conditions = event_conditions(filter_vars, date_range=date_range, country_code=country_code, tags=tags)
+    conditions += location_conditions(filter_vars, bounding_box=bounding_box)
+    if bounding_box is None:
+        conditions.append("doc.location.latitude != null AND doc.location.longitude != null")
+    filter_str = "\n".join(f"FILTER {c}" for c in conditions)
+
+    cell_x, cell_y, grid_vars = grid.aql_cell()
+    # Longitudes are averaged as unit vectors, so that a tile spanning the antimeridian gets a centroid near it
+    query = f"""
+    FOR doc IN {EntityNameConstant.EVENT}
+        {filter_str}
+        {cell_x}
+        {cell_y}
+        COLLECT x = cell_x, y = cell_y
+        AGGREGATE
+            count = LENGTH(1),
+            latitude = AVERAGE(doc.location.latitude),
+            longitude_sin = AVERAGE(SIN(RADIANS(doc.location.longitude))),
+            longitude_cos = AVERAGE(COS(RADIANS(doc.location.longitude)))
+        RETURN {{ x, y, count, latitude, longitude: DEGREES(ATAN2(longitude_sin, longitude_cos)) }}
+    """
+    bind_vars = {**grid_vars, **filter_vars}
+    try:
+        rows = list(ArangoDBClient().execute(query, bind_vars=bind_vars))
+        keys = [grid.key(row["x"], row["y"]) for row in rows]
+        event_ids = _latest_event_ids(grid, rows, keys, filter_str, bind_vars, top_n) if top_n else None
+    except Exception:
+        logger.exception("Error aggregating event tiles")
+        raise
+
+    return [
+        EventTile(
+            tile=key,
+            count=row["count"],
+            latitude=row["latitude"],
+            longitude=row["longitude"],
+            bounds=grid.bounds(key),
+            event_ids=event_ids[i] if event_ids else [],
+        )
+        for i, (row, key) in enumerate(zip(rows, keys))
+    ]
+
+
+def _latest_event_ids(
+    grid: "_TileGrid",
+    rows: List[Dict[str, Any]],
+    keys: List[str],
+    filter_str: str,
+    bind_vars: Dict[str, Any],
+    top_n: int,
+) -> List[List[str]]:
+    """
+    Returns the ids of the `top_n` most recent events of each tile, with one geo index lookup per tile whose
+    sort keeps only `top_n` events in memory.
+    """
+    tiles = []
+    for row, key in zip(rows, keys):
+        lat, lon, radius = bounding_box_circle(*grid.bounds(key, poles=True))
+        tiles.append({"x": row["x"], "y": row["y"], "lat": lat, "lon": lon, "radius": radius})
+
+    cell_x, cell_y, _ = grid.aql_cell()
+    query = f"""
+    FOR tile IN @tiles
+        RETURN (
+            FOR doc IN {EntityNameConstant.EVENT}
+                FILTER DISTANCE(doc.location.latitude, doc.location.longitude, tile.lat, tile.lon) <= tile.radius
+                {filter_str}
+                {cell_x}
+                {cell_y}
+                FILTER cell_x == tile.x AND cell_y == tile.y
+                SORT doc.happened_at DESC
+                LIMIT @top_n
+                RETURN doc._id
+        )
+    """
+    return list(ArangoDBClient().execute(query, bind_vars={**bind_vars, "tiles": tiles, "top_n": top_n}))
+
+
+def _intersects(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class _TileGrid:
+    def __init__(self, scheme: TileScheme, level: int):
+        self.scheme = scheme
+        self.level = level
+
+    def block_grid(self) -> "_TileGrid":
+        depth = QUADKEY_BLOCK_DEPTH if self.scheme == TileScheme.QUADKEY else GEOHASH_BLOCK_DEPTH
+        return _TileGrid(self.scheme, max(self.level - depth, 0))
+
+    def size(self) -> Tuple[int, int]:
+        if self.scheme == TileScheme.QUADKEY:
+            return 1 << self.level, 1 << self.level
+        lat_bits, lon_bits = geohash_bits(self.level)
+        return 1 << lon_bits, 1 << lat_bits
+
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        if self.scheme == TileScheme.QUADKEY:
+            return quadkey_cell(lat, lon, self.level)
+        return geohash_cell(lat, lon, self.level)
+
+    def key(self, x: int, y: int) -> str:
+        if self.scheme == TileScheme.QUADKEY:
+            return quadkey(x, y, self.level)
+        return geohash(x, y, self.level)
+
+    def bounds(self, key: str, poles: bool = False) -> Tuple[float, float, float, float]:
+        """
+        :param poles: Include the latitudes beyond the Web Mercator limit counted in the edge quadkey tiles.
+        """
+        if self.scheme == TileScheme.QUADKEY:
+            return quadkey_bounds(key, poles)
+        return geohash_bounds(key)
+
+    def keys_in(self, bounding_box: Optional[Tuple[float, float, float, float]], limit: int) -> Optional[List[str]]:
+        """
+        Returns the keys of the tiles covering `bounding_box`, or None when there are more than `limit`.
+        """
+        nx, ny = self.size()
+        if bounding_box is None:
+            xs, ys = range(nx), range(ny)
+        else:
+            x0, y0 = self.cell(bounding_box[0], bounding_box[1])
+            x1, y1 = self.cell(bounding_box[2], bounding_box[3])
+            xs = range(min(x0, x1), max(x0, x1) + 1)
+            ys = range(min(y0, y1), max(y0, y1) + 1)
+        if len(xs) * len(ys) > limit:
+            return None
+        return [self.key(x, y) for x in xs for y in ys]
+
+    def aql_cell(self) -> Tuple[str, str, Dict[str, int]]:
+        """
+        Returns the AQL LET statements computing `cell_x`/`cell_y` of `doc`, and their bind variables.
+        """
+        nx, ny = self.size()
+        cell_x = "LET cell_x = MIN([FLOOR((doc.location.longitude + 180) / 360 * @grid_x), @grid_x - 1])"
+        if self.scheme == TileScheme.QUADKEY:
+            cell_y = f"""
+        LET phi = RADIANS(MAX([MIN([doc.location.latitude, {MAX_MERCATOR_LAT}]), -{MAX_MERCATOR_LAT}]))
+        LET cell_y = MAX([MIN([FLOOR((1 - LOG(TAN(phi) + 1 / COS(phi)) / PI()) / 2 * @grid_y), @grid_y - 1]), 0])
+            """
+        else:
+            cell_y = "LET cell_y = MIN([FLOOR((doc.location.latitude + 90) / 180 * @grid_y), @grid_y - 1])"
+        return cell_x, cell_y, {"grid_x": nx, "grid_y": ny}
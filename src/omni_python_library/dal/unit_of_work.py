@@ -0,0 +1,186 @@
+import logging
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.embedding_text import EMBEDDING_HASH_ATTRIBUTE, embedding_hash, embedding_text
+from omni_python_library.dal.event_rollup import update_event_rollup
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.models.osint import (
+    Event,
+    EventMainData,
+    Organization,
+    OrganizationMainData,
+    Person,
+    PersonMainData,
+    Relation,
+    RelationMainData,
+    Source,
+    SourceMainData,
+    Website,
+    WebsiteMainData,
+)
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.instrumentation import timed
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE, relation_weight
+
+if TYPE_CHECKING:
+    from omni_python_library.dal.osint_data_factory import OsintDataFactory
+
+logger = logging.getLogger(__name__)
+
+Entity = Union[Event, Source, Person, Organization, Website, Relation]
+
+
+class UnitOfWork:
+    """
+    Stages the creation of entities and relations, and writes them all at once in an ArangoDB stream
+    transaction: either every document is created or none is.
+
+    Keys are generated when an entity is staged, so its `id` is final right away and can be used by the
+    relations of the same unit. On commit, the texts of all entities are embedded in one request, each
+    collection is written with one request, and the cache entries, change listeners and event rollup are
+    only updated once the transaction committed.
+
+    Example:
+        with OsintDataAccessLayer().unit_of_work() as unit:
+            source = unit.create_source(SourceMainData(url="https://example.com/a"), owner="crawler")
+            event = unit.create_event(EventMainData(title="Protest"), owner="crawler")
+            unit.create_relation(RelationMainData(name="reports", from_id=source.id, to_id=event.id), "crawler")
+    """
+
+    def __init__(self, dal: "OsintDataFactory", lock_timeout: Optional[int] = None, max_size: Optional[int] = None):
+        """
+        :param dal: The data access layer caching the documents and notifying the listeners.
+        :param lock_timeout: Seconds to wait for the collection locks of the transaction.
+        :param max_size: Maximum transaction size in bytes.
+        """
+        self._dal = dal
+        self._lock_timeout = lock_timeout
+        self._max_size = max_size
+        # (collection, document, instance, embedding text) in staging order
+        self._staged: List[Tuple[str, Dict[str, Any], Entity, Optional[str]]] = []
+        # Edge collection -> (relation name, from collection, to collection)
+        self._edge_collections: Dict[str, Tuple[str, str, str]] = {}
+        self._closed = False
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def create_event(self, data: EventMainData, owner: str) -> Event:
+        return self._stage(Event, data, owner)
+
+    def create_source(self, data: SourceMainData, owner: str) -> Source:
+        return self._stage(Source, data, owner)
+
+    def create_person(self, data: PersonMainData, owner: str) -> Person:
+        return self._stage(Person, data, owner)
+
+    def create_organization(self, data: OrganizationMainData, owner: str) -> Organization:
+        return self._stage(Organization, data, owner)
+
+    def create_website(self, data: WebsiteMainData, owner: str) -> Website:
+        return self._stage(Website, data, owner)
+
+    def create_relation(self, data: RelationMainData, owner: str) -> Relation:
+        """
+        Stages a relation. Its endpoints may be entities staged in this unit or existing ones.
+        """
+        client = ArangoDBClient()
+        from_coll, _ = client.parse_id(data.from_id)
+        to_coll, _ = client.parse_id(data.to_id)
+        collection = f"{from_coll}_{data.name}_{to_coll}"
+        self._edge_collections[collection] = (data.name, from_coll, to_coll)
+
+        doc = Relation(**data.model_dump(exclude_unset=True), owner=owner).model_dump(by_alias=True, exclude_unset=True)
+        doc[WEIGHT_ATTRIBUTE] = relation_weight(data.confidence)
+        instance = self._identify(Relation, collection, doc)
+        self._staged.append((collection, doc, instance, None))
+        return instance
+
+    def commit(self):
+        """
+        Writes the staged documents in one stream transaction, then updates the caches.
+
+        :raises Exception: The error of the failed write, after the transaction was aborted.
+        """
+        self._check_open()
+        self._closed = True
+        if not self._staged:
+            return
+
+        texts = [text for _, _, _, text in self._staged]
+        for (_, doc, _, text), embedding in zip(self._staged, self._dal.generate_embeddings(texts)):
+            if embedding:
+                doc["embedding"] = embedding
+                doc[EMBEDDING_HASH_ATTRIBUTE] = embedding_hash(text)
+
+        client = ArangoDBClient()
+        # Edge collections and their graph definitions cannot be created inside the transaction
+        for name, from_coll, to_coll in self._edge_collections.values():
+            client.get_edge_collection(name, from_coll, to_coll)
+        by_collection: Dict[str, List[int]] = {}
+        for index, (collection, _, _, _) in enumerate(self._staged):
+            by_collection.setdefault(collection, []).append(index)
+
+        logger.debug(f"Committing {len(self._staged)} documents into {len(by_collection)} collections")
+        transaction = client.db.begin_transaction(
+            write=list(by_collection), lock_timeout=self._lock_timeout, max_size=self._max_size
+        )
+        try:
+            with timed(Tier.ARANGO, "transaction"):
+                for collection, indexes in by_collection.items():
+                    metas = transaction.collection(collection).insert_many(
+                        [self._staged[i][1] for i in indexes], raise_on_document_error=True
+                    )
+                    for i, meta in zip(indexes, metas):
+                        self._staged[i][1]["_rev"] = meta["_rev"]
+                transaction.commit_transaction()
+        except Exception:
+            logger.exception("Error committing unit of work, aborting")
+            try:
+                transaction.abort_transaction()
+            except Exception:
+                logger.exception("Error aborting unit of work")
+            raise
+
+        for collection, doc, instance, _ in self._staged:
+            instance.rev = doc["_rev"]
+            if collection == EntityNameConstant.EVENT:
+                update_event_rollup(None, doc)
+            self._dal.set(instance.id, instance.model_dump(by_alias=True))
+            self._dal._notify_change(collection, None, doc)
+
+    def discard(self):
+        """
+        Drops the staged documents without writing them.
+        """
+        self._closed = True
+        self._staged = []
+
+    def _stage(self, model_cls: Type[Entity], data: Any, owner: str) -> Any:
+        self._check_open()
+        collection = model_cls.__name__.lower()
+        doc = model_cls(**data.model_dump(exclude_unset=True), owner=owner).model_dump(
+            by_alias=True, exclude_unset=True
+        )
+        instance = self._identify(model_cls, collection, doc)
+        self._staged.append((collection, doc, instance, embedding_text(collection, data)))
+        return instance
+
+    def _identify(self, model_cls: Type[Entity], collection: str, doc: Dict[str, Any]) -> Any:
+        self._check_open()
+        doc["_key"] = uuid.uuid4().hex
+        doc["_id"] = f"{collection}/{doc['_key']}"
+        return model_cls(**doc)
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("Unit of work already committed or discarded")
@@ -7,8 +7,10 @@ from omni_python_library.dal.view_data_destroyer import ViewDataDestroyer
 from omni_python_library.dal.view_data_factory import ViewDataFactory
 from omni_python_library.dal.view_data_mutator import ViewDataMutator
 from omni_python_library.models.osint import Event, Organization, Person, Relation, Source, Website
+from omni_python_library.models.page import ViewPage
 from omni_python_library.models.view import OsintView
 from omni_python_library.utils.config_registry import ArangoDBConstant, EntityNameConstant
+from omni_python_library.utils.page_token import decode_page_token, encode_page_token, page_scope
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +37,20 @@ class ViewDataAccessLayer(ViewDataFactory, ViewDataMutator, ViewDataDestroyer):
         return None
 
     def query_views(self, text: str, owner: str, lang: str = "en", limit: int = 100) -> List[OsintView]:
+        return self.query_views_page(text, owner, lang=lang, limit=limit).views
+
+    def query_views_page(
+        self, text: str, owner: str, lang: str = "en", limit: int = 100, cursor: Optional[str] = None
+    ) -> ViewPage:
+        """
+        Returns one page of the views of `owner` matching `text`, ordered by key.
+
+        :param cursor: Token of the previous page to continue after, or None for the first page.
+        :return: The views of the page and the token of the next page if there may be one.
+        """
         logger.debug(f"Querying views by text: {text} and owner: {owner}")
+        scope = page_scope("views", text, owner, lang)
+        after = decode_page_token(cursor, scope)["after"] if cursor else None
 
         query = f"""
             LET terms = TOKENS(@text, "text_{lang}")
@@ -49,22 +64,25 @@ class ViewDataAccessLayer(ViewDataFactory, ViewDataMutator, ViewDataDestroyer):
                     f"text_{lang}"
                 )
                 FILTER doc.owner == @owner
+                {"FILTER doc._key > @after" if after else ""}
+                SORT doc._key
                 LIMIT @limit
                 RETURN doc
         """
 
         bind_vars = {"text": text, "owner": owner, "limit": limit}
+        if after:
+            bind_vars["after"] = after
         try:
-            cursor = ArangoDBClient().db.aql.execute(query, bind_vars=bind_vars)
-            results = []
-            for doc in cursor:
-                if isinstance(doc, dict):
-                    results.append(OsintView(**doc))
-            return results
+            results = ArangoDBClient().execute(query, bind_vars=bind_vars)
+            docs = [doc for doc in results if isinstance(doc, dict)]
         except Exception:
             logger.exception("Error querying views by text")
             raise
 
+        next_cursor = encode_page_token(scope, after=docs[-1]["_key"]) if len(docs) == limit else None
+        return ViewPage(views=[OsintView(**doc) for doc in docs], cursor=next_cursor)
+
     def get_entities(self, view_id: str) -> List[Relation | Event | Source | Person | Organization | Website]:
         logger.debug(f"Querying entities connected to view: {view_id}")
 
@@ -2,11 +2,12 @@ import logging
 
 from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import ChangeNotifier
 
 logger = logging.getLogger(__name__)
 
 
-class ViewDataDestroyer(Cacher):
+class ViewDataDestroyer(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
@@ -17,10 +18,11 @@ class ViewDataDestroyer(Cacher):
 
             collection = ArangoDBClient().get_collection(col_name)
 
-            collection.delete({"_key": key})
+            meta = collection.delete({"_key": key}, return_old=True)
 
             # Delete from cache
             self.expel(f"{col_name}/{key}")
+            self._notify_change(col_name, meta["old"], None)
 
             return True
         except Exception:
@@ -2,13 +2,14 @@ import logging
 
 from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import ChangeNotifier
 from omni_python_library.models.view import OsintView, OsintViewMainData
 from omni_python_library.utils.config_registry import EntityNameConstant
 
 logger = logging.getLogger(__name__)
 
 
-class ViewDataFactory(Cacher):
+class ViewDataFactory(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
@@ -27,5 +28,6 @@ class ViewDataFactory(Cacher):
 
         # Cache the new instance
         self.set(instance.id, instance.model_dump(mode="json", by_alias=True))
+        self._notify_change(collection.name, None, new_doc)
 
         return instance
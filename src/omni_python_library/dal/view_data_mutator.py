@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Union
 
 from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.dal.cacher import Cacher
+from omni_python_library.dal.change_notifier import ChangeNotifier
 from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
 from omni_python_library.models.common import Permissive
 from omni_python_library.models.osint import RelationMainData
@@ -12,7 +13,7 @@ from omni_python_library.models.view import OsintView, OsintViewMainData, ViewCo
 logger = logging.getLogger(__name__)
 
 
-class ViewDataMutator(Cacher):
+class ViewDataMutator(Cacher, ChangeNotifier):
     def init(self):
         super().init()
 
@@ -34,7 +35,8 @@ class ViewDataMutator(Cacher):
         query = f"""
         FOR doc IN {col_name}
             FILTER doc._key == @key
-            UPDATE doc WITH {{ configs: APPEND(doc.configs, @config) }} IN {col_name} RETURN NEW
+            UPDATE doc WITH {{ configs: APPEND(doc.configs, @config) }} IN {col_name}
+            RETURN {{ old: OLD, new: NEW }}
         """
 
         bind_vars = {
@@ -42,14 +44,16 @@ class ViewDataMutator(Cacher):
             "config": config.model_dump(by_alias=True),
         }
 
-        cursor = ArangoDBClient().db.aql.execute(query, bind_vars=bind_vars)
+        cursor = ArangoDBClient().execute(query, bind_vars=bind_vars)
         if cursor.empty():
             raise ValueError(f"View {view_id} not found")
 
-        new_doc = cursor.next()
+        row = cursor.next()
+        new_doc = row["new"]
 
         # Update cache
         self.set(new_doc["_id"], new_doc)
+        self._notify_change(col_name, row["old"], new_doc)
 
         return OsintView(**new_doc)
 
@@ -80,7 +84,7 @@ class ViewDataMutator(Cacher):
             # Using DOCUMENT function to check existence.
             # It returns the document or null if not found.
             query = "RETURN DOCUMENT(@id)"
-            cursor = ArangoDBClient().db.aql.execute(query, bind_vars={"id": eid})
+            cursor = ArangoDBClient().execute(query, bind_vars={"id": eid})
             if cursor.empty() or cursor.next() is None:
                 raise ValueError(f"Entity {eid} does not exist in DB")
 
@@ -92,7 +96,7 @@ class ViewDataMutator(Cacher):
             # Update in Arango
             update_doc = data.copy()
             update_doc["_key"] = key
-            meta = collection.update(update_doc, merge=True, return_new=True)
+            meta = collection.update(update_doc, merge=True, return_new=True, return_old=True)
             updated_doc = meta["new"]
             updated_doc["_id"] = meta["_id"]
             updated_doc["_key"] = meta["_key"]
@@ -100,6 +104,7 @@ class ViewDataMutator(Cacher):
 
             # Update cache
             self.set(updated_doc["_id"], updated_doc)
+            self._notify_change(col_name, meta["old"], updated_doc)
 
             return updated_doc
         except Exception:
@@ -0,0 +1,3 @@
+from omni_python_library.export.arrow import ParquetExporter, arrow_schema, record_batches, to_record_batch
+
+__all__ = ["ParquetExporter", "arrow_schema", "record_batches", "to_record_batch"]
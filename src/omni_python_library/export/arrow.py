@@ -0,0 +1,245 @@
+import glob
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.query_tools.entity_paths import relation_collections
+from omni_python_library.export.schema import (
+    BOOL,
+    EMBEDDING,
+    ENTITY_MODELS,
+    FLOAT,
+    INT,
+    JSON,
+    STRING,
+    STRINGS,
+    Column,
+    edge_columns,
+    entity_columns,
+    projection,
+    to_columns,
+)
+from omni_python_library.models.export import CollectionExport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_BATCH_SIZE = 10_000
+DEFAULT_ROWS_PER_FILE = 1_000_000
+# Export time of each collection, the start of the next incremental export
+EXPORT_STATE_FILE = "_export_state.json"
+
+_ARROW_TYPES = {
+    STRING: pa.string(),
+    INT: pa.int64(),
+    FLOAT: pa.float64(),
+    BOOL: pa.bool_(),
+    STRINGS: pa.list_(pa.string()),
+    JSON: pa.string(),
+}
+
+_DOCUMENTS = """
+FOR doc IN @@collection
+    RETURN KEEP(doc, @attributes)
+"""
+_DOCUMENTS_SINCE = """
+FOR doc IN @@collection
+    FILTER DATE_TIMESTAMP(DECODE_REV(doc._rev).date) >= @since
+    RETURN KEEP(doc, @attributes)
+"""
+
+
+def collection_columns(collection: str) -> List[Column]:
+    return entity_columns(collection) if collection in ENTITY_MODELS else edge_columns()
+
+
+def arrow_schema(columns: List[Column], embedding_dimension: int) -> pa.Schema:
+    """
+    Returns the Arrow schema of the columns. Embeddings are fixed-size lists of float32.
+    """
+    return pa.schema(
+        [
+            pa.field(
+                column.name,
+                pa.list_(pa.float32(), embedding_dimension) if column.kind == EMBEDDING else _ARROW_TYPES[column.kind],
+            )
+            for column in columns
+        ]
+    )
+
+
+def to_record_batch(docs: List[Dict[str, Any]], columns: List[Column], schema: pa.Schema) -> pa.RecordBatch:
+    values = to_columns(docs, columns)
+    arrays = []
+    for column, field in zip(columns, schema):
+        if column.kind == EMBEDDING:
+            arrays.append(_embedding_array(values[column.name], field.type))
+        else:
+            arrays.append(pa.array(values[column.name], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def record_batches(
+    collection: str, since: Optional[int] = None, batch_size: int = DEFAULT_EXPORT_BATCH_SIZE
+) -> Iterator[pa.RecordBatch]:
+    """
+    Streams an entity or edge collection as Arrow record batches, holding one batch in memory at a time.
+
+    The query runs as long as the batches are consumed, so it is not bound by the default query time budget
+    of the client; an enclosing `query_limits` block still applies.
+
+    :param since: Only export the documents written at or after this timestamp in milliseconds.
+    :param batch_size: Number of documents per cursor batch and per record batch.
+    """
+    columns = collection_columns(collection)
+    schema = arrow_schema(columns, ArangoDBClient().embedding_dimension)
+    bind_vars: Dict[str, Any] = {"@collection": collection, "attributes": projection(columns)}
+    if since is not None:
+        bind_vars["since"] = since
+    cursor = ArangoDBClient().execute(
+        _DOCUMENTS if since is None else _DOCUMENTS_SINCE,
+        bind_vars=bind_vars,
+        batch_size=batch_size,
+        stream=True,
+        max_runtime=None,
+    )
+
+    docs = []
+    for doc in cursor:
+        docs.append(doc)
+        if len(docs) == batch_size:
+            yield to_record_batch(docs, columns, schema)
+            docs = []
+    if docs:
+        yield to_record_batch(docs, columns, schema)
+
+
+class ParquetExporter:
+    """
+    Exports the entity and relation collections to Parquet files, one directory per collection.
+
+    Each collection is streamed through `record_batches` and written batch by batch, so memory does not grow
+    with the collection size. Files are rolled over every `rows_per_file` rows and only appear under their
+    final name once complete.
+
+    A full export replaces the files of the collection. An incremental export adds files holding the
+    documents written since the previous export of the collection: a document updated between two exports
+    is in the files of both, the one with the latest `_rev` being current. Deletions are not exported.
+
+    Example:
+        ParquetExporter("/data/osint").export(incremental=True)
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+        rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+        compression: str = "zstd",
+    ):
+        """
+        :param directory: The export directory, holding a `<collection>` directory per collection.
+        :param batch_size: Number of documents per record batch, and per Parquet row group.
+        :param rows_per_file: Number of rows after which a new file is started.
+        :param compression: Parquet compression codec.
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+
+    def export(self, collections: Optional[List[str]] = None, incremental: bool = False) -> List[CollectionExport]:
+        """
+        :param collections: The collections to export. Defaults to the entity and relation collections.
+        :param incremental: Only export the documents written since the previous export of each collection.
+                            Collections never exported before are exported in full.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        state = self._load_state()
+        results = []
+        for collection in collections or [*ENTITY_MODELS, *relation_collections()]:
+            started_at = ArangoDBClient().execute("RETURN DATE_NOW()").next()
+            since = None
+            if incremental and collection in state:
+                # Documents written during the previous export may carry an older timestamp, so overlap by 1s
+                since = state[collection] - 1000
+            results.append(self.export_collection(collection, since, started_at))
+            state[collection] = started_at
+            self._save_state(state)
+        return results
+
+    def export_collection(self, collection: str, since: Optional[int], started_at: int) -> CollectionExport:
+        """
+        Writes the documents of a collection written at or after `since`, all of them when None.
+
+        :param started_at: The export timestamp in milliseconds, naming the written files.
+        """
+        target = os.path.join(self.directory, collection)
+        os.makedirs(target, exist_ok=True)
+        previous = [] if since is not None else glob.glob(os.path.join(target, "part-*.parquet"))
+
+        result = CollectionExport(collection=collection, since=since, exported_at=started_at)
+        writer = None
+        rows_in_file = 0
+        try:
+            for batch in record_batches(collection, since, self.batch_size):
+                if writer is None:
+                    path = os.path.join(target, f"part-{started_at}-{len(result.files):05d}.parquet")
+                    writer = pq.ParquetWriter(f"{path}.tmp", batch.schema, compression=self.compression)
+                    result.files.append(path)
+                writer.write_batch(batch)
+                rows_in_file += batch.num_rows
+                result.rows += batch.num_rows
+                if rows_in_file >= self.rows_per_file:
+                    self._close(writer, result.files[-1])
+                    writer, rows_in_file = None, 0
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                os.remove(f"{result.files[-1]}.tmp")
+            raise
+        if writer is not None:
+            self._close(writer, result.files[-1])
+
+        # The files of a full export replace the previous ones only once they are all written
+        for path in previous:
+            if path not in result.files:
+                os.remove(path)
+        logger.debug(f"Exported {result.rows} documents of {collection} into {len(result.files)} files")
+        return result
+
+    def _close(self, writer: pq.ParquetWriter, path: str):
+        writer.close()
+        os.replace(f"{path}.tmp", path)
+
+    def _load_state(self) -> Dict[str, int]:
+        path = os.path.join(self.directory, EXPORT_STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_state(self, state: Dict[str, int]):
+        path = os.path.join(self.directory, EXPORT_STATE_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(f"{path}.tmp", path)
+
+
+def _embedding_array(embeddings: List[Optional[List[float]]], list_type: pa.FixedSizeListType) -> pa.Array:
+    # Missing embeddings, and embeddings of another dimension left by a previous model, are null
+    size = list_type.list_size
+    zeros = [0.0] * size
+    values: List[float] = []
+    mask = []
+    for embedding in embeddings:
+        valid = embedding is not None and len(embedding) == size
+        values.extend(embedding if valid else zeros)
+        mask.append(not valid)
+    return pa.FixedSizeListArray.from_arrays(
+        pa.array(values, pa.float32()), type=list_type, mask=pa.array(mask) if any(mask) else None
+    )
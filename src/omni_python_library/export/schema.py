@@ -0,0 +1,115 @@
+import json
+import typing
+from typing import Any, Dict, List, NamedTuple, Tuple, Type
+
+from pydantic import BaseModel
+
+from omni_python_library.models.osint import Event, Organization, Person, Relation, Source, Website
+from omni_python_library.utils.config_registry import EntityNameConstant
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE
+
+# Column kinds, mapped to Arrow types by `export.arrow.arrow_type`
+STRING = "string"
+INT = "int"
+FLOAT = "float"
+BOOL = "bool"
+STRINGS = "strings"
+# Schema-less values such as `attributes`, written as JSON text
+JSON = "json"
+EMBEDDING = "embedding"
+
+ENTITY_MODELS: Dict[str, Type[BaseModel]] = {
+    EntityNameConstant.EVENT: Event,
+    EntityNameConstant.SOURCE: Source,
+    EntityNameConstant.PERSON: Person,
+    EntityNameConstant.ORGANIZATION: Organization,
+    EntityNameConstant.WEBSITE: Website,
+}
+
+_SCALARS = {str: STRING, int: INT, float: FLOAT, bool: BOOL}
+
+
+class Column(NamedTuple):
+    name: str
+    # Attribute path in the document, more than one attribute for the flattened nested models
+    path: Tuple[str, ...]
+    kind: str
+
+
+def model_columns(model_cls: Type[BaseModel], prefix: Tuple[str, ...] = ()) -> List[Column]:
+    """
+    Returns the columns of the documents of a model, named after the document attributes. Nested models
+    such as `location` are flattened into one column per field, e.g. `location_latitude`.
+    """
+    columns = []
+    for name, field in model_cls.model_fields.items():
+        attribute = field.alias or name
+        annotation = _strip_optional(field.annotation)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            columns.extend(model_columns(annotation, prefix + (attribute,)))
+            continue
+        path = prefix + (attribute,)
+        columns.append(Column("_".join(path), path, _kind(annotation)))
+    return columns
+
+
+def entity_columns(collection: str) -> List[Column]:
+    return _system_first(model_columns(ENTITY_MODELS[collection])) + [Column("embedding", ("embedding",), EMBEDDING)]
+
+
+def edge_columns() -> List[Column]:
+    return _system_first(model_columns(Relation)) + [Column(WEIGHT_ATTRIBUTE, (WEIGHT_ATTRIBUTE,), FLOAT)]
+
+
+def projection(columns: List[Column]) -> List[str]:
+    """
+    Returns the top-level document attributes read by the columns, for a `KEEP` in the export query.
+    """
+    return list(dict.fromkeys(column.path[0] for column in columns))
+
+
+def to_columns(docs: List[Dict[str, Any]], columns: List[Column]) -> Dict[str, List[Any]]:
+    """
+    Transposes documents into one list of values per column, None for the missing attributes.
+    """
+    values: Dict[str, List[Any]] = {}
+    for column in columns:
+        if len(column.path) == 1:
+            attribute = column.path[0]
+            cells = [doc.get(attribute) for doc in docs]
+        else:
+            cells = [_lookup(doc, column.path) for doc in docs]
+        if column.kind == JSON:
+            cells = [None if cell is None else json.dumps(cell) for cell in cells]
+        values[column.name] = cells
+    return values
+
+
+def _system_first(columns: List[Column]) -> List[Column]:
+    # `_id`, `_key`, `_rev`, and `_from` and `_to` for edges, lead
+    return sorted(columns, key=lambda column: not column.name.startswith("_"))
+
+
+def _lookup(doc: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = doc
+    for attribute in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(attribute)
+    return value
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _kind(annotation: Any) -> str:
+    if annotation in _SCALARS:
+        return _SCALARS[annotation]
+    if typing.get_origin(annotation) in (list, List) and typing.get_args(annotation) == (str,):
+        return STRINGS
+    return JSON
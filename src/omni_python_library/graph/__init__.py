@@ -0,0 +1,5 @@
+from omni_python_library.graph.adjacency import GraphIndex
+from omni_python_library.graph.algorithms import connected_components, pagerank
+from omni_python_library.graph.snapshot import GraphSnapshot
+
+__all__ = ["GraphIndex", "GraphSnapshot", "connected_components", "pagerank"]
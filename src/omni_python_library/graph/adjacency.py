@@ -0,0 +1,310 @@
+import logging
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.dal.query_tools.entity_paths import relation_collections
+from omni_python_library.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+_EDGES_SINCE = """
+FOR e IN @@collection
+    FILTER DATE_TIMESTAMP(DECODE_REV(e._rev).date) >= @since
+    RETURN [e._id, e._from, e._to]
+"""
+_EDGE_IDS = """
+FOR e IN @@collection
+    RETURN e._id
+"""
+
+
+class GraphIndex(Singleton):
+    """
+    In-process adjacency index of the relation edge collections, answering 1-hop and 2-hop neighborhoods
+    without a round trip to ArangoDB.
+
+    Vertex and edge ids are interned to int32 numbers. Relations are stored once in endpoint arrays and
+    twice (once per direction) in a CSR adjacency: `indptr[v]:indptr[v + 1]` slices `neighbors` and `edges`.
+    Relations written through the data access layer are applied immediately to an overlay of per-vertex
+    edge lists, which is merged into the CSR arrays once it holds `compact_ratio` of the relations.
+    Relations written by other processes are picked up by `refresh`, which only reads the collections
+    whose revision changed and, within them, the edges whose `_rev` is newer than the previous refresh.
+
+    Memory: the arrays take 8 bytes per vertex and 25 bytes per relation (25 MB per million relations).
+    The interned id strings dominate at roughly 100 bytes per vertex and per relation in CPython.
+    `benchmarks/bench_graph_index.py` measures a million relations between about 780k vertices at 230 MB of
+    `memory_usage`, with a median 1-hop lookup of about 10 µs and a median 2-hop neighborhood of about 40 µs.
+
+    Requires numpy.
+    """
+
+    def init(
+        self,
+        collections: Optional[List[str]] = None,
+        refresh_interval: float = 60.0,
+        compact_ratio: float = 0.1,
+    ):
+        """
+        :param collections: Edge collections to index. Defaults to all relation collections.
+        :param refresh_interval: Seconds between background refreshes, see `start_refresh`.
+        :param compact_ratio: Merge the overlay into the CSR arrays when it holds this share of the relations.
+        """
+        self._configured_collections = collections
+        self._refresh_interval = refresh_interval
+        self._compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset()
+
+        OsintDataAccessLayer().add_change_listener(self._on_change)
+
+    def _reset(self):
+        self._vertex_index: Dict[str, int] = {}
+        self._vertex_ids: List[str] = []
+        self._edge_index: Dict[str, int] = {}
+        self._edge_ids: List[str] = []
+        self._edge_collection: Dict[str, Set[int]] = {}
+        self._src = np.zeros(1024, dtype=np.int32)
+        self._dst = np.zeros(1024, dtype=np.int32)
+        self._alive = np.zeros(1024, dtype=np.bool_)
+        self._dead = 0
+
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._neighbors = np.zeros(0, dtype=np.int32)
+        self._edges = np.zeros(0, dtype=np.int32)
+        self._overlay: Dict[int, List[int]] = {}
+        self._overlay_size = 0
+
+        self._revisions: Dict[str, Any] = {}
+        self._refreshed_at: Optional[int] = None
+
+    def collections(self) -> List[str]:
+        return self._configured_collections or relation_collections()
+
+    def rebuild(self):
+        """
+        Reloads all relations of the indexed collections and rebuilds the CSR arrays.
+        """
+        client = ArangoDBClient()
+        now = self._server_time()
+        with self._lock:
+            self._reset()
+            for name in self.collections():
+                self._revisions[name] = client.get_collection(name).revision()
+                self._load(name, None)
+            self._refreshed_at = now
+            self.compact()
+        logger.debug(f"Built graph index with {len(self._edge_ids)} relations")
+
+    def refresh(self):
+        """
+        Applies the relations created or deleted by other processes since the previous refresh.
+        """
+        if self._refreshed_at is None:
+            self.rebuild()
+            return
+
+        client = ArangoDBClient()
+        now = self._server_time()
+        for name in self.collections():
+            collection = client.get_collection(name)
+            revision = collection.revision()
+            if revision == self._revisions.get(name):
+                continue
+            with self._lock:
+                # Documents written during the previous refresh may carry an older timestamp, so overlap by 1s
+                self._load(name, self._refreshed_at - 1000)
+                if collection.count() != len(self._edge_collection.get(name, ())):
+                    self._remove_missing(name)
+                self._revisions[name] = revision
+        with self._lock:
+            self._refreshed_at = now
+            self._maybe_compact()
+
+    def start_refresh(self):
+        """
+        Starts a daemon thread calling `refresh` every `refresh_interval` seconds.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="graph-index-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def add_edge(self, edge_id: str, from_id: str, to_id: str):
+        with self._lock:
+            known = self._edge_index.get(edge_id)
+            if known is not None and self._alive[known]:
+                if (self._vertex_ids[self._src[known]], self._vertex_ids[self._dst[known]]) == (from_id, to_id):
+                    return
+                self._kill(known)
+
+            edge = len(self._edge_ids)
+            if edge == len(self._alive):
+                self._src = np.concatenate([self._src, np.zeros_like(self._src)])
+                self._dst = np.concatenate([self._dst, np.zeros_like(self._dst)])
+                self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+            src, dst = self._intern(from_id), self._intern(to_id)
+            self._src[edge], self._dst[edge], self._alive[edge] = src, dst, True
+            self._edge_ids.append(edge_id)
+            self._edge_index[edge_id] = edge
+            self._edge_collection.setdefault(edge_id.split("/")[0], set()).add(edge)
+
+            self._overlay.setdefault(src, []).append(edge)
+            if dst != src:
+                self._overlay.setdefault(dst, []).append(edge)
+            self._overlay_size += 1
+            self._maybe_compact()
+
+    def remove_edge(self, edge_id: str):
+        with self._lock:
+            edge = self._edge_index.get(edge_id)
+            if edge is not None and self._alive[edge]:
+                self._kill(edge)
+                self._maybe_compact()
+
+    def neighbors(self, vertex_id: str) -> List[Tuple[str, str]]:
+        """
+        Returns the (neighbor_id, relation_id) pairs of a vertex, in both directions.
+        """
+        with self._lock:
+            vertex = self._vertex_index.get(vertex_id)
+            if vertex is None:
+                return []
+            neighbors, edges = self._adjacent(vertex)
+            return [(self._vertex_ids[n], self._edge_ids[e]) for n, e in zip(neighbors.tolist(), edges.tolist())]
+
+    def neighborhood(self, vertex_id: str, depth: int = 2, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Returns the vertices up to `depth` relations away from a vertex, mapped to their hop distance.
+
+        :param vertex_id: The ID of the start vertex.
+        :param depth: Maximum number of hops.
+        :param limit: Maximum number of vertices to return, nearest first.
+        """
+        with self._lock:
+            start = self._vertex_index.get(vertex_id)
+            if start is None:
+                return {}
+            hops = {start: 0}
+            frontier = np.array([start], dtype=np.int32)
+            for hop in range(1, depth + 1):
+                reached = np.unique(np.concatenate([self._adjacent(v)[0] for v in frontier.tolist()]))
+                frontier = np.array([v for v in reached.tolist() if v not in hops], dtype=np.int32)
+                for v in frontier.tolist():
+                    hops[v] = hop
+                if not len(frontier) or (limit is not None and len(hops) > limit):
+                    break
+            del hops[start]
+            found = sorted(hops.items(), key=lambda item: item[1])[:limit]
+            return {self._vertex_ids[v]: hop for v, hop in found}
+
+    def compact(self):
+        """
+        Rebuilds the CSR arrays from the live relations and clears the overlay.
+        """
+        with self._lock:
+            count = len(self._edge_ids)
+            live = np.flatnonzero(self._alive[:count]).astype(np.int32)
+            src, dst = self._src[live], self._dst[live]
+            loops = src == dst
+            rows = np.concatenate([src, dst[~loops]])
+            cols = np.concatenate([dst, src[~loops]])
+            edges = np.concatenate([live, live[~loops]])
+
+            order = np.argsort(rows, kind="stable")
+            indptr = np.zeros(len(self._vertex_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=len(self._vertex_ids)), out=indptr[1:])
+            self._indptr, self._neighbors, self._edges = indptr, cols[order], edges[order]
+            self._overlay = {}
+            self._overlay_size = 0
+            self._dead = 0
+
+    def memory_usage(self) -> int:
+        """
+        Returns an estimate of the bytes held by the index.
+        """
+        with self._lock:
+            arrays = (self._src, self._dst, self._alive, self._indptr, self._neighbors, self._edges)
+            total = sum(a.nbytes for a in arrays)
+            for ids, index in ((self._vertex_ids, self._vertex_index), (self._edge_ids, self._edge_index)):
+                total += sys.getsizeof(ids) + sys.getsizeof(index) + sum(sys.getsizeof(i) for i in ids)
+            return total
+
+    def _adjacent(self, vertex: int) -> Tuple[np.ndarray, np.ndarray]:
+        if vertex + 1 < len(self._indptr):
+            start, end = self._indptr[vertex], self._indptr[vertex + 1]
+            edges = self._edges[start:end]
+        else:
+            edges = self._edges[:0]
+        if vertex in self._overlay:
+            edges = np.concatenate([edges, np.array(self._overlay[vertex], dtype=np.int32)])
+        edges = edges[self._alive[edges]]
+        neighbors = np.where(self._src[edges] == vertex, self._dst[edges], self._src[edges])
+        return neighbors, edges
+
+    def _intern(self, vertex_id: str) -> int:
+        vertex = self._vertex_index.get(vertex_id)
+        if vertex is None:
+            vertex = len(self._vertex_ids)
+            self._vertex_index[vertex_id] = vertex
+            self._vertex_ids.append(vertex_id)
+        return vertex
+
+    def _kill(self, edge: int):
+        self._alive[edge] = False
+        self._edge_collection.get(self._edge_ids[edge].split("/")[0], set()).discard(edge)
+        self._dead += 1
+
+    def _maybe_compact(self):
+        threshold = max(1000, self._compact_ratio * len(self._neighbors) / 2)
+        if self._overlay_size + self._dead > threshold:
+            self.compact()
+
+    def _load(self, collection: str, since: Optional[int]):
+        if since is None:
+            query, bind_vars = "FOR e IN @@collection RETURN [e._id, e._from, e._to]", {"@collection": collection}
+        else:
+            query, bind_vars = _EDGES_SINCE, {"@collection": collection, "since": since}
+        cursor = ArangoDBClient().execute(query, bind_vars=bind_vars, batch_size=10_000, stream=True, max_runtime=None)
+        for edge_id, from_id, to_id in cursor:
+            self.add_edge(edge_id, from_id, to_id)
+
+    def _remove_missing(self, collection: str):
+        cursor = ArangoDBClient().execute(
+            _EDGE_IDS, bind_vars={"@collection": collection}, batch_size=50_000, stream=True, max_runtime=None
+        )
+        existing = set(cursor)
+        for edge in list(self._edge_collection.get(collection, ())):
+            if self._edge_ids[edge] not in existing:
+                self._kill(edge)
+
+    def _server_time(self) -> int:
+        return ArangoDBClient().execute("RETURN DATE_NOW()").next()
+
+    def _on_change(self, collection: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        if collection not in self.collections():
+            return
+        if new is None and old is not None:
+            self.remove_edge(old["_id"])
+        elif new is not None:
+            self.add_edge(new["_id"], new["_from"], new["_to"])
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Error refreshing graph index")
@@ -0,0 +1,87 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+
+from omni_python_library.graph.snapshot import GraphSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def pagerank(
+    snapshot: GraphSnapshot,
+    damping: float = 0.85,
+    tolerance: float = 1e-6,
+    max_iterations: int = 100,
+    weighted: bool = True,
+    directed: bool = True,
+) -> np.ndarray:
+    """
+    Computes the PageRank of every vertex by power iteration, each iteration being a few vectorized passes
+    over the relations. The rank of vertices without outgoing relations is spread evenly over all vertices.
+
+    :param damping: Probability of following a relation rather than jumping to a random vertex.
+    :param tolerance: Stop once the ranks moved by less than this per vertex, in L1 norm.
+    :param weighted: Follow relations in proportion to their strength, see `GraphSnapshot`.
+    :param directed: Follow relations from their source to their target only, or both ways.
+    :return: The float64 ranks, summing to 1, indexed by vertex number.
+    """
+    n = snapshot.vertex_count
+    if n == 0:
+        return np.zeros(0)
+    sources, targets = snapshot.sources(), np.asarray(snapshot.indices)
+    weights = np.asarray(snapshot.weights, dtype=np.float64) if weighted else np.ones(len(targets))
+    if not directed:
+        sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+        weights = np.concatenate([weights, weights])
+
+    out_weight = np.bincount(sources, weights=weights, minlength=n)
+    dangling = out_weight == 0
+    # Share of the rank of its source carried by each relation
+    share = weights / out_weight[sources]
+
+    ranks = np.full(n, 1.0 / n)
+    for iteration in range(max_iterations):
+        spread = np.bincount(targets, weights=ranks[sources] * share, minlength=n)
+        updated = (1.0 - damping) / n + damping * (spread + ranks[dangling].sum() / n)
+        delta = np.abs(updated - ranks).sum()
+        ranks = updated
+        if delta < n * tolerance:
+            logger.debug(f"PageRank converged after {iteration + 1} iterations")
+            break
+    else:
+        logger.warning(f"PageRank did not converge in {max_iterations} iterations, last change {delta:.3g}")
+    return ranks
+
+
+def connected_components(snapshot: GraphSnapshot) -> Tuple[int, np.ndarray]:
+    """
+    Labels the weakly connected components, ignoring the direction of the relations.
+
+    Every round hooks the root of each relation endpoint to the smaller of the two roots, then shortcuts
+    the resulting trees by pointer jumping, all vectorized. Rounds repeat until no relation crosses two
+    components, about log(diameter) of them.
+
+    :return: The number of components and the component number of each vertex. Components are numbered in
+             the order of their first vertex.
+    """
+    n = snapshot.vertex_count
+    labels = np.arange(n, dtype=np.int64)
+    sources, targets = snapshot.sources(), np.asarray(snapshot.indices)
+    while True:
+        source_labels, target_labels = labels[sources], labels[targets]
+        crossing = source_labels != target_labels
+        if not crossing.any():
+            break
+        source_labels, target_labels = source_labels[crossing], target_labels[crossing]
+        lowest = np.minimum(source_labels, target_labels)
+        np.minimum.at(labels, source_labels, lowest)
+        np.minimum.at(labels, target_labels, lowest)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    roots, components = np.unique(labels, return_inverse=True)
+    return len(roots), components.astype(np.int32)
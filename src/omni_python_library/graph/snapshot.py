@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.dal.bulk import DEFAULT_BATCH_SIZE, batched
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.models.bulk import BulkResult
+from omni_python_library.utils.config_registry import ArangoDBConstant
+from omni_python_library.utils.relation_weight import DEFAULT_WEIGHT, WEIGHT_ATTRIBUTE
+
+logger = logging.getLogger(__name__)
+
+_VERTEX_IDS = """
+FOR v IN @@collection
+    RETURN v._id
+"""
+_EDGES = f"""
+FOR e IN @@collection
+    RETURN [e._from, e._to, e.{WEIGHT_ATTRIBUTE}]
+"""
+
+# Arrays of a saved snapshot, one .npy file each
+_ARRAYS = ("indptr", "indices", "weights", "id_offsets", "id_bytes")
+_META_FILE = "snapshot.json"
+_FORMAT_VERSION = 1
+
+
+class GraphSnapshot:
+    """
+    Read-only copy of named graphs for offline analytics, such as `pagerank` and `connected_components`.
+
+    Vertex ids are interned to the numbers 0..n-1, in the order the vertex collections are read. Relations
+    are stored as a CSR matrix of the outgoing relations: `indices[indptr[v]:indptr[v + 1]]` are the targets
+    of the relations of vertex `v`, and `weights` their strengths, the inverse of their traversal cost. The
+    ids themselves are kept as one UTF-8 buffer with offsets, so that a saved snapshot is memory-mapped
+    rather than read when loaded.
+
+    Memory: 8 bytes per relation and 16 bytes plus the id length per vertex, e.g. 120 MB for ten million
+    relations between a million vertices. Building also needs about 120 bytes per vertex for the interning
+    and 12 bytes per relation for the unsorted relations.
+
+    Requires numpy. `to_scipy` requires scipy.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        id_offsets: np.ndarray,
+        id_bytes: np.ndarray,
+        meta: Optional[Dict] = None,
+    ):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.id_offsets = id_offsets
+        self.id_bytes = id_bytes
+        self.meta = meta or {}
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def build(
+        cls,
+        graphs: Sequence[str] = (ArangoDBConstant.EVENT_RELATED_GRAPH, ArangoDBConstant.EVENT_GRAPH),
+        batch_size: int = 50_000,
+    ) -> "GraphSnapshot":
+        """
+        Streams the vertices and relations of named graphs into a snapshot.
+
+        Relations whose endpoints are missing from the vertex collections are left out.
+
+        :param graphs: The named graphs, whose edge definitions give the vertex and edge collections.
+        :param batch_size: Number of ids per cursor batch.
+        """
+        client = ArangoDBClient()
+        vertex_collections, edge_collections = set(), set()
+        for graph in graphs:
+            for definition in client.db.graph(graph).edge_definitions():
+                edge_collections.add(definition["edge_collection"])
+                vertex_collections.update(definition["from_vertex_collections"])
+                vertex_collections.update(definition["to_vertex_collections"])
+
+        index: Dict[str, int] = {}
+        for collection in sorted(vertex_collections):
+            cursor = client.execute(
+                _VERTEX_IDS,
+                bind_vars={"@collection": collection},
+                batch_size=batch_size,
+                stream=True,
+                max_runtime=None,
+            )
+            for vertex_id in cursor:
+                index[vertex_id] = len(index)
+
+        sources, targets, weights = array("i"), array("i"), array("f")
+        dangling = 0
+        for collection in sorted(edge_collections):
+            cursor = client.execute(
+                _EDGES, bind_vars={"@collection": collection}, batch_size=batch_size, stream=True, max_runtime=None
+            )
+            for from_id, to_id, weight in cursor:
+                source, target = index.get(from_id), index.get(to_id)
+                if source is None or target is None:
+                    dangling += 1
+                    continue
+                sources.append(source)
+                targets.append(target)
+                weights.append(1.0 / (weight or DEFAULT_WEIGHT))
+        if dangling:
+            logger.warning(f"Left {dangling} relations with missing endpoints out of the graph snapshot")
+
+        meta = {
+            "graphs": list(graphs),
+            "vertex_collections": sorted(vertex_collections),
+            "edge_collections": sorted(edge_collections),
+            "built_at": int(time.time() * 1000),
+        }
+        snapshot = cls.from_edges(
+            list(index),
+            np.frombuffer(sources, dtype=np.int32),
+            np.frombuffer(targets, dtype=np.int32),
+            np.frombuffer(weights, dtype=np.float32),
+            meta,
+        )
+        snapshot._index = index
+        logger.debug(f"Built graph snapshot with {snapshot.vertex_count} vertices and {snapshot.edge_count} relations")
+        return snapshot
+
+    @classmethod
+    def from_edges(
+        cls,
+        vertex_ids: List[str],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+        meta: Optional[Dict] = None,
+    ) -> "GraphSnapshot":
+        """
+        Builds a snapshot from relations given as vertex numbers, indexes into `vertex_ids`.
+        """
+        if weights is None:
+            weights = np.ones(len(sources), dtype=np.float32)
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(vertex_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(vertex_ids)), out=indptr[1:])
+
+        encoded = [vertex_id.encode() for vertex_id in vertex_ids]
+        id_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=id_offsets[1:])
+        id_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(
+            indptr,
+            np.ascontiguousarray(targets[order], dtype=np.int32),
+            np.ascontiguousarray(weights[order], dtype=np.float32),
+            id_offsets,
+            id_bytes,
+            meta,
+        )
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "GraphSnapshot":
+        """
+        Opens a snapshot saved with `save`.
+
+        :param mmap: Memory-map the arrays instead of reading them, so that they are paged in on access and
+                     shared between the processes opening the same snapshot.
+        """
+        with open(os.path.join(directory, _META_FILE), encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph snapshot version {meta.get('version')} in {directory}")
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in _ARRAYS]
+        return cls(*arrays, meta=meta)
+
+    def save(self, directory: str):
+        """
+        Writes the snapshot as one .npy file per array and a JSON metadata file, written last.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        meta = {
+            **self.meta,
+            "version": _FORMAT_VERSION,
+            "vertex_count": self.vertex_count,
+            "edge_count": self.edge_count,
+        }
+        with open(os.path.join(directory, _META_FILE), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def vertex_id(self, vertex: int) -> str:
+        return bytes(self.id_bytes[self.id_offsets[vertex] : self.id_offsets[vertex + 1]]).decode()
+
+    def vertex_ids(self, vertices: Optional[Iterable[int]] = None) -> List[str]:
+        """
+        Returns the ids of vertex numbers, of all vertices by default.
+        """
+        if vertices is None:
+            buffer = bytes(self.id_bytes).decode()
+            offsets = self.id_offsets.tolist()
+            if len(buffer) == offsets[-1]:
+                # ASCII ids: character offsets are byte offsets
+                return [buffer[offsets[i] : offsets[i + 1]] for i in range(self.vertex_count)]
+            vertices = range(self.vertex_count)
+        return [self.vertex_id(vertex) for vertex in vertices]
+
+    def vertex(self, vertex_id: str) -> Optional[int]:
+        """
+        Returns the number of a vertex id, None when missing. The first call builds a dictionary of all ids.
+        """
+        if self._index is None:
+            self._index = {vertex_id: vertex for vertex, vertex_id in enumerate(self.vertex_ids())}
+        return self._index.get(vertex_id)
+
+    def sources(self) -> np.ndarray:
+        """
+        Returns the source vertex of each relation, aligned with `indices` and `weights`.
+        """
+        return np.repeat(np.arange(self.vertex_count, dtype=np.int32), np.diff(self.indptr))
+
+    def to_scipy(self, weighted: bool = True):
+        """
+        Returns the adjacency matrix as a `scipy.sparse.csr_array`, without copying the arrays. Requires scipy.
+
+        :param weighted: Use the relation strengths as values, or ones.
+        """
+        from scipy.sparse import csr_array
+
+        data = self.weights if weighted else np.ones(self.edge_count, dtype=np.float32)
+        return csr_array((data, self.indices, self.indptr), shape=(self.vertex_count, self.vertex_count))
+
+    def write_back(
+        self,
+        scores: Dict[str, np.ndarray],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        vertices: Optional[np.ndarray] = None,
+    ) -> BulkResult:
+        """
+        Stores per-vertex scores in the `attributes` of the entities through `update_many`, keeping the
+        caches and change listeners up to date.
+
+        Example:
+            snapshot.write_back({"pagerank": pagerank(snapshot), "component": connected_components(snapshot)[1]})
+
+        :param scores: Arrays of one value per vertex, by attribute name.
+        :param batch_size: Number of documents written per request.
+        :param vertices: Only write the scores of these vertex numbers, e.g. those whose score changed.
+        """
+        vertices = np.arange(self.vertex_count) if vertices is None else np.asarray(vertices)
+        columns = {name: values.tolist() for name, values in scores.items()}
+        result = BulkResult()
+        dal = OsintDataAccessLayer()
+        for chunk in batched(vertices.tolist(), batch_size):
+            updates = {
+                self.vertex_id(vertex): {"attributes": {name: values[vertex] for name, values in columns.items()}}
+                for vertex in chunk
+            }
+            written = dal.update_many(updates, batch_size=batch_size, reembed=False)
+            result.ids.extend(written.ids)
+            result.errors.update(written.errors)
+        logger.debug(f"Wrote {list(scores)} of {len(result.ids)} vertices, {len(result.errors)} failed")
+        return result
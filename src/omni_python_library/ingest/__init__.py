@@ -0,0 +1,5 @@
+from omni_python_library.ingest.checkpoint import Checkpoint
+from omni_python_library.ingest.pipeline import IngestPipeline, validate_records
+from omni_python_library.ingest.readers import decode_record, detect_format, read_records
+
+__all__ = ["Checkpoint", "IngestPipeline", "decode_record", "detect_format", "read_records", "validate_records"]
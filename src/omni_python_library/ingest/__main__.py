@@ -0,0 +1,5 @@
+import sys
+
+from omni_python_library.ingest.cli import main
+
+sys.exit(main())
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Progress of the ingestion of one input file, saved as a JSON file so that a crashed run resumes.
+
+    `committed` counts the leading records of the input whose batches were all written. `submitted` counts
+    the records whose batches were sent to ArangoDB, some possibly written before the crash. The documents
+    get keys derived from the run id and their position in the input, so the replayed records between
+    `committed` and `submitted` are not written twice.
+    """
+
+    def __init__(self, path: Optional[str], input_path: str, collection: str):
+        """
+        :param path: The checkpoint file. None keeps the progress in memory only.
+        :param input_path: The ingested file.
+        :param collection: The collection the records are ingested into.
+        """
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.collection = collection
+        self.run_id = uuid.uuid4().hex
+        self.committed = 0
+        self.submitted = 0
+
+    def load(self) -> bool:
+        """
+        Restores the progress saved by a previous run.
+
+        :return: Whether a previous run was found.
+        :raises ValueError: The checkpoint file belongs to another input or collection.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as file:
+            state = json.load(file)
+        if state["input"] != self.input_path or state["collection"] != self.collection:
+            raise ValueError(
+                f"Checkpoint {self.path} is for {state['input']} into {state['collection']}, "
+                f"not {self.input_path} into {self.collection}"
+            )
+        self.run_id = state["run_id"]
+        self.committed = state["committed"]
+        self.submitted = state["submitted"]
+        logger.debug(f"Resuming run {self.run_id} at record {self.committed} of {self.input_path}")
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        state = {
+            "input": self.input_path,
+            "collection": self.collection,
+            "run_id": self.run_id,
+            "committed": self.committed,
+            "submitted": self.submitted,
+        }
+        # Written aside then renamed, so a crash never leaves a truncated checkpoint
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.path)
+
+    def key(self, index: int) -> str:
+        """
+        Returns the document key of the record at `index` of the input.
+        """
+        return uuid.uuid5(uuid.UUID(self.run_id), str(index)).hex
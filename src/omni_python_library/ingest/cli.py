@@ -0,0 +1,56 @@
+"""
+Command line entry point of the ingest pipeline, installed as `omni-ingest`.
+
+The clients are configured like `init_omni_library`, from the config files or environment variables.
+
+Usage:
+    omni-ingest events.ndjson.gz --collection event --owner importer --checkpoint events.ckpt
+    omni-ingest relations.parquet --collection relation --owner importer --no-embed
+"""
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from omni_python_library import init_omni_library
+from omni_python_library.dal.bulk import DEFAULT_BATCH_SIZE
+from omni_python_library.ingest.pipeline import MAIN_DATA, IngestPipeline
+from omni_python_library.ingest.readers import CSV, NDJSON, PARQUET
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="omni-ingest", description="Load an OSINT dump into one collection")
+    parser.add_argument("input", help="NDJSON, CSV or Parquet file, NDJSON and CSV possibly gzip-compressed")
+    parser.add_argument("--collection", required=True, choices=sorted(MAIN_DATA))
+    parser.add_argument("--owner", required=True, help="Owner of the created documents")
+    parser.add_argument("--format", choices=[NDJSON, CSV, PARQUET], help="Detected from the extension by default")
+    parser.add_argument("--checkpoint", help="Progress file, resumed from when it exists")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, help="Validation processes, defaults to the number of CPUs")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Batches embedded or written concurrently")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embedding request")
+    parser.add_argument("--no-embed", action="store_true", help="Leave the embeddings to a later `reembed`")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress logs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_omni_library()
+    pipeline = IngestPipeline(
+        args.collection,
+        owner=args.owner,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        embed=not args.no_embed,
+        embed_batch_size=args.embed_batch_size,
+        checkpoint_path=args.checkpoint,
+        report_every=args.report_every,
+    )
+    summary = pipeline.run(args.input, args.format)
+    print(summary.model_dump_json(indent=2))
+    return 1 if summary.invalid or summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
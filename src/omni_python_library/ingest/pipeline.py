@@ -0,0 +1,283 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from omni_python_library.dal.bulk import DEFAULT_BATCH_SIZE, batched
+from omni_python_library.dal.embedding_text import EMBEDDING_TEXT, embedding_text
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.ingest.checkpoint import Checkpoint
+from omni_python_library.ingest.readers import RawRecord, decode_record, detect_format, read_records
+from omni_python_library.models.ingest import IngestSummary, StageThroughput
+from omni_python_library.models.osint import (
+    EventMainData,
+    OrganizationMainData,
+    PersonMainData,
+    RelationMainData,
+    SourceMainData,
+    WebsiteMainData,
+)
+from omni_python_library.utils.config_registry import EntityNameConstant
+
+logger = logging.getLogger(__name__)
+
+# Main data model of the records of each collection that can be ingested
+MAIN_DATA: Dict[str, Type[BaseModel]] = {
+    EntityNameConstant.EVENT: EventMainData,
+    EntityNameConstant.SOURCE: SourceMainData,
+    EntityNameConstant.PERSON: PersonMainData,
+    EntityNameConstant.ORGANIZATION: OrganizationMainData,
+    EntityNameConstant.WEBSITE: WebsiteMainData,
+    EntityNameConstant.RELATION: RelationMainData,
+}
+
+STAGES = ("read", "validate", "embed", "write")
+
+# Invalid and rejected records are logged up to this many per run, then only counted
+_MAX_LOGGED_ERRORS = 20
+
+
+def validate_records(
+    collection: str, input_format: str, records: List[RawRecord]
+) -> Tuple[List[Optional[BaseModel]], List[Tuple[int, str]], float]:
+    """
+    Decodes and validates a chunk of raw records, in a worker process of the pipeline.
+
+    :return: The main data of each record, None for the invalid ones, the (position, error message) of the
+             invalid records, and the seconds spent.
+    """
+    start = time.perf_counter()
+    model_cls = MAIN_DATA[collection]
+    models: List[Optional[BaseModel]] = []
+    errors: List[Tuple[int, str]] = []
+    for position, record in enumerate(records):
+        try:
+            models.append(model_cls.model_validate(decode_record(record, input_format)))
+        except ValueError as e:
+            models.append(None)
+            errors.append((position, str(e)))
+    return models, errors, time.perf_counter() - start
+
+
+class IngestPipeline:
+    """
+    Loads a large NDJSON, CSV or Parquet file into one collection through `OsintDataAccessLayer.ingest`.
+
+    The stages overlap: the main process reads chunks of `batch_size` records, a process pool decodes and
+    validates them into main data models, and up to `max_in_flight` threads each embed a batch, in requests
+    of `embed_batch_size` texts, then write it with one insert. When the writers fall behind, the reader
+    waits for the oldest batch, so the memory held is bounded by the number of batches in flight.
+
+    Batches are committed in input order: the checkpoint records how many leading records are written, and
+    a run started again with the same checkpoint file skips them. Documents get keys derived from the run
+    and their position in the input, so the batches in flight during a crash are not duplicated when they
+    are written again.
+
+    Example:
+        summary = IngestPipeline("event", owner="importer", checkpoint_path="events.ckpt").run("events.ndjson")
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        owner: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: Optional[int] = None,
+        max_in_flight: int = 4,
+        embed: bool = True,
+        embed_batch_size: int = 256,
+        checkpoint_path: Optional[str] = None,
+        report_every: float = 10.0,
+    ):
+        """
+        :param collection: The collection the records are written into, one of `MAIN_DATA`.
+        :param owner: The owner of the created documents.
+        :param batch_size: Number of records validated, embedded and written together.
+        :param workers: Number of validation processes. Defaults to the number of CPUs, 0 validates in the
+                        main process.
+        :param max_in_flight: Number of batches embedded or written concurrently.
+        :param embed: Embed the entities. Pass False and call `reembed` later to defer the embedding requests.
+        :param embed_batch_size: Number of texts per embedding request.
+        :param checkpoint_path: File recording the progress. None disables resuming.
+        :param report_every: Seconds between two progress logs.
+        """
+        if collection not in MAIN_DATA:
+            raise ValueError(f"Cannot ingest into {collection}, expected one of {sorted(MAIN_DATA)}")
+        self.collection = collection
+        self.owner = owner
+        self.batch_size = batch_size
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_in_flight = max_in_flight
+        self.embed = embed and collection in EMBEDDING_TEXT
+        self.embed_batch_size = embed_batch_size
+        self.checkpoint_path = checkpoint_path
+        self.report_every = report_every
+
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self._logged_errors = 0
+
+    def run(self, path: str, input_format: Optional[str] = None) -> IngestSummary:
+        """
+        Ingests a file, resuming the previous run recorded in the checkpoint file if any.
+
+        :param input_format: One of `ndjson`, `csv` and `parquet`. Detected from the extension by default.
+        """
+        input_format = input_format or detect_format(path)
+        checkpoint = Checkpoint(self.checkpoint_path, path, self.collection)
+        checkpoint.load()
+        summary = IngestSummary(resumed_at=checkpoint.committed)
+        self._stages = {stage: [0, 0.0] for stage in STAGES}
+        self._logged_errors = 0
+        logger.info(f"Ingesting {path} into {self.collection} from record {checkpoint.committed}")
+
+        started_at = last_report = time.perf_counter()
+        validations: Deque[Tuple[int, int, Future]] = deque()
+        writes: Deque[Tuple[int, Future]] = deque()
+        validators = ProcessPoolExecutor(self.workers) if self.workers else None
+        writers = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="ingest")
+        try:
+            records = read_records(path, input_format, skip=checkpoint.committed)
+            offset = checkpoint.committed
+            while True:
+                start = time.perf_counter()
+                chunk = list(itertools.islice(records, self.batch_size))
+                self._observe("read", len(chunk), time.perf_counter() - start)
+                if not chunk:
+                    break
+                summary.read += len(chunk)
+                if validators:
+                    future = validators.submit(validate_records, self.collection, input_format, chunk)
+                else:
+                    future = Future()
+                    future.set_result(validate_records(self.collection, input_format, chunk))
+                validations.append((offset, len(chunk), future))
+                offset += len(chunk)
+
+                while len(validations) > max(self.workers, 1) * 2:
+                    self._dispatch(validations.popleft(), writes, writers, checkpoint, summary)
+                if time.perf_counter() - last_report >= self.report_every:
+                    self._log_progress(summary, time.perf_counter() - started_at)
+                    last_report = time.perf_counter()
+
+            while validations:
+                self._dispatch(validations.popleft(), writes, writers, checkpoint, summary)
+            while writes:
+                self._commit(writes.popleft(), checkpoint, summary)
+        finally:
+            writers.shutdown(wait=True, cancel_futures=True)
+            if validators:
+                validators.shutdown(wait=True, cancel_futures=True)
+
+        summary.seconds = time.perf_counter() - started_at
+        summary.records_per_s = summary.read / summary.seconds if summary.seconds else 0.0
+        summary.stages = self._throughput()
+        self._log_progress(summary, summary.seconds)
+        return summary
+
+    def _dispatch(
+        self,
+        validation: Tuple[int, int, Future],
+        writes: Deque[Tuple[int, Future]],
+        writers: ThreadPoolExecutor,
+        checkpoint: Checkpoint,
+        summary: IngestSummary,
+    ):
+        """
+        Hands a validated chunk to a writer, after waiting for the oldest write when `max_in_flight` are running.
+        """
+        offset, count, future = validation
+        models, errors, seconds = future.result()
+        self._observe("validate", count, seconds)
+        summary.invalid += len(errors)
+        for position, message in errors:
+            self._log_error(f"Invalid record {offset + position}: {message}")
+
+        while len(writes) >= self.max_in_flight:
+            self._commit(writes.popleft(), checkpoint, summary)
+        items = [(offset + position, model) for position, model in enumerate(models) if model is not None]
+        checkpoint.submitted = offset + count
+        checkpoint.save()
+        writes.append((offset + count, writers.submit(self._write, items, checkpoint)))
+
+    def _commit(self, write: Tuple[int, Future], checkpoint: Checkpoint, summary: IngestSummary):
+        end, future = write
+        written, failed = future.result()
+        summary.written += written
+        summary.failed += failed
+        checkpoint.committed = end
+        checkpoint.save()
+
+    def _write(self, items: List[Tuple[int, BaseModel]], checkpoint: Checkpoint) -> Tuple[int, int]:
+        """
+        Embeds and writes a batch, in a writer thread.
+
+        :return: The number of written and of failed records.
+        """
+        if not items:
+            return 0, 0
+        dal = OsintDataAccessLayer()
+        models = [model for _, model in items]
+        embeddings = None
+        if self.embed:
+            start = time.perf_counter()
+            embeddings = []
+            for chunk in batched(models, self.embed_batch_size):
+                embeddings.extend(dal.generate_embeddings([embedding_text(self.collection, m) for m in chunk]))
+            self._observe("embed", len(models), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        handles = dal.ingest(
+            models,
+            owner=self.owner,
+            embed=False,
+            batch_size=len(models),
+            keys=[checkpoint.key(index) for index, _ in items],
+            embeddings=embeddings,
+        )
+        self._observe("write", len(models), time.perf_counter() - start)
+
+        failed = [index for (index, _), handle in zip(items, handles) if handle is None]
+        for index in failed:
+            self._log_error(f"Record {index} was not written")
+        return len(items) - len(failed), len(failed)
+
+    def _observe(self, stage: str, records: int, seconds: float):
+        with self._lock:
+            totals = self._stages[stage]
+            totals[0] += records
+            totals[1] += seconds
+
+    def _throughput(self) -> List[StageThroughput]:
+        with self._lock:
+            return [
+                StageThroughput(
+                    stage=stage,
+                    records=int(records),
+                    seconds=seconds,
+                    records_per_s=records / seconds if seconds else 0.0,
+                )
+                for stage, (records, seconds) in self._stages.items()
+            ]
+
+    def _log_error(self, message: str):
+        with self._lock:
+            self._logged_errors += 1
+            if self._logged_errors > _MAX_LOGGED_ERRORS:
+                return
+        logger.warning(message)
+        if self._logged_errors == _MAX_LOGGED_ERRORS:
+            logger.warning("Further invalid or rejected records are only counted")
+
+    def _log_progress(self, summary: IngestSummary, seconds: float):
+        stages = ", ".join(f"{s.stage} {s.records_per_s:.0f}/s" for s in self._throughput())
+        logger.info(
+            f"Read {summary.read} records in {seconds:.1f}s ({summary.read / max(seconds, 1e-9):.0f}/s): "
+            f"{summary.written} written, {summary.invalid} invalid, {summary.failed} failed; per worker {stages}"
+        )
@@ -0,0 +1,122 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "ndjson"
+CSV = "csv"
+PARQUET = "parquet"
+
+_SUFFIXES = {
+    ".ndjson": NDJSON,
+    ".jsonl": NDJSON,
+    ".json": NDJSON,
+    ".csv": CSV,
+    ".parquet": PARQUET,
+    ".pq": PARQUET,
+}
+
+# A raw record: an NDJSON line, a CSV row of strings by column, or a Parquet row
+RawRecord = Union[str, Dict[str, Any]]
+
+
+def detect_format(path: str) -> str:
+    """
+    Returns the format of an input file from its extension, ignoring a trailing `.gz`.
+
+    :raises ValueError: The extension is not one of a known format.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    input_format = _SUFFIXES.get(os.path.splitext(name)[1].lower())
+    if input_format is None:
+        raise ValueError(f"Cannot tell the format of {path}, expected one of {sorted(_SUFFIXES)}")
+    return input_format
+
+
+def read_records(path: str, input_format: Optional[str] = None, skip: int = 0) -> Iterator[RawRecord]:
+    """
+    Streams the raw records of an input file without decoding them, see `decode_record`.
+
+    NDJSON and CSV files may be gzip-compressed. Blank NDJSON lines are not records.
+
+    :param input_format: One of `ndjson`, `csv` and `parquet`. Detected from the extension by default.
+    :param skip: Number of records to skip, e.g. the records ingested before a crash.
+    """
+    input_format = input_format or detect_format(path)
+    if input_format == PARQUET:
+        yield from _read_parquet(path, skip)
+        return
+
+    with _open_text(path) as file:
+        if input_format == NDJSON:
+            records: Iterator[RawRecord] = (line for line in file if line.strip())
+        elif input_format == CSV:
+            records = csv.DictReader(file)
+        else:
+            raise ValueError(f"Unknown input format {input_format}")
+        for index, record in enumerate(records):
+            if index >= skip:
+                yield record
+
+
+def decode_record(record: RawRecord, input_format: str) -> Dict[str, Any]:
+    """
+    Turns a raw record into the fields of a main data model.
+
+    NDJSON lines are parsed. CSV cells are strings: empty cells are left out, cells holding a JSON array or
+    object are parsed, and dotted column names nest, e.g. `location.latitude`. Other values are converted
+    by the model validation. Null Parquet values are left out.
+
+    :raises ValueError: The record is not valid JSON.
+    """
+    if input_format == NDJSON:
+        return json.loads(record)
+    if input_format == CSV:
+        fields: Dict[str, Any] = {}
+        for column, cell in record.items():
+            if column is None or not cell:
+                continue
+            if cell[0] in "[{":
+                try:
+                    cell = json.loads(cell)
+                except ValueError:
+                    pass
+            *parents, name = column.split(".")
+            target = fields
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[name] = cell
+        return fields
+    return {name: value for name, value in record.items() if value is not None}
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _read_parquet(path: str, skip: int, batch_size: int = 10_000) -> Iterator[Dict[str, Any]]:
+    # Requires pyarrow. Row groups ingested by a previous run are not read at all.
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    first = 0
+    while first < parquet.num_row_groups and skip >= parquet.metadata.row_group(first).num_rows:
+        skip -= parquet.metadata.row_group(first).num_rows
+        first += 1
+    row_groups = list(range(first, parquet.num_row_groups))
+    logger.debug(f"Reading {len(row_groups)} of {parquet.num_row_groups} row groups of {path}")
+    if not row_groups:
+        return
+
+    for batch in parquet.iter_batches(batch_size=batch_size, row_groups=row_groups):
+        rows = batch.to_pylist()
+        if skip:
+            rows, skip = rows[skip:], max(0, skip - len(rows))
+        yield from rows
@@ -0,0 +1,46 @@
+from enum import Enum
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class TileScheme(str, Enum):
+    QUADKEY = "quadkey"
+    GEOHASH = "geohash"
+
+
+class EventTile(BaseModel):
+    """
+    Aggregate of the events located in one map tile.
+    """
+
+    tile: str = Field(description="Quadkey or geohash of the tile")
+    count: int = Field(description="Number of events in the tile")
+    latitude: float = Field(description="Latitude of the centroid of the events in the tile")
+    longitude: float = Field(description="Longitude of the centroid of the events in the tile")
+    bounds: Tuple[float, float, float, float] = Field(
+        description="(min_latitude, min_longitude, max_latitude, max_longitude) of the tile"
+    )
+    event_ids: List[str] = Field(default_factory=list, description="Ids of the most recent events in the tile")
+
+
+class HistogramInterval(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+
+
+class HistogramDimension(str, Enum):
+    COUNTRY_CODE = "country_code"
+    TYPE = "type"
+    TAGS = "tags"
+
+
+class HistogramBucket(BaseModel):
+    """
+    Number of events in one time bucket, optionally for one value of the grouping dimension.
+    """
+
+    bucket: int = Field(description="Start timestamp of the bucket")
+    value: Optional[str] = Field(default=None, description="Value of the grouping dimension")
+    count: int = Field(description="Number of events in the bucket")
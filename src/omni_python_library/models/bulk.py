@@ -0,0 +1,36 @@
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class UpsertResult(BaseModel):
+    """
+    Outcome of a bulk upsert by natural key.
+    """
+
+    ids: List[str] = Field(default_factory=list, description="Ids of the upserted documents, in input order")
+    inserted: int = Field(default=0, description="Number of documents created")
+    updated: int = Field(default=0, description="Number of existing documents updated")
+    embedded: int = Field(default=0, description="Number of documents whose embedding was (re)generated")
+
+
+class BulkProgress(BaseModel):
+    """
+    Progress of a bulk update or delete, reported after each batch.
+    """
+
+    done: int = Field(description="Number of documents processed so far, including failed ones")
+    total: int = Field(description="Number of documents to process")
+    failed: int = Field(default=0, description="Number of documents that could not be written so far")
+
+
+class BulkResult(BaseModel):
+    """
+    Outcome of a bulk update or delete.
+    """
+
+    ids: List[str] = Field(default_factory=list, description="Ids of the written documents")
+    cascaded: List[str] = Field(
+        default_factory=list, description="Ids of the relations deleted along with the deleted entities"
+    )
+    errors: Dict[str, str] = Field(default_factory=dict, description="Error message by id of the failed documents")
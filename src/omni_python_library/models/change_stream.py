@@ -0,0 +1,26 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChangeOperation(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class ChangeRecord(BaseModel):
+    """
+    A document written through the data access layers, as appended to the change stream.
+    """
+
+    entry_id: Optional[str] = Field(default=None, description="Redis stream entry ID, used to acknowledge it")
+    id: str = Field(description="ID of the written document")
+    collection: str = Field(description="Collection of the document")
+    operation: ChangeOperation = Field(description="Kind of write")
+    rev: Optional[str] = Field(default=None, description="Revision written, the deleted revision for deletes")
+    fields: List[str] = Field(
+        default_factory=list, description="Attributes set on create or changed by an update, empty on delete"
+    )
+    timestamp: int = Field(description="Time of the write in milliseconds")
@@ -0,0 +1,17 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CollectionExport(BaseModel):
+    """
+    Outcome of the export of one collection.
+    """
+
+    collection: str = Field(description="Name of the exported collection")
+    rows: int = Field(default=0, description="Number of documents exported")
+    files: List[str] = Field(default_factory=list, description="Paths of the written files")
+    since: Optional[int] = Field(
+        default=None, description="Timestamp in ms the exported documents were written since, None for a full export"
+    )
+    exported_at: int = Field(description="Timestamp in ms of the export, the start of the next incremental one")
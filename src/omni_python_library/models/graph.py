@@ -0,0 +1,32 @@
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from omni_python_library.models.osint import Event, Organization, Person, Relation, Source, Website
+
+
+class NeighborhoodPage(BaseModel):
+    """
+    One page of a multi-hop neighborhood exploration.
+    """
+
+    vertices: List[Union[Event, Source, Person, Organization, Website]] = Field(
+        default_factory=list, description="Vertices found, ordered by hop"
+    )
+    edges: List[Relation] = Field(default_factory=list, description="Edges connecting the vertices to the previous hop")
+    hops: Dict[str, int] = Field(default_factory=dict, description="Hop distance of each vertex id")
+    continuation: Optional[str] = Field(
+        default=None, description="Token returning the vertices left out by the caps, None when complete"
+    )
+
+
+class EntityPath(BaseModel):
+    """
+    A chain of entities connected by relations, from the start entity to the target entity.
+    """
+
+    vertices: List[Union[Event, Source, Person, Organization, Website]] = Field(
+        default_factory=list, description="Entities along the path, starting with the start entity"
+    )
+    edges: List[Relation] = Field(default_factory=list, description="Relations between consecutive vertices")
+    weight: float = Field(description="Number of hops, or sum of relation weights for weighted paths")
@@ -0,0 +1,29 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class StageThroughput(BaseModel):
+    """
+    Records processed by one stage of the ingest pipeline and the time its workers spent on them.
+    """
+
+    stage: str = Field(description="Stage name: read, validate, embed or write")
+    records: int = Field(default=0, description="Number of records processed by the stage")
+    seconds: float = Field(default=0.0, description="Time spent by the workers of the stage, summed over workers")
+    records_per_s: float = Field(default=0.0, description="Records per second of one worker of the stage")
+
+
+class IngestSummary(BaseModel):
+    """
+    Outcome of an ingest pipeline run.
+    """
+
+    resumed_at: int = Field(default=0, description="Number of records skipped as ingested by a previous run")
+    read: int = Field(default=0, description="Number of records read in this run")
+    invalid: int = Field(default=0, description="Number of records rejected by validation")
+    written: int = Field(default=0, description="Number of documents written, or found written by a previous run")
+    failed: int = Field(default=0, description="Number of valid records ArangoDB rejected")
+    seconds: float = Field(default=0.0, description="Wall-clock duration of the run")
+    records_per_s: float = Field(default=0.0, description="Records read per wall-clock second")
+    stages: List[StageThroughput] = Field(default_factory=list, description="Throughput of each stage")
@@ -0,0 +1,40 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Tier(str, Enum):
+    LOCAL_CACHE = "local_cache"
+    REDIS = "redis"
+    ARANGO = "arango"
+    EMBEDDING = "embedding"
+
+
+class LatencyHistogram(BaseModel):
+    """
+    Latency distribution of one operation on one tier, with cumulative bucket counts like Prometheus.
+    """
+
+    tier: Tier = Field(description="Storage or service tier of the operation")
+    operation: str = Field(description="Operation name, e.g. 'get' or 'query'")
+    buckets: List[float] = Field(description="Upper bounds of the buckets in seconds")
+    counts: List[int] = Field(description="Number of observations at most each upper bound")
+    count: int = Field(description="Total number of observations")
+    sum: float = Field(description="Sum of the observed latencies in seconds")
+
+
+class SlowQuery(BaseModel):
+    """
+    An AQL query that ran longer than the slow-query threshold.
+    """
+
+    query: str = Field(description="The AQL query string")
+    bind_vars: Dict[str, Any] = Field(default_factory=dict, description="Bind variables, long lists abbreviated")
+    duration_ms: float = Field(description="Time until the first batch of results was returned")
+    timestamp: int = Field(description="Time the query finished, in milliseconds since the epoch")
+    statistics: Optional[Dict[str, Any]] = Field(
+        default=None, description="Query statistics: scanned documents, filtered, peak memory usage, ..."
+    )
+    profile: Optional[Dict[str, Any]] = Field(default=None, description="Duration of each query execution phase")
+    plan: Optional[Dict[str, Any]] = Field(default=None, description="Execution plan from explain")
@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from omni_python_library.models.osint import Event, Relation
+from omni_python_library.models.view import OsintView
+
+
+class EventPage(BaseModel):
+    """
+    One page of an event search.
+    """
+
+    events: List[Event] = Field(default_factory=list, description="Events of the page, in ranking order")
+    relations: List[Relation] = Field(default_factory=list, description="Relations between the events of the page")
+    cursor: Optional[str] = Field(default=None, description="Token of the next page, None on the last page")
+
+
+class ViewPage(BaseModel):
+    """
+    One page of a view search.
+    """
+
+    views: List[OsintView] = Field(default_factory=list, description="Views of the page")
+    cursor: Optional[str] = Field(default=None, description="Token of the next page, None on the last page")
@@ -0,0 +1,4 @@
+from omni_python_library.polling.fetchers import Fetcher, FetchResult, HttpFetcher
+from omni_python_library.polling.scheduler import PollingMetrics, PollingScheduler
+
+__all__ = ["Fetcher", "FetchResult", "HttpFetcher", "PollingMetrics", "PollingScheduler"]
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from omni_python_library.models.monitor import MonitoringSource
+
+logger = logging.getLogger(__name__)
+
+
+class FetchResult(BaseModel):
+    """
+    Outcome of polling a single monitoring source.
+    """
+
+    status: int = Field(description="Protocol status code, 304 when the source did not change")
+    content: Optional[bytes] = Field(default=None, description="Raw payload, None when not modified")
+    etag: Optional[str] = Field(default=None, description="Validator to send as If-None-Match on the next poll")
+    last_modified: Optional[str] = Field(
+        default=None, description="Validator to send as If-Modified-Since on the next poll"
+    )
+    headers: Dict[str, str] = Field(default_factory=dict, description="Response headers")
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class Fetcher:
+    """
+    Base class for per-type fetcher plugins used by the polling scheduler.
+
+    Implementations receive the validators returned by the previous poll and should
+    use them to issue a conditional request when the platform supports it.
+    """
+
+    async def fetch(
+        self, source: MonitoringSource, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> FetchResult:
+        raise NotImplementedError
+
+
+class HttpFetcher(Fetcher):
+    """
+    Fetches `MonitoringSource.url` over HTTP(S) with conditional GET.
+
+    Uses the standard library client on the default executor so it has no extra dependencies.
+    """
+
+    def __init__(self, timeout: float = 30.0, user_agent: str = "omni-python-library"):
+        self._timeout = timeout
+        self._user_agent = user_agent
+
+    async def fetch(
+        self, source: MonitoringSource, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> FetchResult:
+        if not source.url:
+            raise ValueError(f"Monitoring source {source.id} has no url")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._fetch_sync, source.url, etag, last_modified)
+
+    def _fetch_sync(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> FetchResult:
+        headers = {"User-Agent": self._user_agent}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                return FetchResult(
+                    status=response.status,
+                    content=response.read(),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    headers=dict(response.headers.items()),
+                )
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            logger.debug(f"Source {url} not modified")
+            return FetchResult(
+                status=304,
+                etag=e.headers.get("ETag") or etag,
+                last_modified=e.headers.get("Last-Modified") or last_modified,
+                headers=dict(e.headers.items()),
+            )
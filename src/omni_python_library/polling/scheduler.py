@@ -0,0 +1,340 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from omni_python_library.dal.monitoring_source_data_access_layer import MonitoringSourceDataAccessLayer
+from omni_python_library.models.monitor import MonitoringSource, SourceType
+from omni_python_library.polling.fetchers import Fetcher, FetchResult, HttpFetcher
+
+logger = logging.getLogger(__name__)
+
+ResultHandler = Callable[[MonitoringSource, FetchResult], Union[None, Awaitable[None]]]
+
+DEFAULT_RELIABILITY = 50.0
+
+
+class PollingMetrics:
+    """
+    Throughput and lag counters for a running scheduler.
+
+    Lag is the time between the moment a source became due and the moment its fetch started.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self._window = window
+        self._started_at = time.monotonic()
+        self._completions: Deque[float] = deque()
+        self.polls = 0
+        self.changed = 0
+        self.not_modified = 0
+        self.failures = 0
+        self.bytes_received = 0
+        self.in_flight = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+
+    def record_start(self, lag: float):
+        self.in_flight += 1
+        self.last_lag = lag
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+
+    def record_end(self):
+        # Also called when the fetch is cancelled, which records no result
+        self.in_flight -= 1
+
+    def record_result(self, result: Optional[FetchResult]):
+        now = time.monotonic()
+        self.polls += 1
+        if result is None:
+            self.failures += 1
+        elif result.not_modified:
+            self.not_modified += 1
+        else:
+            self.changed += 1
+            self.bytes_received += len(result.content or b"")
+
+        self._completions.append(now)
+        while self._completions and self._completions[0] < now - self._window:
+            self._completions.popleft()
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.monotonic()
+        elapsed = max(now - self._started_at, 1e-9)
+        recent = [t for t in self._completions if t >= now - self._window]
+        return {
+            "polls": self.polls,
+            "changed": self.changed,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+            "bytes_received": self.bytes_received,
+            "in_flight": self.in_flight,
+            "throughput": self.polls / elapsed,
+            "recent_throughput": len(recent) / min(elapsed, self._window),
+            "lag_mean": self.lag_total / self.polls if self.polls else 0.0,
+            "lag_max": self.lag_max,
+            "lag_last": self.last_lag,
+        }
+
+
+class _SourceState:
+    def __init__(self, source: MonitoringSource, interval: float, generation: int):
+        self.source = source
+        self.interval = interval
+        # Identifies the queue entries of this state, and not those of a removed state of the same source
+        self.generation = generation
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.failures = 0
+        self.in_flight = False
+
+    @property
+    def reliability(self) -> float:
+        if self.source.reliability is None:
+            return DEFAULT_RELIABILITY
+        return min(max(self.source.reliability, 0.0), 100.0)
+
+    @property
+    def host(self) -> str:
+        if self.source.url:
+            host = urlparse(self.source.url).hostname
+            if host:
+                return host
+        return self.source.type.value if self.source.type else "unknown"
+
+
+class PollingScheduler:
+    """
+    Polls monitoring sources concurrently with asyncio.
+
+    Each source is fetched by the plugin registered for its `SourceType`. Sources with a higher
+    `reliability` are polled more often and win ties when several are due at once. Fetches are
+    bounded globally and per host, failures are retried with jittered exponential backoff, and
+    the ETag / Last-Modified validators of the previous response are sent on the next poll.
+
+    Example:
+        async def handle(source, result):
+            if not result.not_modified:
+                parse(result.content)
+
+        scheduler = PollingScheduler(on_result=handle)
+        scheduler.load_sources()
+        await scheduler.run()
+    """
+
+    def __init__(
+        self,
+        on_result: Optional[ResultHandler] = None,
+        max_concurrency: int = 32,
+        per_host_limit: int = 4,
+        min_interval: float = 60.0,
+        max_interval: float = 3600.0,
+        base_backoff: float = 5.0,
+        max_backoff: float = 1800.0,
+        fetchers: Optional[Dict[SourceType, Fetcher]] = None,
+    ):
+        self._on_result = on_result
+        self._max_concurrency = max_concurrency
+        self._per_host_limit = per_host_limit
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._fetchers: Dict[SourceType, Fetcher] = {SourceType.WEBSITE: HttpFetcher()}
+        if fetchers:
+            self._fetchers.update(fetchers)
+
+        self._states: Dict[str, _SourceState] = {}
+        self._queue: List[Tuple[float, float, int, str, int]] = []
+        self._counter = itertools.count()
+        self._generations = itertools.count()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: set = set()
+        self._running = False
+        self.metrics = PollingMetrics()
+
+    def register_fetcher(self, source_type: SourceType, fetcher: Fetcher) -> None:
+        self._fetchers[source_type] = fetcher
+
+    def load_sources(self, user_id: Optional[str] = None, source_type: Optional[SourceType] = None) -> int:
+        """
+        Loads monitoring sources through the DAL and schedules them for an immediate first poll.
+
+        :param user_id: Only load the sources of this user. Loads every source when omitted.
+        :param source_type: Only load sources of this type.
+        :return: The number of sources scheduled.
+        """
+        sources = MonitoringSourceDataAccessLayer().list_monitoring_sources(user_id=user_id, source_type=source_type)
+        count = 0
+        for source in sources:
+            if self.add_source(source):
+                count += 1
+        logger.debug(f"Loaded {count} monitoring sources for polling")
+        return count
+
+    def add_source(self, source: MonitoringSource, delay: float = 0.0) -> bool:
+        if not source.id:
+            raise ValueError("Monitoring source must be stored before it can be polled")
+        if source.type not in self._fetchers:
+            logger.warning(f"No fetcher registered for {source.type}, skipping source {source.id}")
+            return False
+
+        state = self._states.get(source.id)
+        if state:
+            state.source = source
+            state.interval = self._interval_for(state.reliability)
+            return True
+
+        state = _SourceState(source, 0.0, next(self._generations))
+        state.interval = self._interval_for(state.reliability)
+        self._states[source.id] = state
+        self._schedule(state, delay)
+        return True
+
+    def remove_source(self, source_id: str) -> None:
+        # Entries left in the queue are skipped lazily when popped, even once the source is added again
+        self._states.pop(source_id, None)
+
+    async def run_once(self) -> Dict[str, Optional[FetchResult]]:
+        """
+        Polls every registered source exactly once, concurrently, and returns the results by source id.
+        Failed fetches map to None.
+        """
+        self._ensure_primitives()
+        ids = list(self._states.keys())
+        results = await asyncio.gather(*(self._poll(self._states[sid], time.monotonic()) for sid in ids))
+        return dict(zip(ids, results))
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        Runs the scheduling loop until `stop` is called or `stop_event` is set.
+        """
+        self._ensure_primitives()
+        self._running = True
+        try:
+            while self._running and not (stop_event and stop_event.is_set()):
+                now = time.monotonic()
+                for due, state in self._pop_due(now):
+                    task = asyncio.ensure_future(self._poll_and_reschedule(state, due))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                timeout = self._queue[0][0] - now if self._queue else self._max_interval
+                if stop_event is not None:
+                    timeout = min(timeout, 0.5)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._running = False
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_primitives(self):
+        if self._global_limit is None:
+            self._global_limit = asyncio.Semaphore(self._max_concurrency)
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+
+    def _pop_due(self, now: float) -> List[Tuple[float, _SourceState]]:
+        # Everything due is released together, most reliable first, so it also wins the semaphores
+        due_states = []
+        while self._queue and self._queue[0][0] <= now:
+            due, _, _, source_id, generation = heapq.heappop(self._queue)
+            state = self._states.get(source_id)
+            if state is None or state.generation != generation or state.in_flight:
+                continue
+            due_states.append((due, state))
+        due_states.sort(key=lambda item: -item[1].reliability)
+        return due_states
+
+    def _interval_for(self, reliability: float) -> float:
+        # Most reliable sources are polled every min_interval, least reliable every max_interval
+        weight = 1.0 - reliability / 100.0
+        return self._min_interval + (self._max_interval - self._min_interval) * weight
+
+    def _schedule(self, state: _SourceState, delay: float):
+        due = time.monotonic() + delay
+        entry = (due, -state.reliability, next(self._counter), state.source.id, state.generation)
+        heapq.heappush(self._queue, entry)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self._max_backoff, self._base_backoff * (2 ** (failures - 1)))
+        return random.uniform(delay / 2, delay)
+
+    async def _poll_and_reschedule(self, state: _SourceState, due: float):
+        result = await self._poll(state, due)
+        if self._states.get(state.source.id) is not state:
+            # Removed while polled, possibly added again with a schedule of its own
+            return
+        if result is None:
+            self._schedule(state, self._backoff(state.failures))
+        else:
+            self._schedule(state, state.interval)
+
+    async def _poll(self, state: _SourceState, due: float) -> Optional[FetchResult]:
+        host_limit = self._host_limits.setdefault(state.host, asyncio.Semaphore(self._per_host_limit))
+        state.in_flight = True
+        try:
+            async with host_limit, self._global_limit:
+                self.metrics.record_start(max(time.monotonic() - due, 0.0))
+                try:
+                    result = await self._fetch(state)
+                finally:
+                    self.metrics.record_end()
+                self.metrics.record_result(result)
+        finally:
+            state.in_flight = False
+
+        if result is not None and self._on_result is not None:
+            try:
+                ret = self._on_result(state.source, result)
+                if inspect.isawaitable(ret):
+                    await ret
+            except Exception:
+                logger.exception(f"Error handling poll result of {state.source.id}")
+        return result
+
+    async def _fetch(self, state: _SourceState) -> Optional[FetchResult]:
+        fetcher = self._fetchers[state.source.type]
+        try:
+            result = await fetcher.fetch(state.source, etag=state.etag, last_modified=state.last_modified)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            state.failures += 1
+            logger.exception(f"Error polling {state.source.id} ({state.failures} consecutive failures)")
+            return None
+
+        state.failures = 0
+        state.etag = result.etag or state.etag
+        state.last_modified = result.last_modified or state.last_modified
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "sources": len(self._states),
+            "queued": len(self._queue),
+            **self.metrics.snapshot(),
+        }
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 from omni_python_library.utils.singleton import Singleton
 
@@ -22,6 +22,8 @@ class ArangoDBConstant:
     EVENT_RELATED_GRAPH = "event_related_graph"
     EVENT_GRAPH = "event_graph"
     VIEW_GRAPH = "osint_view_graph"
+    EVENT_SEARCH_VIEW = "event_search_view"
+    EVENT_ROLLUP = "event_rollup"
 
 
 class LLMConstant:
@@ -33,10 +35,15 @@ class ConfigRegistry(Singleton):
         self._configs: Dict[str, str] = {}
         self.root_path = root_path
 
-    def get(self, key: str) -> str:
+    def get(self, key: str, default: Optional[str] = None) -> str:
+        """
+        :param default: Value of optional keys, returned when the key is found neither in file nor in env var.
+        """
         stage = os.getenv("stage")
         if stage == "local":
             val = os.getenv(key)
+            if val is None and default is not None:
+                return default
             if val is None:
                 logger.warning(f"Environment variable {key} not found in local stage")
                 return ""
@@ -48,6 +55,8 @@ class ConfigRegistry(Singleton):
                     return f.read().strip()
 
             val = os.getenv(key)
+            if val is None and default is not None:
+                return default
             if val is None:
                 raise Exception(f"Config key {key} not found in both file and env var")
             return val
@@ -0,0 +1,158 @@
+import math
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance in meters between two (latitude, longitude) points, matching AQL DISTANCE().
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box_circle(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Tuple[float, float, float]:
+    """
+    Returns (latitude, longitude, radius_m) of a circle enclosing the bounding box.
+
+    Used to let a geo index narrow candidates with DISTANCE() before exact latitude/longitude range checks.
+    A box with min_lon > max_lon crosses the antimeridian.
+    """
+    width = (max_lon - min_lon) % 360 or (360.0 if max_lon != min_lon else 0.0)
+    center_lon = (min_lon + width / 2 + 180) % 360 - 180
+    center_lat = (min_lat + max_lat) / 2
+
+    mid_lon = center_lon
+    points = [
+        (min_lat, min_lon),
+        (min_lat, max_lon),
+        (max_lat, min_lon),
+        (max_lat, max_lon),
+        (min_lat, mid_lon),
+        (max_lat, mid_lon),
+    ]
+    radius = max(haversine_m(center_lat, center_lon, lat, lon) for lat, lon in points)
+    return center_lat, center_lon, radius * 1.01 + 1.0
+
+
+def polygon_ring(points: Sequence[Tuple[float, float]]) -> List[List[float]]:
+    """
+    Converts (latitude, longitude) points into a closed GeoJSON ring of [longitude, latitude] pairs.
+    """
+    if len(points) < 3:
+        raise ValueError("A polygon needs at least 3 points")
+    ring = [[float(lon), float(lat)] for lat, lon in points]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return ring
+
+
+MAX_MERCATOR_LAT = 85.05112878
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def quadkey_cell(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """
+    Returns the (x, y) Web Mercator tile of a point at `zoom`, y growing southwards.
+    """
+    n = 1 << zoom
+    phi = math.radians(min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT))
+    x = int(math.floor((lon + 180) / 360 * n))
+    y = int(math.floor((1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n))
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def quadkey_bounds(key: str, poles: bool = False) -> Tuple[float, float, float, float]:
+    """
+    Returns (min_latitude, min_longitude, max_latitude, max_longitude) of a quadkey tile.
+
+    :param poles: Extend the tiles of the first and last rows to the poles, as `quadkey_cell` clamps the points
+                  beyond the Web Mercator limit into them.
+    """
+    x = y = 0
+    for digit in key:
+        d = int(digit)
+        x = (x << 1) | (d & 1)
+        y = (y << 1) | ((d >> 1) & 1)
+    n = 1 << len(key)
+
+    def lat(row: int) -> float:
+        if poles and row in (0, n):
+            return 90.0 if row == 0 else -90.0
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def geohash_bits(precision: int) -> Tuple[int, int]:
+    """
+    Returns the (latitude, longitude) bit counts of a geohash of `precision` characters.
+    """
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def geohash_cell(lat: float, lon: float, precision: int) -> Tuple[int, int]:
+    """
+    Returns the (longitude, latitude) integer cell indices of a point in the geohash grid of `precision`.
+    """
+    lat_bits, lon_bits = geohash_bits(precision)
+    nx, ny = 1 << lon_bits, 1 << lat_bits
+    x = int(math.floor((lon + 180) / 360 * nx))
+    y = int(math.floor((lat + 90) / 180 * ny))
+    return min(max(x, 0), nx - 1), min(max(y, 0), ny - 1)
+
+
+def geohash(x: int, y: int, precision: int) -> str:
+    """
+    Encodes geohash grid cell indices (see `geohash_cell`) into the geohash string.
+    """
+    lat_bits, lon_bits = geohash_bits(precision)
+    chars = []
+    value = bits = 0
+    lon_i, lat_i = lon_bits, lat_bits
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            lon_i -= 1
+            bit = (x >> lon_i) & 1
+        else:
+            lat_i -= 1
+            bit = (y >> lat_i) & 1
+        value = (value << 1) | bit
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            value = bits = 0
+    return "".join(chars)
+
+
+def geohash_bounds(hash: str) -> Tuple[float, float, float, float]:
+    """
+    Returns (min_latitude, min_longitude, max_latitude, max_longitude) of a geohash cell.
+    """
+    x = y = 0
+    i = 0
+    for char in hash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if i % 2 == 0:
+                x = (x << 1) | bit
+            else:
+                y = (y << 1) | bit
+            i += 1
+    lat_bits, lon_bits = geohash_bits(len(hash))
+    nx, ny = 1 << lon_bits, 1 << lat_bits
+    return y / ny * 180 - 90, x / nx * 360 - 180, (y + 1) / ny * 180 - 90, (x + 1) / nx * 360 - 180
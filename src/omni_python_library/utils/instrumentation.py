@@ -0,0 +1,248 @@
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from omni_python_library.models.instrumentation import LatencyHistogram, SlowQuery, Tier
+from omni_python_library.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+# Same upper bounds in seconds as the default buckets of the Prometheus client, plus sub-millisecond ones
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Called with (tier, operation, seconds) for every observation
+Exporter = Callable[[str, str, float], None]
+SlowQueryListener = Callable[[SlowQuery], None]
+
+# Bind variables with more items than this are abbreviated in the slow-query log, e.g. query embeddings
+_MAX_LOGGED_ITEMS = 16
+
+_NOOP = nullcontext()
+# The enabled instance, None when instrumentation is disabled. Checked on every timed operation.
+_active: Optional["Instrumentation"] = None
+
+
+def timed(tier: Tier, operation: str):
+    """
+    Returns a context manager recording the duration of its block, or a shared no-op one when
+    instrumentation is disabled.
+
+    Example:
+        with timed(Tier.REDIS, "get"):
+            value = client.get(key)
+    """
+    if _active is None:
+        return _NOOP
+    return _Timer(_active, tier, operation)
+
+
+def active_instrumentation() -> Optional["Instrumentation"]:
+    return _active
+
+
+class _Timer:
+    __slots__ = ("_instrumentation", "_tier", "_operation", "_start")
+
+    def __init__(self, instrumentation: "Instrumentation", tier: Tier, operation: str):
+        self._instrumentation = instrumentation
+        self._tier = tier
+        self._operation = operation
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._instrumentation.observe(self._tier, self._operation, time.perf_counter() - self._start)
+        return False
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Instrumentation(Singleton):
+    """
+    Records the latency of data access layer operations per tier (local cache, Redis, ArangoDB, embedding)
+    and keeps a log of slow AQL queries with their statistics, profile and execution plan.
+
+    Disabled until `init` is called: every timed operation then costs one global lookup. Observations are
+    aggregated into in-process histograms and forwarded to the exporters, see `prometheus_exporter` and
+    `opentelemetry_exporter`.
+    """
+
+    def init(
+        self,
+        slow_query_ms: float = 1000,
+        slow_query_log_size: int = 100,
+        profile_queries: bool = False,
+        explain_slow_queries: bool = True,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        :param slow_query_ms: Queries running at least this many milliseconds are logged as slow.
+        :param slow_query_log_size: Number of slow queries kept, oldest first out.
+        :param profile_queries: Run every query with profiling so slow queries carry their phase timings.
+                                Adds little server overhead but enlarges every response.
+        :param explain_slow_queries: Fetch the execution plan of slow queries, one extra request each.
+        :param buckets: Upper bounds of the latency histogram buckets in seconds.
+        """
+        global _active
+        self._slow_query_ms = slow_query_ms
+        self._profile_queries = profile_queries
+        self._explain_slow_queries = explain_slow_queries
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[Tier, str], _Histogram] = {}
+        self._slow_queries: Deque[SlowQuery] = deque(maxlen=slow_query_log_size)
+        self._exporters: List[Exporter] = []
+        self._slow_query_listeners: List[SlowQueryListener] = []
+        _active = self
+
+    def disable(self):
+        global _active
+        if _active is self:
+            _active = None
+
+    @property
+    def profile_queries(self) -> bool:
+        return self._profile_queries
+
+    def add_exporter(self, exporter: Exporter):
+        self._exporters.append(exporter)
+
+    def add_slow_query_listener(self, listener: SlowQueryListener):
+        self._slow_query_listeners.append(listener)
+
+    def observe(self, tier: Tier, operation: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((tier, operation))
+            if histogram is None:
+                histogram = self._histograms[(tier, operation)] = _Histogram(len(self._buckets))
+            index = bisect.bisect_left(self._buckets, seconds)
+            if index < len(self._buckets):
+                histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.sum += seconds
+
+        for exporter in self._exporters:
+            try:
+                exporter(tier.value, operation, seconds)
+            except Exception:
+                logger.exception(f"Instrumentation exporter {exporter} failed")
+
+    def record_query(self, db: Any, query: str, bind_vars: Dict[str, Any], cursor: Any, seconds: float):
+        """
+        Records an executed AQL query, and logs it as slow when it ran longer than the threshold.
+
+        :param db: The database the query ran on, used to explain slow queries.
+        :param cursor: The cursor returned for the query.
+        :param seconds: Time until the cursor was returned.
+        """
+        self.observe(Tier.ARANGO, "query", seconds)
+        if seconds * 1000 < self._slow_query_ms:
+            return
+
+        plan = None
+        if self._explain_slow_queries:
+            try:
+                plan = db.aql.explain(query, bind_vars=bind_vars)
+            except Exception:
+                logger.exception("Error explaining slow query")
+        slow_query = SlowQuery(
+            query=query,
+            bind_vars={k: _abbreviate(v) for k, v in bind_vars.items()},
+            duration_ms=seconds * 1000,
+            timestamp=int(time.time() * 1000),
+            statistics=cursor.statistics(),
+            profile=cursor.profile(),
+            plan=plan,
+        )
+        logger.warning(f"Slow query took {slow_query.duration_ms:.0f}ms: {query}")
+        with self._lock:
+            self._slow_queries.append(slow_query)
+        for listener in self._slow_query_listeners:
+            try:
+                listener(slow_query)
+            except Exception:
+                logger.exception(f"Slow query listener {listener} failed")
+
+    def histograms(self) -> List[LatencyHistogram]:
+        with self._lock:
+            snapshot = [(key, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()]
+        results = []
+        for (tier, operation), counts, count, total in sorted(snapshot, key=lambda item: item[0]):
+            cumulative = []
+            running = 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            results.append(
+                LatencyHistogram(
+                    tier=tier,
+                    operation=operation,
+                    buckets=list(self._buckets),
+                    counts=cumulative,
+                    count=count,
+                    sum=total,
+                )
+            )
+        return results
+
+    def slow_queries(self) -> List[SlowQuery]:
+        with self._lock:
+            return list(self._slow_queries)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slow_queries.clear()
+
+
+def prometheus_exporter(registry: Any = None, name: str = "omni_dal_operation_seconds") -> Exporter:
+    """
+    Returns an exporter observing a Prometheus histogram labelled by tier and operation.
+    Requires the prometheus extra.
+
+    :param registry: The collector registry. Defaults to the global registry.
+    """
+    from prometheus_client import REGISTRY, Histogram
+
+    histogram = Histogram(
+        name,
+        "Latency of data access layer operations",
+        ["tier", "operation"],
+        buckets=DEFAULT_BUCKETS,
+        registry=registry or REGISTRY,
+    )
+    return lambda tier, operation, seconds: histogram.labels(tier, operation).observe(seconds)
+
+
+def opentelemetry_exporter(meter: Any = None, name: str = "omni.dal.operation.duration") -> Exporter:
+    """
+    Returns an exporter recording to an OpenTelemetry histogram with tier and operation attributes.
+    Requires the opentelemetry extra.
+
+    :param meter: The meter. Defaults to the meter of this library from the global meter provider.
+    """
+    if meter is None:
+        from opentelemetry import metrics
+
+        meter = metrics.get_meter("omni_python_library")
+    histogram = meter.create_histogram(name, unit="s", description="Latency of data access layer operations")
+    return lambda tier, operation, seconds: histogram.record(seconds, {"tier": tier, "operation": operation})
+
+
+def _abbreviate(value: Any) -> Any:
+    if isinstance(value, (list, tuple)) and len(value) > _MAX_LOGGED_ITEMS:
+        return f"<{len(value)} items>"
+    return value
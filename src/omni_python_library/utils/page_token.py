@@ -0,0 +1,47 @@
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, Dict
+
+# Bumped when the token layout changes, so tokens of older releases are rejected instead of misread
+TOKEN_VERSION = 1
+
+
+def page_scope(*parts: Any) -> str:
+    """
+    Returns a fingerprint of the parameters of a paginated query. Tokens carry it, so a token is only
+    accepted by the query it was issued for.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def encode_page_token(scope: str, **position: Any) -> str:
+    """
+    Encodes the position after the last item of a page as an opaque, URL-safe token.
+
+    The token is plain JSON, so it is stable across processes and releases with the same TOKEN_VERSION.
+
+    :param scope: Fingerprint of the query, see `page_scope`.
+    :param position: JSON-serializable sort key of the last item and other state of the query.
+    """
+    data = json.dumps({"v": TOKEN_VERSION, "scope": scope, **position}, sort_keys=True, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_page_token(token: str, scope: str) -> Dict[str, Any]:
+    """
+    Decodes a token of `encode_page_token`.
+
+    :raises ValueError: If the token is malformed or was issued for another query.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid page token")
+    if not isinstance(data, dict) or data.get("v") != TOKEN_VERSION:
+        raise ValueError("Invalid page token")
+    if data.get("scope") != scope:
+        raise ValueError("Page token does not belong to this query")
+    return data
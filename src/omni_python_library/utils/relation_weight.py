@@ -0,0 +1,17 @@
+from typing import Optional
+
+# Relation attribute holding the traversal cost used by weighted path queries
+WEIGHT_ATTRIBUTE = "path_weight"
+# Cost of relations without a confidence, equal to a confidence of 0
+DEFAULT_WEIGHT = 2.0
+
+
+def relation_weight(confidence: Optional[int]) -> float:
+    """
+    Maps a relation confidence to a traversal cost in [1, 2], lower for more confident relations.
+
+    Every hop costs at least 1, so a weighted path never prefers many confident hops over a direct relation.
+    """
+    if confidence is None:
+        return DEFAULT_WEIGHT
+    return 1.0 + 1.0 / (1.0 + max(confidence, 0))
@@ -0,0 +1,164 @@
+import threading
+import unittest
+import uuid
+from unittest.mock import MagicMock, patch
+
+from omni_python_library.cdc.consumer import ChangeStreamConsumer
+from omni_python_library.cdc.publisher import ChangeStreamPublisher, change_record, decode_record, encode_record
+from omni_python_library.clients.redis import RedisClient
+from omni_python_library.models.change_stream import ChangeOperation
+from omni_python_library.utils.singleton import Singleton
+
+
+def _doc(key: str, rev: str, **attributes):
+    return {"_id": f"event/{key}", "_key": key, "_rev": rev, **attributes}
+
+
+class TestChangeRecord(unittest.TestCase):
+    def test_operations_and_changed_fields(self):
+        old = _doc("1", "_a", title="Protest", tags=["a"], description="x")
+        new = _doc("1", "_b", title="Protest", tags=["a", "b"], attributes={"crowd": 3})
+
+        created = change_record("event", None, old)
+        self.assertEqual(created.operation, ChangeOperation.CREATE)
+        self.assertEqual(created.fields, ["description", "tags", "title"])
+
+        updated = change_record("event", old, new)
+        self.assertEqual(updated.operation, ChangeOperation.UPDATE)
+        self.assertEqual((updated.id, updated.rev), ("event/1", "_b"))
+        self.assertEqual(updated.fields, ["attributes", "description", "tags"])
+
+        deleted = change_record("event", new, None)
+        self.assertEqual(deleted.operation, ChangeOperation.DELETE)
+        self.assertEqual((deleted.rev, deleted.fields), ("_b", []))
+
+    def test_encoding_roundtrip(self):
+        record = change_record("event", _doc("1", "_a", title="x"), _doc("1", "_b", title="y", tags=[]))
+        fields = encode_record(record)
+        self.assertTrue(all(isinstance(value, str) for value in fields.values()))
+        self.assertEqual(decode_record("1-0", fields), record.model_copy(update={"entry_id": "1-0"}))
+
+        deleted = change_record("event", _doc("2", "_a"), None)
+        self.assertEqual(decode_record("2-0", encode_record(deleted)).fields, [])
+
+
+class TestChangeStreamPublisher(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances.pop(ChangeStreamPublisher, None)
+        self.redis = MagicMock()
+        self.patch = patch("omni_python_library.cdc.publisher.RedisClient", return_value=self.redis)
+        self.patch.start()
+        self.publisher = ChangeStreamPublisher()
+        self.publisher.init(stream="changes:{collection}", max_length=100, collections=["event"])
+
+    def tearDown(self):
+        self.publisher.disable()
+        self.patch.stop()
+
+    def test_one_round_trip_per_write(self):
+        self.publisher.on_changes("event", [(None, _doc("1", "_a")), (_doc("2", "_a"), _doc("2", "_b"))])
+        pipeline = self.redis.client.pipeline.return_value
+        self.assertEqual(pipeline.xadd.call_count, 2)
+        self.assertEqual(pipeline.xadd.call_args.args[0], "changes:event")
+        self.assertEqual(pipeline.xadd.call_args.kwargs["maxlen"], 100)
+        pipeline.execute.assert_called_once()
+
+    def test_skips_other_collections_and_survives_redis_errors(self):
+        self.publisher.on_changes("source", [(None, {"_id": "source/1"})])
+        self.redis.client.pipeline.assert_not_called()
+
+        self.redis.client.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        with self.assertLogs("omni_python_library.cdc.publisher", level="ERROR"):
+            self.publisher.on_changes("event", [(None, _doc("1", "_a"))])
+
+
+class TestChangeStreamConsumerRetries(unittest.TestCase):
+    def test_failing_record_is_dead_lettered_after_backoff(self):
+        records = [
+            decode_record(f"{i}-0", encode_record(change_record("event", None, _doc(str(i), "_a")))) for i in range(3)
+        ]
+        consumer = ChangeStreamConsumer("indexer", "indexer-1", max_attempts=3, retry_delay=0.01)
+        stop = threading.Event()
+        dead = []
+
+        def handler(batch):
+            if any(r.id == "event/1" for r in batch):
+                raise ValueError("bad record")
+
+        def read():
+            # The batch is read again from the pending records until it is acknowledged or dead-lettered
+            if dead:
+                stop.set()
+                return []
+            return records
+
+        with (
+            patch.object(consumer, "read", side_effect=read),
+            patch.object(consumer, "ack") as ack,
+            patch.object(consumer, "dead_letter", side_effect=lambda batch, error: dead.extend(batch)),
+            patch.object(stop, "wait") as wait,
+            self.assertLogs("omni_python_library.cdc.consumer", level="ERROR"),
+        ):
+            consumer.run(handler, stop=stop, claim_every=0)
+
+        self.assertEqual([call.args[0] for call in wait.call_args_list], [0.01, 0.02])
+        self.assertEqual([r.id for r in dead], ["event/1"])
+        self.assertEqual([call.args[0][0].id for call in ack.call_args_list], ["event/0", "event/2"])
+
+
+class TestChangeStreamIntegration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Singleton._instances = {}
+        try:
+            RedisClient().init(host="localhost", port=6379, db=0)
+            RedisClient().client.ping()
+        except Exception as e:
+            print(f"Redis not available: {e}")
+            raise unittest.SkipTest("Redis service not available. Skipping integration tests.")
+
+    def setUp(self):
+        self.stream = f"test:changes:{uuid.uuid4().hex}"
+        self.publisher = ChangeStreamPublisher()
+        self.publisher.init(stream=self.stream)
+
+    def tearDown(self):
+        self.publisher.disable()
+        RedisClient().client.delete(self.stream)
+
+    def test_unacknowledged_records_are_delivered_again(self):
+        consumer = ChangeStreamConsumer("indexer", "indexer-1", stream=self.stream, block_ms=100)
+        consumer.ensure_group()
+        self.publisher.on_changes("event", [(None, _doc("1", "_a")), (_doc("1", "_a"), _doc("1", "_b", title="x"))])
+
+        first = consumer.read()
+        self.assertEqual([r.operation for r in first], [ChangeOperation.CREATE, ChangeOperation.UPDATE])
+
+        # A restarted consumer reads its pending records first
+        restarted = ChangeStreamConsumer("indexer", "indexer-1", stream=self.stream, block_ms=100)
+        self.assertEqual([r.entry_id for r in restarted.read()], [r.entry_id for r in first])
+        restarted.ack(first)
+        self.assertEqual(restarted.read(), [])
+
+    def test_stale_records_are_claimed_by_another_consumer(self):
+        crashed = ChangeStreamConsumer("indexer", "indexer-1", stream=self.stream, block_ms=100)
+        crashed.ensure_group()
+        self.publisher.on_changes("event", [(None, _doc("1", "_a"))])
+        self.assertEqual(len(crashed.read()), 1)
+
+        other = ChangeStreamConsumer("indexer", "indexer-2", stream=self.stream, block_ms=100)
+        self.assertEqual(other.claim_stale(min_idle_ms=0), 1)
+        handled = []
+        stop = threading.Event()
+
+        def handler(records):
+            handled.extend(records)
+            stop.set()
+
+        other.run(handler, stop=stop, claim_every=0)
+        self.assertEqual([r.id for r in handled], ["event/1"])
+        self.assertEqual(RedisClient().client.xpending(self.stream, "indexer")["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,19 @@
+import json
 import unittest
 
 from arango import ArangoClient as PyArangoClient
 
 from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.clients.redis import RedisClient
+from omni_python_library.dal.embedding_text import EMBEDDING_HASH_ATTRIBUTE
 from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
-from omni_python_library.models.osint import Person, PersonMainData
+from omni_python_library.models.osint import (
+    EventMainData,
+    Person,
+    PersonMainData,
+    RelationMainData,
+    SourceMainData,
+)
 from omni_python_library.utils.singleton import Singleton
 
 # This test suite assumes a running ArangoDB and Redis instance (via docker-compose)
@@ -102,6 +110,132 @@ class TestCRUD(unittest.TestCase):
             # For this task, we assume the user will run docker-compose up
             raise e
 
+    def test_unit_of_work(self):
+        with self.dal.unit_of_work() as unit:
+            source = unit.create_source(SourceMainData(url="https://example.com/unit"), owner="test_user")
+            event = unit.create_event(EventMainData(title="Unit event"), owner="test_user")
+            relation = unit.create_relation(
+                RelationMainData(name="reports", from_id=source.id, to_id=event.id), owner="test_user"
+            )
+            # Nothing is written before the commit
+            self.assertFalse(ArangoDBClient().get_collection("event").has(event.key))
+
+        self.assertIsNotNone(event.rev)
+        self.assertEqual(self.dal.get_event(event.id).title, "Unit event")
+        edge = ArangoDBClient().db.collection("source_reports_event").get(relation.key)
+        self.assertEqual((edge["_from"], edge["_to"]), (source.id, event.id))
+
+        # A failed write leaves none of the documents of the unit
+        unit = self.dal.unit_of_work()
+        staged = unit.create_event(EventMainData(title="Never written"), owner="test_user")
+        duplicate = unit.create_source(SourceMainData(url="https://example.com/dup"), owner="test_user")
+        unit._staged[-1][1]["_key"] = source.key
+        with self.assertRaises(Exception):
+            unit.commit()
+        self.assertFalse(ArangoDBClient().get_collection("event").has(staged.key))
+        self.assertIsNone(duplicate.rev)
+
+    def test_upsert_sources(self):
+        created = self.dal.upsert_source(SourceMainData(url="https://example.com/upsert", name="A"), owner="test_user")
+        updated = self.dal.upsert_source(SourceMainData(url="https://example.com/upsert", title="T"), owner="other")
+        self.assertEqual(updated.id, created.id)
+        self.assertEqual((updated.name, updated.title, updated.owner), ("A", "T", "test_user"))
+
+        result = self.dal.upsert_sources(
+            [
+                SourceMainData(url="https://example.com/upsert", reliability=3),
+                SourceMainData(url="https://example.com/upsert-new", name="B"),
+                SourceMainData(url="https://example.com/upsert-new", title="C"),
+            ],
+            owner="test_user",
+        )
+        self.assertEqual((result.inserted, result.updated), (1, 1))
+        self.assertEqual(result.ids[0], created.id)
+        self.assertEqual(result.ids[1], result.ids[2])
+        new = self.dal.get_source(result.ids[1])
+        self.assertEqual((new.name, new.title), ("B", "C"))
+
+        with self.assertRaises(ValueError):
+            self.dal.upsert_source(SourceMainData(name="No url"), owner="test_user")
+
+    def test_bulk_update_and_delete(self):
+        source = self.dal.create_source(SourceMainData(url="https://example.com/feed"), owner="test_user")
+        events = [self.dal.create_event(EventMainData(title=f"Feed {i}"), owner="test_user") for i in range(5)]
+        for event in events:
+            self.dal.create_relation(
+                RelationMainData(name="reported_by", from_id=event.id, to_id=source.id), owner="test_user"
+            )
+
+        reports = []
+        result = self.dal.update_many(
+            {event.id: EventMainData(tags=["bulk"]) for event in events} | {"event/missing": {"tags": []}},
+            batch_size=2,
+            progress=reports.append,
+        )
+        self.assertEqual(sorted(result.ids), sorted(event.id for event in events))
+        self.assertEqual(list(result.errors), ["event/missing"])
+        self.assertNotIn("embedding", json.loads(RedisClient().client.get(events[0].id)))
+        self.assertEqual([(p.done, p.total) for p in reports], [(2, 6), (4, 6), (6, 6)])
+        self.assertEqual(self.dal.get_event(events[0].id).tags, ["bulk"])
+
+        result = self.dal.delete_where("event", filters={"tags": ["bulk"]}, related_to=source.id)
+        self.assertEqual(len(result.ids), 5)
+        self.assertEqual(len(result.cascaded), 5)
+        self.assertIsNone(self.dal.get_event(events[0].id))
+        self.assertIsNotNone(self.dal.get_source(source.id))
+
+    def test_cascade_delete(self):
+        alice = self.dal.create_person(PersonMainData(name="Alice"), owner="test_user")
+        bob = self.dal.create_person(PersonMainData(name="Bob"), owner="test_user")
+        event = self.dal.create_event(EventMainData(title="Meeting"), owner="test_user")
+        knows = self.dal.create_relation(RelationMainData(name="knows", from_id=alice.id, to_id=bob.id), "test_user")
+        attends = self.dal.create_relation(
+            RelationMainData(name="attended_by", from_id=event.id, to_id=alice.id), owner="test_user"
+        )
+
+        self.assertTrue(self.dal.delete_entity(alice.id))
+        self.assertIsNone(self.dal.get_relation(knows.id))
+        self.assertIsNone(self.dal.get_relation(attends.id))
+        self.assertFalse(ArangoDBClient().db.collection("event_attended_by_person").has(attends.key))
+        self.assertIsNotNone(self.dal.get_person(bob.id))
+
+        # Without cascade the relation is left dangling until delete_dangling_relations
+        other = self.dal.create_relation(RelationMainData(name="knows", from_id=bob.id, to_id=event.id), "test_user")
+        self.assertTrue(self.dal.delete_entity(event.id, cascade=False))
+        self.assertEqual(self.dal.delete_dangling_relations(), 1)
+        self.assertIsNone(self.dal.get_relation(other.id))
+
+    def test_ingest(self):
+        handles = self.dal.ingest(
+            [
+                EventMainData(title="Ingested"),
+                SourceMainData(url="https://example.com/ingested"),
+                SourceMainData(url="https://example.com/ingested"),
+            ],
+            owner="test_user",
+        )
+        event, source, duplicate = handles
+        self.assertTrue(event.id.startswith("event/"))
+        self.assertIsNotNone(event.rev)
+        self.assertIsNone(duplicate)
+        # The cache is not populated, the document is read from ArangoDB
+        self.assertIsNone(self.dal.get(event.id))
+        self.assertEqual(self.dal.get_event(event.id).owner, "test_user")
+
+        (relation,) = self.dal.ingest(
+            [RelationMainData(name="reported_by", from_id=event.id, to_id=source.id)], owner="test_user"
+        )
+        self.assertEqual(self.dal.get_relation(relation.id).from_id, event.id)
+
+    def test_create_caches_serialized_document(self):
+        event = self.dal.create_event(EventMainData(title="Cached", tags=["a"]), owner="test_user")
+        self.assertEqual((event.title, event.owner), ("Cached", "test_user"))
+        self.assertEqual(event.model_fields_set, {"title", "tags", "owner", "id", "key", "rev"})
+
+        cached = json.loads(RedisClient().client.get(event.id))
+        stored = ArangoDBClient().get_collection("event").get(event.key)
+        self.assertEqual(cached, {k: v for k, v in stored.items() if k not in ("embedding", EMBEDDING_HASH_ATTRIBUTE)})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from omni_python_library.clients.openai import OpenAIClient
+from omni_python_library.dal.embedder import embed_documents
+from omni_python_library.dal.embedding_text import (
+    _MAIN_DATA,
+    EMBEDDING_FIELDS,
+    EMBEDDING_HASH_ATTRIBUTE,
+    embedding_hash,
+    embedding_text,
+)
+from omni_python_library.utils.config_registry import LLMConstant
+from omni_python_library.utils.singleton import Singleton
+
+LOCATION = {
+    "latitude": 1.0,
+    "longitude": 2.0,
+    "country_code": "FR",
+    "administrative_area": "IDF",
+    "sub_administrative_area": "Paris",
+    "locality": "Paris",
+    "sub_locality": "1er",
+    "address": "1 rue de Rivoli",
+    "postal_code": "75001",
+}
+
+
+def _sample(model_cls, field: str):
+    annotation = str(model_cls.model_fields[field].annotation)
+    if field == "location":
+        return LOCATION
+    if "List" in annotation:
+        return ["x"]
+    if "Dict" in annotation:
+        return {"x": 1}
+    return 1 if "int" in annotation else "x"
+
+
+class TestEmbeddingText(unittest.TestCase):
+    def test_fields_match_text_builders(self):
+        for collection, model_cls in _MAIN_DATA.items():
+            for field in model_cls.model_fields:
+                changed = embedding_text(collection, {field: _sample(model_cls, field)}) != embedding_text(
+                    collection, {}
+                )
+                self.assertEqual(changed, field in EMBEDDING_FIELDS[collection], f"{collection}.{field}")
+
+    def test_embed_documents_only_when_text_changed(self):
+        Singleton._instances = {}
+        OpenAIClient().init()
+        client = MagicMock()
+        client.embeddings.create.side_effect = lambda input, model: SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        )
+        OpenAIClient()._clients[LLMConstant.EMBEDDING] = (client, "model")
+
+        unchanged = {"title": "Same", "url": "u"}
+        unchanged[EMBEDDING_HASH_ATTRIBUTE] = embedding_hash(embedding_text("website", unchanged))
+        changed = {"title": "New", "url": "u", EMBEDDING_HASH_ATTRIBUTE: "stale"}
+        new = {"title": "Created"}
+
+        embedded = embed_documents("website", [unchanged, changed, new])
+        self.assertEqual(embedded, [changed, new])
+        self.assertEqual(client.embeddings.create.call_count, 1)
+        self.assertEqual(changed[EMBEDDING_HASH_ATTRIBUTE], embedding_hash(embedding_text("website", changed)))
+        self.assertNotIn("embedding", unchanged)
+
+        self.assertEqual(len(embed_documents("website", [unchanged], force=True)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    raise unittest.SkipTest("pyarrow not installed")
+
+from omni_python_library.export.arrow import (
+    EXPORT_STATE_FILE,
+    ParquetExporter,
+    arrow_schema,
+    collection_columns,
+    to_record_batch,
+)
+from omni_python_library.utils.relation_weight import WEIGHT_ATTRIBUTE
+
+# The exporter reads from a stubbed ArangoDB client, no ArangoDB needed.
+
+
+def _event(i: int, embedding=None):
+    return {
+        "_id": f"event/{i}",
+        "_key": str(i),
+        "_rev": "_r",
+        "title": f"event {i}",
+        "happened_at": 1700000000000 + i,
+        "tags": ["protest"],
+        "location": {"latitude": 48.8, "longitude": 2.3, "locality": "Paris", "postal_code": 75001},
+        "attributes": {"crowd": i},
+        "embedding": embedding,
+    }
+
+
+class _StubClient:
+    embedding_dimension = 3
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.now = 1_000_000
+        self.queries = []
+
+    def execute(self, query, bind_vars=None, **kwargs):
+        if "DATE_NOW" in query:
+            cursor = MagicMock()
+            cursor.next.return_value = self.now
+            return cursor
+        self.queries.append(bind_vars)
+        return iter(self.docs)
+
+
+class TestColumnarExport(unittest.TestCase):
+    def test_record_batch_flattens_documents(self):
+        columns = collection_columns("event")
+        schema = arrow_schema(columns, 3)
+        self.assertEqual(schema.names[:3], ["_id", "_key", "_rev"])
+        self.assertEqual(str(schema.field("embedding").type), "fixed_size_list<item: float>[3]")
+
+        batch = to_record_batch([_event(1, [0.5, 0.25, 1]), _event(2), _event(3, [1.0, 2.0])], columns, schema)
+        rows = batch.to_pylist()
+        self.assertEqual(rows[0]["location_locality"], "Paris")
+        self.assertEqual(rows[0]["location_postal_code"], 75001)
+        self.assertEqual(json.loads(rows[0]["attributes"]), {"crowd": 1})
+        self.assertEqual(rows[0]["embedding"], [0.5, 0.25, 1.0])
+        # Missing embeddings and embeddings of another dimension are null
+        self.assertEqual([row["embedding"] for row in rows[1:]], [None, None])
+
+    def test_relation_columns(self):
+        names = arrow_schema(collection_columns("event_involves_person"), 3).names
+        self.assertEqual(names[:5], ["_from", "_to", "_id", "_key", "_rev"])
+        self.assertIn(WEIGHT_ATTRIBUTE, names)
+        self.assertNotIn("embedding", names)
+
+
+class TestParquetExporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.client = _StubClient([_event(i, [0.1, 0.2, 0.3]) for i in range(25)])
+        self.patch = patch("omni_python_library.export.arrow.ArangoDBClient", return_value=self.client)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.directory.cleanup()
+
+    def test_full_export_rolls_over_files(self):
+        exporter = ParquetExporter(self.directory.name, batch_size=10, rows_per_file=20)
+        (result,) = exporter.export(["event"])
+
+        self.assertEqual(result.rows, 25)
+        self.assertEqual(len(result.files), 2)
+        self.assertEqual([pq.read_metadata(path).num_rows for path in result.files], [20, 5])
+        table = pq.read_table(os.path.join(self.directory.name, "event"))
+        self.assertEqual(sorted(table.column("_key").to_pylist(), key=int), [str(i) for i in range(25)])
+
+        # A second full export replaces the files of the first one
+        self.client.now += 60_000
+        (second,) = exporter.export(["event"])
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.directory.name, "event"))),
+            sorted(os.path.basename(path) for path in second.files),
+        )
+
+    def test_incremental_export_reads_changes_since_previous_export(self):
+        exporter = ParquetExporter(self.directory.name)
+        exporter.export(["event"], incremental=True)
+        self.assertNotIn("since", self.client.queries[-1])
+
+        self.client.docs = [_event(3)]
+        self.client.now += 60_000
+        (result,) = exporter.export(["event"], incremental=True)
+        self.assertEqual(self.client.queries[-1]["since"], 1_000_000 - 1000)
+        self.assertEqual(result.rows, 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.directory.name, "event"))), 2)
+        with open(os.path.join(self.directory.name, EXPORT_STATE_FILE)) as file:
+            self.assertEqual(json.load(file), {"event": 1_060_000})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from omni_python_library.utils.geo import (
+    MAX_MERCATOR_LAT,
+    bounding_box_circle,
+    geohash,
+    geohash_bounds,
+    geohash_cell,
+    haversine_m,
+    polygon_ring,
+    quadkey,
+    quadkey_bounds,
+    quadkey_cell,
+)
+
+
+def _contains(bounds, lat, lon):
+    return bounds[0] <= lat <= bounds[2] and bounds[1] <= lon <= bounds[3]
+
+
+class TestDistances(unittest.TestCase):
+    def test_haversine(self):
+        self.assertAlmostEqual(haversine_m(48.8566, 2.3522, 51.5074, -0.1278) / 1000, 343.6, delta=0.5)
+        self.assertEqual(haversine_m(10, 20, 10, 20), 0)
+        # Antipodes are half the circumference apart
+        self.assertAlmostEqual(haversine_m(0, 0, 0, 180), 20_015_087, delta=1)
+
+    def test_bounding_box_circle_encloses_corners(self):
+        for box in [(40, -10, 50, 10), (-60, 170, -50, -170), (80, -180, 90, 180)]:
+            lat, lon, radius = bounding_box_circle(*box)
+            for corner_lat in (box[0], box[2]):
+                for corner_lon in (box[1], box[3]):
+                    self.assertLessEqual(haversine_m(lat, lon, corner_lat, corner_lon), radius)
+
+        # A box crossing the antimeridian is centered on it
+        _, lon, _ = bounding_box_circle(-60, 170, -50, -170)
+        self.assertAlmostEqual(abs(lon), 180)
+
+    def test_polygon_ring(self):
+        ring = polygon_ring([(1, 2), (3, 4), (5, 6)])
+        self.assertEqual(ring, [[2.0, 1.0], [4.0, 3.0], [6.0, 5.0], [2.0, 1.0]])
+        self.assertEqual(polygon_ring([(1, 2), (3, 4), (5, 6), (1, 2)]), ring)
+        with self.assertRaises(ValueError):
+            polygon_ring([(1, 2), (3, 4)])
+
+
+class TestTiles(unittest.TestCase):
+    def test_quadkey(self):
+        self.assertEqual(quadkey(3, 5, 3), "213")
+        self.assertEqual(quadkey(0, 0, 0), "")
+
+        for lat, lon in [(48.8566, 2.3522), (-33.87, 151.21), (0, 0), (-85, -179.9)]:
+            for zoom in (1, 5, 12):
+                key = quadkey(*quadkey_cell(lat, lon, zoom), zoom)
+                self.assertEqual(len(key), zoom)
+                self.assertTrue(_contains(quadkey_bounds(key), lat, lon), (lat, lon, zoom))
+
+    def test_quadkey_clamps_polar_points_into_edge_tiles(self):
+        north = quadkey(*quadkey_cell(89.5, 10, 4), 4)
+        south = quadkey(*quadkey_cell(-90, 10, 4), 4)
+        self.assertEqual(quadkey_cell(89.5, 10, 4)[1], 0)
+        self.assertEqual(quadkey_cell(-90, 10, 4)[1], 15)
+
+        self.assertAlmostEqual(quadkey_bounds(north)[2], MAX_MERCATOR_LAT)
+        self.assertFalse(_contains(quadkey_bounds(north), 89.5, 10))
+        # The lookup bounds reach the poles, so the clamped points are inside them
+        self.assertTrue(_contains(quadkey_bounds(north, poles=True), 89.5, 10))
+        self.assertTrue(_contains(quadkey_bounds(south, poles=True), -90, 10))
+        # Inner rows are not extended
+        inner = quadkey(*quadkey_cell(10, 10, 4), 4)
+        self.assertEqual(quadkey_bounds(inner, poles=True), quadkey_bounds(inner))
+
+    def test_geohash(self):
+        self.assertEqual(geohash(*geohash_cell(57.64911, 10.40744, 11), 11), "u4pruydqqvj")
+        self.assertEqual(geohash(*geohash_cell(90, 180, 2), 2), "zz")
+
+        for lat, lon in [(48.8566, 2.3522), (-33.87, 151.21), (0, 0), (-90, -180)]:
+            for precision in (1, 4, 7):
+                key = geohash(*geohash_cell(lat, lon, precision), precision)
+                self.assertTrue(_contains(geohash_bounds(key), lat, lon), (lat, lon, precision))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    raise unittest.SkipTest("numpy not installed")
+
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.graph.adjacency import GraphIndex
+from omni_python_library.utils.singleton import Singleton
+
+
+class TestGraphIndex(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances = {}
+        self.index = GraphIndex()
+        self.index.init(collections=["person_knows_person", "event_involves_person"])
+
+    def tearDown(self):
+        OsintDataAccessLayer().remove_change_listener(self.index._on_change)
+
+    def test_neighbors_and_overlay(self):
+        self.index.add_edge("person_knows_person/1", "person/a", "person/b")
+        self.index.compact()
+        self.index.add_edge("event_involves_person/1", "event/x", "person/a")
+
+        self.assertEqual(
+            sorted(self.index.neighbors("person/a")),
+            [("event/x", "event_involves_person/1"), ("person/b", "person_knows_person/1")],
+        )
+        self.assertEqual(self.index.neighbors("person/b"), [("person/a", "person_knows_person/1")])
+        self.assertEqual(self.index.neighbors("person/unknown"), [])
+
+        self.index.remove_edge("person_knows_person/1")
+        self.assertEqual(self.index.neighbors("person/a"), [("event/x", "event_involves_person/1")])
+
+        self.index.compact()
+        self.assertEqual(self.index.neighbors("person/a"), [("event/x", "event_involves_person/1")])
+        self.assertEqual(self.index.neighbors("person/b"), [])
+
+    def test_neighborhood(self):
+        edges = [("person/a", "person/b"), ("person/b", "person/c"), ("person/c", "person/d"), ("person/a", "person/c")]
+        for i, (from_id, to_id) in enumerate(edges):
+            self.index.add_edge(f"person_knows_person/{i}", from_id, to_id)
+
+        self.assertEqual(self.index.neighborhood("person/a", depth=1), {"person/b": 1, "person/c": 1})
+        self.assertEqual(self.index.neighborhood("person/a"), {"person/b": 1, "person/c": 1, "person/d": 2})
+        self.assertEqual(len(self.index.neighborhood("person/a", limit=2)), 2)
+
+    def test_change_listener(self):
+        dal = OsintDataAccessLayer()
+        edge = {"_id": "event_involves_person/9", "_from": "event/x", "_to": "person/a"}
+        dal._notify_change("event_involves_person", None, edge)
+        dal._notify_change("person", None, {"_id": "person/a"})
+        self.assertEqual(self.index.neighbors("event/x"), [("person/a", "event_involves_person/9")])
+
+        dal._notify_change("event_involves_person", edge, None)
+        self.assertEqual(self.index.neighbors("event/x"), [])
+
+    def test_compaction_keeps_many_edges(self):
+        for i in range(5000):
+            self.index.add_edge(f"person_knows_person/{i}", "person/hub", f"person/{i}")
+        self.assertLess(self.index._overlay_size, 5000)
+        self.assertEqual(len(self.index.neighbors("person/hub")), 5000)
+        self.assertGreater(self.index.memory_usage(), 5000 * 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+try:
+    import numpy as np
+except ImportError:
+    raise unittest.SkipTest("numpy not installed")
+
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.graph.algorithms import connected_components, pagerank
+from omni_python_library.graph.snapshot import GraphSnapshot
+from omni_python_library.models.bulk import BulkResult
+
+# Snapshots are built from in-memory relations, no ArangoDB needed.
+
+
+def _snapshot(edges, vertex_count, weights=None) -> GraphSnapshot:
+    sources = np.array([s for s, _ in edges], dtype=np.int32)
+    targets = np.array([t for _, t in edges], dtype=np.int32)
+    ids = [f"person/{i}" for i in range(vertex_count)]
+    return GraphSnapshot.from_edges(ids, sources, targets, None if weights is None else np.array(weights))
+
+
+def _dense_pagerank(edges, n, weights, damping=0.85, iterations=200):
+    matrix = np.zeros((n, n))
+    for (s, t), w in zip(edges, weights):
+        matrix[s, t] += w
+    out = matrix.sum(axis=1)
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        spread = np.zeros(n)
+        for s in range(n):
+            if out[s]:
+                spread += ranks[s] * matrix[s] / out[s]
+            else:
+                spread += ranks[s] / n
+        ranks = (1 - damping) / n + damping * spread
+    return ranks
+
+
+class TestGraphSnapshot(unittest.TestCase):
+    def test_csr_layout_and_ids(self):
+        snapshot = _snapshot([(2, 0), (0, 1), (0, 2), (1, 2)], 4)
+        self.assertEqual(snapshot.indptr.tolist(), [0, 2, 3, 4, 4])
+        self.assertEqual(snapshot.indices.tolist(), [1, 2, 2, 0])
+        self.assertEqual(snapshot.sources().tolist(), [0, 0, 1, 2])
+        self.assertEqual(snapshot.vertex_id(3), "person/3")
+        self.assertEqual(snapshot.vertex("person/2"), 2)
+        self.assertIsNone(snapshot.vertex("person/9"))
+
+    def test_save_and_memory_mapped_load(self):
+        snapshot = _snapshot([(0, 1), (1, 2)], 3, weights=[0.5, 1.0])
+        snapshot.meta = {"graphs": ["event_graph"]}
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot.save(directory)
+            loaded = GraphSnapshot.load(directory)
+            self.assertIsInstance(loaded.indices, np.memmap)
+            self.assertEqual(loaded.vertex_ids(), ["person/0", "person/1", "person/2"])
+            self.assertEqual(loaded.weights.tolist(), [0.5, 1.0])
+            self.assertEqual(loaded.meta["edge_count"], 2)
+            self.assertTrue(os.path.exists(os.path.join(directory, "snapshot.json")))
+            np.testing.assert_allclose(pagerank(loaded), pagerank(snapshot))
+
+    def test_pagerank_matches_dense_power_iteration(self):
+        edges = [(0, 1), (1, 2), (2, 0), (3, 0), (3, 2), (4, 3), (0, 5)]
+        weights = [1.0, 0.5, 0.75, 1.0, 0.5, 0.6, 1.0]
+        snapshot = _snapshot(edges, 7, weights)
+
+        ranks = pagerank(snapshot, tolerance=1e-12, max_iterations=500)
+        self.assertAlmostEqual(ranks.sum(), 1.0)
+        np.testing.assert_allclose(ranks, _dense_pagerank(edges, 7, weights), atol=1e-9)
+
+        undirected = pagerank(snapshot, weighted=False, directed=False, tolerance=1e-12, max_iterations=500)
+        both_ways = edges + [(t, s) for s, t in edges]
+        np.testing.assert_allclose(undirected, _dense_pagerank(both_ways, 7, [1.0] * len(both_ways)), atol=1e-9)
+
+    def test_connected_components(self):
+        rng = np.random.default_rng(7)
+        # A long chain in shuffled order, a triangle, and two isolated vertices
+        chain = rng.permutation(50)
+        edges = [(int(a), int(b)) for a, b in zip(chain[:-1], chain[1:])] + [(50, 51), (52, 51), (50, 52)]
+        count, labels = connected_components(_snapshot(edges, 55))
+
+        self.assertEqual(count, 4)
+        self.assertEqual(len(set(labels[:50].tolist())), 1)
+        self.assertEqual(len(set(labels[50:53].tolist())), 1)
+        self.assertEqual(len(set(labels.tolist())), 4)
+        self.assertEqual(labels[0], 0)
+
+    def test_to_scipy(self):
+        try:
+            import scipy  # noqa: F401
+        except ImportError:
+            self.skipTest("scipy not installed")
+        matrix = _snapshot([(0, 1), (1, 2)], 3, weights=[0.5, 1.0]).to_scipy()
+        self.assertEqual(matrix.toarray().tolist(), [[0, 0.5, 0], [0, 0, 1.0], [0, 0, 0]])
+
+    def test_write_back(self):
+        snapshot = _snapshot([(0, 1)], 3)
+        with patch.object(OsintDataAccessLayer, "update_many", return_value=BulkResult(ids=["person/0"])) as update:
+            snapshot.write_back(
+                {"pagerank": np.array([0.5, 0.25, 0.25]), "component": np.array([0, 0, 1])}, batch_size=2
+            )
+
+        self.assertEqual(update.call_count, 2)
+        updates = update.call_args_list[0].args[0]
+        self.assertEqual(updates["person/1"], {"attributes": {"pagerank": 0.25, "component": 0}})
+        self.assertFalse(update.call_args_list[0].kwargs["reembed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
+from omni_python_library.ingest.checkpoint import Checkpoint
+from omni_python_library.ingest.pipeline import IngestPipeline, validate_records
+from omni_python_library.ingest.readers import CSV, NDJSON, decode_record, detect_format, read_records
+from omni_python_library.models.osint import ArangoData, EventMainData
+
+# The pipeline is exercised with the writes of the data access layer replaced, no ArangoDB or Redis needed.
+
+
+class _FakeIngest:
+    """
+    Stands in for `OsintDataAccessLayer.ingest`, optionally crashing on the batch holding a given title.
+    """
+
+    def __init__(self, crash_on: str = ""):
+        self.crash_on = crash_on
+        self.keys = {}
+
+    def __call__(self, items, owner, embed=True, batch_size=0, keys=None, embeddings=None):
+        if any(item.title == self.crash_on for item in items):
+            raise ConnectionError("ArangoDB went away")
+        handles = []
+        for item, key, embedding in zip(items, keys, embeddings or [None] * len(items)):
+            self.keys.setdefault(key, item.title)
+            handles.append(ArangoData(id=f"event/{key}", key=key, rev="1") if item.title != "reject" else None)
+        return handles
+
+
+class TestIngestReaders(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("dump.jsonl.gz"), NDJSON)
+        self.assertEqual(detect_format("dump.CSV"), CSV)
+        with self.assertRaises(ValueError):
+            detect_format("dump.xml")
+
+    def test_ndjson_skips_blank_lines_and_resumes(self):
+        path = self._path("events.ndjson.gz")
+        with gzip.open(path, "wt") as file:
+            file.write('{"title": "a"}\n\n{"title": "b"}\n{"title": "c"}\n')
+
+        self.assertEqual([json.loads(r)["title"] for r in read_records(path)], ["a", "b", "c"])
+        self.assertEqual([json.loads(r)["title"] for r in read_records(path, skip=2)], ["c"])
+
+    def test_csv_cells_are_decoded(self):
+        path = self._path("events.csv")
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["title", "happened_at", "tags", "attributes.origin", "description"])
+            writer.writerow(["a", "1700000000", '["x", "y"]', "Paris", ""])
+
+        (record,) = read_records(path)
+        fields = decode_record(record, CSV)
+        self.assertEqual(
+            fields, {"title": "a", "happened_at": "1700000000", "tags": ["x", "y"], "attributes": {"origin": "Paris"}}
+        )
+        self.assertEqual(EventMainData.model_validate(fields).happened_at, 1700000000)
+
+    def test_validate_records_keeps_positions(self):
+        models, errors, _ = validate_records(
+            "event", NDJSON, ['{"title": "a"}', "not json", '{"happened_at": "soon"}', '{"title": "b"}']
+        )
+        self.assertEqual([m.title if m else None for m in models], ["a", None, None, "b"])
+        self.assertEqual([position for position, _ in errors], [1, 2])
+
+
+class TestKeyedIngest(unittest.TestCase):
+    def test_existing_keys_are_neither_counted_nor_notified(self):
+        client = MagicMock()
+
+        def execute(query, bind_vars=None, **kwargs):
+            if "INSERT" in query:
+                # "a" is written, "b" exists from a previous attempt and "c" violates a unique index
+                return iter([{"key": "a", "rev": "_new"}, {"key": "b", "rev": None}, {"key": "c", "rev": None}])
+            self.assertEqual(bind_vars["keys"], ["b", "c"])
+            return iter([["b", "_old"]])
+
+        client.execute.side_effect = execute
+        changes = []
+        dal = OsintDataAccessLayer()
+        listener = lambda collection, batch: changes.extend(batch)  # noqa: E731
+        dal.add_changes_listener(listener)
+        self.addCleanup(dal.remove_changes_listener, listener)
+        items = [EventMainData(title=title) for title in "abc"]
+        with (
+            patch("omni_python_library.dal.osint_data_factory.ArangoDBClient", return_value=client),
+            patch("omni_python_library.dal.osint_data_factory.update_event_rollups") as rollups,
+        ):
+            handles = dal.ingest(items, owner="test", embed=False, keys=["a", "b", "c"])
+
+        self.assertEqual([h.rev if h else None for h in handles], ["_new", "_old", None])
+        self.assertEqual([new["_key"] for _, new in rollups.call_args.args[0]], ["a"])
+        self.assertEqual([new["_key"] for _, new in changes], ["a"])
+
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, "events.ndjson")
+        titles = [f"event {i}" for i in range(25)]
+        titles[7] = "reject"
+        with open(self.input, "w") as file:
+            for title in titles:
+                file.write(json.dumps({"title": title, "type": "protest"}) + "\n")
+            file.write('{"title": ["not", "a", "string"]}\n')
+        self.checkpoint = os.path.join(self.directory.name, "events.ckpt")
+        self.embeddings = patch.object(
+            OsintDataAccessLayer, "generate_embeddings", lambda self, texts: [[0.0] for _ in texts]
+        )
+        self.embeddings.start()
+
+    def tearDown(self):
+        self.embeddings.stop()
+        self.directory.cleanup()
+
+    def _pipeline(self, **kwargs) -> IngestPipeline:
+        return IngestPipeline(
+            "event", owner="test", batch_size=4, max_in_flight=2, checkpoint_path=self.checkpoint, **kwargs
+        )
+
+    def test_run_reports_every_stage(self):
+        fake = _FakeIngest()
+        with patch.object(OsintDataAccessLayer, "ingest", side_effect=fake):
+            summary = self._pipeline(workers=2).run(self.input)
+
+        self.assertEqual((summary.read, summary.invalid, summary.written, summary.failed), (26, 1, 24, 1))
+        self.assertEqual(len(fake.keys), 25)
+        stages = {stage.stage: stage for stage in summary.stages}
+        self.assertEqual(stages["read"].records, 26)
+        self.assertEqual(stages["validate"].records, 26)
+        self.assertEqual(stages["embed"].records, 25)
+        self.assertEqual(stages["write"].records, 25)
+
+    def test_crashed_run_resumes_without_duplicates(self):
+        crashing = _FakeIngest(crash_on="event 13")
+        with patch.object(OsintDataAccessLayer, "ingest", side_effect=crashing):
+            with self.assertRaises(ConnectionError):
+                self._pipeline(workers=0).run(self.input)
+
+        checkpoint = Checkpoint(self.checkpoint, self.input, "event")
+        self.assertTrue(checkpoint.load())
+        self.assertEqual(checkpoint.committed, 12)
+        self.assertGreater(checkpoint.submitted, checkpoint.committed)
+
+        resumed = _FakeIngest()
+        resumed.keys = dict(crashing.keys)
+        with patch.object(OsintDataAccessLayer, "ingest", side_effect=resumed):
+            summary = self._pipeline(workers=0).run(self.input)
+
+        self.assertEqual(summary.resumed_at, 12)
+        self.assertEqual(summary.read, 14)
+        # Every record got exactly one key, including the ones of the batch replayed after the crash
+        self.assertEqual(sorted(resumed.keys.values()), sorted(f"event {i}" for i in range(25) if i != 7) + ["reject"])
+
+    def test_checkpoint_of_another_input_is_refused(self):
+        Checkpoint(self.checkpoint, self.input, "event").save()
+        with self.assertRaises(ValueError):
+            Checkpoint(self.checkpoint, self.input, "source").load()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,7 +12,7 @@ sys.modules["openai"] = MagicMock()
 # to avoid needing a running DB for *initialization* tests (fast feedback),
 # while the CRUD tests will use the docker container.
 
-from omni_python_library.clients.arangodb import ArangoDBClient
+from omni_python_library.clients.arangodb import EDGE_INDICES, ArangoDBClient, _serialize
 from omni_python_library.clients.redis import RedisClient
 from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
 from omni_python_library.utils.singleton import Singleton
@@ -52,9 +52,45 @@ class TestInitialization(unittest.TestCase):
         self.assertEqual(client._password, "pw")
         self.assertEqual(client._db_name, "test_db")
 
-        mock_arango_client_cls.assert_called_once_with(hosts="http://localhost:8529")
+        mock_arango_client_cls.assert_called_once_with(hosts="http://localhost:8529", serializer=_serialize)
         mock_client_instance.db.assert_called_once_with("test_db", username="root", password="pw")
 
+    @patch("omni_python_library.clients.arangodb.ArangoClient")
+    def test_edge_collection_set_up_after_plain_lookup(self, mock_arango_client_cls):
+        """A collection cached by get_collection still gets its edge indexes and graph membership."""
+        client = ArangoDBClient()
+        client.init()
+        graph_callback = MagicMock(return_value="graph")
+        client._graph_callbacks.append(graph_callback)
+
+        with (
+            patch.object(client, "init_collection") as init_collection,
+            patch.object(client, "_ensure_in_graph") as ensure_in_graph,
+        ):
+            client.get_collection("event_related_event")
+            client.get_edge_collection("related", "event", "event")
+            client.get_edge_collection("related", "event", "event")
+
+        init_collection.assert_called_once()
+        ensure_in_graph.assert_called_once_with("graph", "event_related_event", "event", "event")
+
+    @patch("omni_python_library.clients.arangodb.ArangoClient")
+    def test_drop_indices(self, mock_arango_client_cls):
+        """Only the indexes with exactly the given type and fields are dropped."""
+        client = ArangoDBClient()
+        client.init()
+        col = MagicMock()
+        col.indexes.return_value = [
+            {"id": "event/0", "type": "primary", "fields": ["_key"]},
+            {"id": "event/1", "type": "inverted", "fields": [{"name": "title"}]},
+            {"id": "event/2", "type": "inverted", "fields": [{"name": "title"}, {"name": "description"}]},
+            {"id": "event/3", "type": "persistent", "fields": ["description"]},
+        ]
+        with patch.object(client, "get_collection", return_value=col):
+            client.drop_indices("event", [("inverted", "title"), ("inverted", "description")])
+
+        col.delete_index.assert_called_once_with("event/1")
+
     @patch("omni_python_library.dal.cacher.RedisClient")
     @patch("omni_python_library.dal.osint_data_access_layer.ArangoDBClient")
     def test_dal_init(self, mock_arango, mock_redis):
@@ -69,10 +105,14 @@ class TestInitialization(unittest.TestCase):
         mock_arango.return_value = mock_arango_instance
         # init calls init_collection which calls _db.has_collection, so we need _db mock
         mock_arango_instance._db = MagicMock()
+        mock_arango_instance.get_edge_collection_names.return_value = ["event_related_event"]
 
         dal = OsintDataAccessLayer()
         dal.init()
 
+        # Existing edge collections get the indexes of the neighborhood and relation lookups
+        mock_arango_instance.init_collection.assert_any_call("event_related_event", edge=True, indices=EDGE_INDICES)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import MagicMock
+
+from omni_python_library.models.instrumentation import Tier
+from omni_python_library.utils import instrumentation
+from omni_python_library.utils.instrumentation import Instrumentation, timed
+from omni_python_library.utils.singleton import Singleton
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances = {}
+        self.instrumentation = Instrumentation()
+        self.instrumentation.init(slow_query_ms=100, buckets=(0.01, 0.1))
+
+    def tearDown(self):
+        self.instrumentation.disable()
+
+    def test_disabled(self):
+        self.instrumentation.disable()
+        self.assertIsNone(instrumentation.active_instrumentation())
+        with timed(Tier.REDIS, "get"):
+            pass
+        self.assertEqual(self.instrumentation.histograms(), [])
+
+    def test_histograms_and_exporters(self):
+        exported = []
+        self.instrumentation.add_exporter(lambda *args: exported.append(args))
+        with timed(Tier.REDIS, "get"):
+            pass
+        self.instrumentation.observe(Tier.REDIS, "get", 0.05)
+        self.instrumentation.observe(Tier.REDIS, "get", 1.0)
+        self.instrumentation.observe(Tier.EMBEDDING, "create", 0.2)
+
+        histograms = {(h.tier, h.operation): h for h in self.instrumentation.histograms()}
+        redis = histograms[(Tier.REDIS, "get")]
+        self.assertEqual(redis.counts, [1, 2])
+        self.assertEqual(redis.count, 3)
+        self.assertAlmostEqual(redis.sum, 1.05, places=2)
+        self.assertEqual(histograms[(Tier.EMBEDDING, "create")].counts, [0, 0])
+        self.assertEqual(len(exported), 4)
+        self.assertEqual(exported[-1], ("embedding", "create", 0.2))
+
+    def test_slow_query_log(self):
+        db, cursor = MagicMock(), MagicMock()
+        db.aql.explain.return_value = {"nodes": []}
+        cursor.statistics.return_value = {"scanned_full": 10, "peak_memory_usage": 2048}
+        cursor.profile.return_value = None
+
+        self.instrumentation.record_query(db, "FOR doc IN event RETURN doc", {"v": [0.0] * 100}, cursor, 0.01)
+        self.assertEqual(self.instrumentation.slow_queries(), [])
+
+        self.instrumentation.record_query(db, "FOR doc IN event RETURN doc", {"v": [0.0] * 100}, cursor, 0.5)
+        (slow_query,) = self.instrumentation.slow_queries()
+        self.assertEqual(slow_query.duration_ms, 500)
+        self.assertEqual(slow_query.bind_vars, {"v": "<100 items>"})
+        self.assertEqual(slow_query.statistics["scanned_full"], 10)
+        self.assertEqual(slow_query.plan, {"nodes": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
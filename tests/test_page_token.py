@@ -0,0 +1,25 @@
+import unittest
+
+from omni_python_library.utils.page_token import decode_page_token, encode_page_token, page_scope
+
+
+class TestPageToken(unittest.TestCase):
+    def test_round_trip(self):
+        scope = page_scope("events", "text", None, (1, 2))
+        self.assertEqual(scope, page_scope("events", "text", None, [1, 2]))
+
+        token = encode_page_token(scope, after=[0.5, "123"], seen=20)
+        self.assertEqual(token, encode_page_token(scope, seen=20, after=[0.5, "123"]))
+        data = decode_page_token(token, scope)
+        self.assertEqual((data["after"], data["seen"]), ([0.5, "123"], 20))
+
+    def test_invalid_tokens(self):
+        scope = page_scope("events")
+        with self.assertRaises(ValueError):
+            decode_page_token("not a token", scope)
+        with self.assertRaises(ValueError):
+            decode_page_token(encode_page_token(page_scope("views"), after="1"), scope)
+
+
+if __name__ == "__main__":
+    unittest.main()
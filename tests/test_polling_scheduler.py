@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from omni_python_library.models.monitor import MonitoringSource, SourceType
+from omni_python_library.polling.fetchers import Fetcher, FetchResult
+from omni_python_library.polling.scheduler import PollingScheduler
+
+# The scheduler is exercised against a local HTTP stub, no ArangoDB or Redis needed.
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    hits = 0
+    conditional_hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.path == "/broken":
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == '"v1"':
+            type(self).conditional_hits += 1
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+
+        body = b"hello"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Last-Modified", "Mon, 19 Oct 2026 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SlowFetcher(Fetcher):
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def fetch(self, source, etag=None, last_modified=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return FetchResult(status=200, content=b"x")
+
+
+class TestPollingScheduler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _StubHandler.hits = 0
+        _StubHandler.conditional_hits = 0
+
+    def _source(self, key: str, path: str, reliability: float = 50.0, type: SourceType = SourceType.WEBSITE):
+        return MonitoringSource(
+            id=f"monitoringsource/{key}",
+            key=key,
+            type=type,
+            url=f"{self.base_url}{path}",
+            reliability=reliability,
+            user_id="test_user",
+        )
+
+    def test_conditional_fetch(self):
+        received = []
+        scheduler = PollingScheduler(on_result=lambda source, result: received.append(result))
+        scheduler.add_source(self._source("a", "/feed"))
+
+        first = asyncio.run(scheduler.run_once())["monitoringsource/a"]
+        self.assertEqual(first.status, 200)
+        self.assertEqual(first.content, b"hello")
+
+        second = asyncio.run(scheduler.run_once())["monitoringsource/a"]
+        self.assertTrue(second.not_modified)
+        self.assertEqual(_StubHandler.conditional_hits, 1)
+        self.assertEqual(len(received), 2)
+
+        metrics = scheduler.metrics.snapshot()
+        self.assertEqual(metrics["polls"], 2)
+        self.assertEqual(metrics["changed"], 1)
+        self.assertEqual(metrics["not_modified"], 1)
+
+    def test_failures_back_off(self):
+        scheduler = PollingScheduler(base_backoff=10.0)
+        scheduler.add_source(self._source("b", "/broken"))
+
+        results = asyncio.run(scheduler.run_once())
+        self.assertIsNone(results["monitoringsource/b"])
+        self.assertEqual(scheduler.metrics.failures, 1)
+        delay = scheduler._backoff(3)
+        self.assertTrue(20.0 <= delay <= 40.0)
+
+    def test_per_host_limit(self):
+        fetcher = _SlowFetcher()
+        scheduler = PollingScheduler(per_host_limit=2, fetchers={SourceType.TWITTER: fetcher})
+        for i in range(6):
+            scheduler.add_source(self._source(f"t{i}", f"/{i}", type=SourceType.TWITTER))
+
+        asyncio.run(scheduler.run_once())
+        self.assertEqual(fetcher.max_active, 2)
+
+    def test_reliability_priority(self):
+        scheduler = PollingScheduler(min_interval=60.0, max_interval=3600.0)
+        scheduler.add_source(self._source("low", "/low", reliability=10.0))
+        scheduler.add_source(self._source("high", "/high", reliability=90.0))
+
+        high = scheduler._states["monitoringsource/high"]
+        low = scheduler._states["monitoringsource/low"]
+        self.assertLess(high.interval, low.interval)
+
+        due = scheduler._pop_due(float("inf"))
+        self.assertEqual([state.source.id for _, state in due], [high.source.id, low.source.id])
+
+    def test_source_added_again_keeps_one_schedule(self):
+        scheduler = PollingScheduler()
+        source = self._source("again", "/again")
+        scheduler.add_source(source)
+        scheduler.remove_source(source.id)
+        scheduler.add_source(source)
+
+        due = scheduler._pop_due(float("inf"))
+        self.assertEqual(len(due), 1)
+        self.assertIs(due[0][1], scheduler._states[source.id])
+
+    def test_cancelled_fetch_leaves_no_fetch_in_flight(self):
+        scheduler = PollingScheduler(fetchers={SourceType.TWITTER: _SlowFetcher()})
+        scheduler.add_source(self._source("slow", "/slow", type=SourceType.TWITTER))
+
+        async def cancel():
+            task = asyncio.ensure_future(scheduler.run_once())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        self.assertEqual(scheduler.metrics.in_flight, 0)
+        self.assertEqual(scheduler.metrics.polls, 0)
+
+    def test_unknown_type_is_skipped(self):
+        scheduler = PollingScheduler()
+        self.assertFalse(scheduler.add_source(self._source("tg", "/tg", type=SourceType.TELEGRAM)))
+
+    def test_run_loop(self):
+        scheduler = PollingScheduler(min_interval=0.05, max_interval=0.05)
+        scheduler.add_source(self._source("loop", "/loop"))
+
+        async def run():
+            asyncio.get_running_loop().call_later(0.3, scheduler.stop)
+            await scheduler.run()
+
+        asyncio.run(run())
+        self.assertGreaterEqual(scheduler.metrics.polls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from omni_python_library.dal.query_cache import normalize_query, query_key
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_normalize_query(self):
+        query = """
+        FOR doc IN event  // events only
+            FILTER doc.title == "a  b" /* keeps literals */
+            RETURN doc
+        """
+        self.assertEqual(normalize_query(query), 'FOR doc IN event FILTER doc.title == "a  b" RETURN doc')
+
+    def test_query_key(self):
+        query = "FOR doc IN event FILTER doc.happened_at >= @since RETURN doc"
+        self.assertEqual(
+            query_key(query, {"since": 1, "@c": "event"}), query_key(f"  {query}\n", {"@c": "event", "since": 1})
+        )
+        self.assertNotEqual(query_key(query, {"since": 1}), query_key(query, {"since": 2}))
+        self.assertEqual(query_key(query, None), query_key(query, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
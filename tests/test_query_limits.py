@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from arango.exceptions import AQLQueryExecuteError, CursorNextError
+
+from omni_python_library.clients.arangodb import (
+    QUERY_KILLED,
+    RESOURCE_LIMIT,
+    ArangoDBClient,
+    QueryMemoryLimitError,
+    QueryTimeoutError,
+    query_limits,
+    run_cancellable,
+)
+from omni_python_library.utils.singleton import Singleton
+
+
+def _execute_error(error_code: int, error_type=AQLQueryExecuteError):
+    error = error_type.__new__(error_type)
+    error.error_code = error_code
+    return error
+
+
+class TestQueryLimits(unittest.TestCase):
+    def setUp(self):
+        Singleton._instances = {}
+        self.client = ArangoDBClient()
+        self.client.init(query_max_runtime=30)
+        self.client._db = MagicMock()
+
+    def execute_options(self):
+        return self.client._db.aql.execute.call_args.kwargs
+
+    def test_tightest_limits_apply(self):
+        self.client.execute("RETURN 1")
+        self.assertEqual(self.execute_options(), {"bind_vars": None, "max_runtime": 30})
+
+        with query_limits(max_runtime=5):
+            with query_limits(max_runtime=10, memory_limit=1024):
+                self.client.execute("RETURN 1", max_runtime=20)
+        self.assertEqual(self.execute_options(), {"bind_vars": None, "max_runtime": 5, "memory_limit": 1024})
+
+    def test_explicit_limits_replace_client_defaults(self):
+        self.client.execute("RETURN 1", max_runtime=600)
+        self.assertEqual(self.execute_options()["max_runtime"], 600)
+        with query_limits(max_runtime=3600):
+            self.client.execute("RETURN 1")
+        self.assertEqual(self.execute_options()["max_runtime"], 3600)
+
+        # None lifts the default, but not the limit of an enclosing block
+        self.client.execute("RETURN 1", max_runtime=None)
+        self.assertNotIn("max_runtime", self.execute_options())
+        with query_limits(max_runtime=5):
+            self.client.execute("RETURN 1", max_runtime=None)
+        self.assertEqual(self.execute_options()["max_runtime"], 5)
+
+    def test_killed_query_raises_timeout(self):
+        self.client._db.aql.execute.side_effect = _execute_error(QUERY_KILLED)
+        with self.assertRaises(QueryTimeoutError):
+            self.client.execute("RETURN 1")
+        with self.assertRaises(TimeoutError):
+            self.client.execute("RETURN 1")
+
+    def test_streamed_query_killed_on_later_batch_raises(self):
+        cursor = MagicMock()
+        cursor.next.side_effect = [1, _execute_error(QUERY_KILLED, CursorNextError)]
+        self.client._db.aql.execute.return_value = cursor
+        rows = self.client.execute("FOR d IN c RETURN d", stream=True)
+        with self.assertRaises(QueryTimeoutError):
+            list(rows)
+
+        cursor.next.side_effect = [_execute_error(RESOURCE_LIMIT, CursorNextError)]
+        with self.assertRaises(QueryMemoryLimitError):
+            self.client.execute("FOR d IN c RETURN d", stream=True).next()
+
+    def test_cancellation_kills_queries(self):
+        started, release = threading.Event(), threading.Event()
+        running = []
+
+        def execute(query, **kwargs):
+            running.append({"id": "1", "query": query})
+            started.set()
+            release.wait(5)
+            return iter([])
+
+        self.client._db.aql.execute.side_effect = execute
+        self.client._db.aql.queries.side_effect = lambda: running
+        # Killing the query ends the blocked execute call, as the server would
+        self.client._db.aql.kill.side_effect = lambda query_id: release.set()
+
+        async def cancel():
+            task = asyncio.ensure_future(run_cancellable(self.client.execute, "RETURN 1", max_runtime=60))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        try:
+            asyncio.run(cancel())
+        finally:
+            release.set()
+        self.client._db.aql.kill.assert_called_once_with("1")
+        self.assertTrue(running[0]["query"].startswith("/* omni-query:"))
+        self.assertEqual(self.execute_options()["max_runtime"], 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,10 +6,26 @@ from arango import ArangoClient as PyArangoClient
 from omni_python_library.clients.arangodb import ArangoDBClient
 from omni_python_library.clients.openai import OpenAIClient
 from omni_python_library.clients.redis import RedisClient
+from omni_python_library.dal.event_rollup import rebuild_event_rollup
 from omni_python_library.dal.osint_data_access_layer import OsintDataAccessLayer
-from omni_python_library.dal.query_tools.entity_neighborhood import search_entity_neighborhood
-from omni_python_library.dal.query_tools.event_search import search_events
-from omni_python_library.models.osint import EventMainData, LocationData, PersonMainData, RelationMainData
+from omni_python_library.dal.query_tools.entity_neighborhood import (
+    explore_entity_neighborhood,
+    search_entity_neighborhood,
+)
+from omni_python_library.dal.query_tools.entity_paths import find_entity_paths
+from omni_python_library.dal.query_tools.event_histogram import event_histogram
+from omni_python_library.dal.query_tools.event_search import SearchMode, search_events, search_events_page
+from omni_python_library.dal.query_tools.event_tiles import aggregate_event_tiles
+from omni_python_library.models.aggregation import HistogramDimension, HistogramInterval, TileScheme
+from omni_python_library.models.osint import (
+    EventMainData,
+    LocationData,
+    OrganizationMainData,
+    PersonMainData,
+    RelationMainData,
+    SourceMainData,
+)
+from omni_python_library.utils.config_registry import EntityNameConstant
 from omni_python_library.utils.singleton import Singleton
 
 
@@ -118,6 +134,168 @@ class TestQueryTools(unittest.TestCase):
         # If the graph configuration is buggy, this might fail (relation_ids might be empty)
         self.assertTrue(len(relation_ids) > 0, "Should find relations between queried events")
 
+    def test_search_events_by_vector(self):
+        near = self.dal.create_event(EventMainData(title="Near", happened_at=1000), owner="test")
+        far = self.dal.create_event(EventMainData(title="Far", happened_at=1000), owner="test")
+        collection = ArangoDBClient().get_collection("event")
+        collection.update({"_key": near.key, "embedding": [1.0, 0.1, 0.0]})
+        collection.update({"_key": far.key, "embedding": [0.0, 1.0, 0.0]})
+
+        results = search_events(vector=[1.0, 0.0, 0.0], limit=2)
+
+        event_ids = [r.id for r in results if r.id.startswith("event/")]
+        self.assertEqual(event_ids, [near.id, far.id])
+
+    def test_search_events_by_text(self):
+        match = self.dal.create_event(
+            EventMainData(title="Harbour strike", description="Dock workers walk out", happened_at=1000), owner="test"
+        )
+        other = self.dal.create_event(EventMainData(title="Election", happened_at=1000), owner="test")
+        collection = ArangoDBClient().get_collection("event")
+        collection.update({"_key": match.key, "embedding": [0.0, 1.0, 0.0]})
+        collection.update({"_key": other.key, "embedding": [1.0, 0.0, 0.0]})
+
+        # Inverted index updates become visible after the view commit interval
+        time.sleep(2)
+
+        results = search_events(text="harbour", mode=SearchMode.TEXT)
+        event_ids = [r.id for r in results if r.id.startswith("event/")]
+        self.assertEqual(event_ids, [match.id])
+
+        results = search_events(text="harbour", vector=[1.0, 0.0, 0.0], mode=SearchMode.HYBRID, text_weight=3.0)
+        event_ids = [r.id for r in results if r.id.startswith("event/")]
+        self.assertEqual(event_ids, [match.id, other.id])
+
+    def test_search_events_by_location(self):
+        def location(latitude, longitude):
+            return LocationData(
+                latitude=latitude,
+                longitude=longitude,
+                country_code="FR",
+                administrative_area="",
+                sub_administrative_area="",
+                locality="",
+                sub_locality="",
+                address="",
+                postal_code=0,
+            )
+
+        paris = self.dal.create_event(EventMainData(title="Paris", location=location(48.8566, 2.3522)), owner="test")
+        lyon = self.dal.create_event(EventMainData(title="Lyon", location=location(45.764, 4.8357)), owner="test")
+        self.dal.create_event(EventMainData(title="Nowhere"), owner="test")
+
+        results = search_events(point=(48.86, 2.35), radius_km=50)
+        self.assertEqual([r.id for r in results if r.id.startswith("event/")], [paris.id])
+
+        results = search_events(bounding_box=(45.0, 4.0, 46.0, 5.0))
+        self.assertEqual([r.id for r in results if r.id.startswith("event/")], [lyon.id])
+
+        results = search_events(polygon=[(44.0, 0.0), (50.0, 0.0), (50.0, 6.0), (44.0, 6.0)])
+        self.assertEqual({r.id for r in results if r.id.startswith("event/")}, {paris.id, lyon.id})
+
+    def test_aggregate_event_tiles(self):
+        def location(latitude, longitude):
+            return LocationData(
+                latitude=latitude,
+                longitude=longitude,
+                country_code="FR",
+                administrative_area="",
+                sub_administrative_area="",
+                locality="",
+                sub_locality="",
+                address="",
+                postal_code=0,
+            )
+
+        first = self.dal.create_event(
+            EventMainData(title="Paris 1", happened_at=1000, location=location(48.85, 2.35)), owner="test"
+        )
+        second = self.dal.create_event(
+            EventMainData(title="Paris 2", happened_at=2000, location=location(48.86, 2.34)), owner="test"
+        )
+        self.dal.create_event(
+            EventMainData(title="Lyon", happened_at=3000, location=location(45.76, 4.84)), owner="test"
+        )
+
+        tiles = aggregate_event_tiles(6, bounding_box=(44.0, 0.0, 50.0, 6.0), top_n=1)
+        self.assertEqual(sorted(t.count for t in tiles), [1, 2])
+        paris = next(t for t in tiles if t.count == 2)
+        self.assertEqual(paris.event_ids, [second.id])
+
+        # A closed range in the past is served from the block cache on the second call
+        for _ in range(2):
+            tiles = aggregate_event_tiles(5, scheme=TileScheme.GEOHASH, date_range=(0, 2500), top_n=5)
+            self.assertEqual(len(tiles), 1)
+            self.assertTrue(tiles[0].tile.startswith("u09t"))
+            self.assertEqual(set(tiles[0].event_ids), {first.id, second.id})
+
+    def test_event_histogram(self):
+        hour = 3_600_000
+        first = self.dal.create_event(EventMainData(title="A", happened_at=hour + 1, tags=["x", "y"]), owner="test")
+        self.dal.create_event(EventMainData(title="B", happened_at=hour + 2, tags=["x"]), owner="test")
+        self.dal.create_event(EventMainData(title="C", happened_at=3 * hour, type="protest"), owner="test")
+
+        def counts(**kwargs):
+            return [(b.bucket, b.value, b.count) for b in event_histogram(HistogramInterval.HOUR, **kwargs)]
+
+        expected = [(hour, None, 2), (3 * hour, None, 1)]
+        self.assertEqual(counts(), expected)
+        self.assertEqual(counts(use_rollup=False), expected)
+
+        by_tag = [(hour, "x", 2), (hour, "y", 1)]
+        self.assertEqual(counts(group_by=HistogramDimension.TAGS), by_tag)
+        self.assertEqual(counts(group_by=HistogramDimension.TAGS, use_rollup=False), by_tag)
+
+        # Updates move the event between buckets, deletes remove it
+        self.dal.update_event(first.id, EventMainData(happened_at=3 * hour + 5))
+        self.assertEqual(counts(date_range=(0, 2 * hour - 1)), [(hour, None, 1)])
+        self.assertEqual(counts(date_range=(3 * hour, None)), [(3 * hour, None, 2)])
+        self.dal.delete_entity(first.id)
+        self.assertEqual(counts(group_by=HistogramDimension.TAGS), [(hour, "x", 1)])
+        self.assertEqual(counts(event_type="protest"), [(3 * hour, None, 1)])
+
+        rebuild_event_rollup()
+        self.assertEqual(counts(), [(hour, None, 1), (3 * hour, None, 1)])
+
+    def test_search_events_page(self):
+        for i in range(5):
+            self.dal.create_event(EventMainData(title=f"E{i}", happened_at=1000 * (i // 2)), owner="test")
+
+        titles, cursor = [], None
+        for _ in range(3):
+            page = search_events_page(limit=2, include_relations=False, cursor=cursor)
+            titles.extend(e.title for e in page.events)
+            cursor = page.cursor
+        self.assertIsNone(cursor)
+        # Most recent first, ties broken by key
+        self.assertEqual(len(titles), 5)
+        self.assertEqual(set(titles), {f"E{i}" for i in range(5)})
+        self.assertEqual(titles[0], "E4")
+
+        first = search_events_page(limit=2, include_relations=False)
+        with self.assertRaises(ValueError):
+            search_events_page(limit=2, country_code="US", include_relations=False, cursor=first.cursor)
+
+    def test_query_cache(self):
+        self.dal.create_event(EventMainData(title="A", happened_at=1000), owner="test")
+
+        def titles():
+            return sorted(e.title for e in search_events(date_range=(0, None), include_relations=False, cache=True))
+
+        self.assertEqual(titles(), ["A"])
+        # Writes bypassing the data access layers do not invalidate the cached results
+        ArangoDBClient().get_collection(EntityNameConstant.EVENT).insert({"title": "B", "happened_at": 2000})
+        self.assertEqual(titles(), ["A"])
+        self.dal.create_event(EventMainData(title="C", happened_at=3000), owner="test")
+        self.assertEqual(titles(), ["A", "B", "C"])
+
+        # Collections are taken from the query plan by default
+        query = "FOR doc IN event FILTER doc.happened_at >= @since RETURN doc"
+        self.assertEqual(len(self.dal.query(query, bind_vars={"since": 2000}, cache=True)), 2)
+        ArangoDBClient().get_collection(EntityNameConstant.EVENT).insert({"title": "D", "happened_at": 4000})
+        self.assertEqual(len(self.dal.query(query, bind_vars={"since": 2000}, cache=True)), 2)
+        self.assertEqual(len(self.dal.query(query, bind_vars={"since": 2000})), 3)
+
     def test_search_entity_neighborhood(self):
         # Create Person
         p_data = PersonMainData(name="Alice", role="Analyst")
@@ -143,6 +321,79 @@ class TestQueryTools(unittest.TestCase):
         ids = [r.id for r in results]
         self.assertIn(p.id, ids)
 
+    def test_explore_entity_neighborhood(self):
+        hub = self.dal.create_event(EventMainData(title="Hub", happened_at=1000), owner="test")
+        persons = [self.dal.create_person(PersonMainData(name=f"P{i}"), owner="test") for i in range(2)]
+        sources = [self.dal.create_source(SourceMainData(name=f"S{i}"), owner="test") for i in range(5)]
+        org = self.dal.create_organization(OrganizationMainData(name="Org"), owner="test")
+        for entity in persons + sources:
+            self.dal.create_relation(RelationMainData(name="mentions", from_id=hub.id, to_id=entity.id), owner="test")
+        other = self.dal.create_event(EventMainData(title="Other", happened_at=2000), owner="test")
+        self.dal.create_relation(RelationMainData(name="follows", from_id=hub.id, to_id=other.id), owner="test")
+        self.dal.create_relation(RelationMainData(name="involves", from_id=other.id, to_id=org.id), owner="test")
+
+        page = explore_entity_neighborhood(hub.id, depth=2, fan_out=4, type_limits={"source": 1})
+        self.assertEqual(page.hops[persons[0].id], 1)
+        self.assertEqual(page.hops[persons[1].id], 1)
+        self.assertEqual(page.hops[org.id], 2)
+        self.assertEqual(len([v for v in page.vertices if v.id.startswith("source/")]), 1)
+        self.assertEqual(len(page.edges), len(page.vertices))
+        self.assertIsNotNone(page.continuation)
+
+        # Deterministic: the same request returns the same page
+        again = explore_entity_neighborhood(hub.id, depth=2, fan_out=4, type_limits={"source": 1})
+        self.assertEqual([v.id for v in again.vertices], [v.id for v in page.vertices])
+
+        seen = {v.id for v in page.vertices if v.id.startswith("source/")}
+        while page.continuation:
+            page = explore_entity_neighborhood(
+                hub.id, depth=2, fan_out=4, type_limits={"source": 1}, continuation=page.continuation
+            )
+            seen.update(v.id for v in page.vertices if v.id.startswith("source/"))
+        self.assertEqual(seen, {s.id for s in sources})
+
+        pruned = explore_entity_neighborhood(hub.id, depth=2, prune_types=["event"])
+        self.assertNotIn(org.id, pruned.hops)
+
+    def test_find_entity_paths(self):
+        alice = self.dal.create_person(PersonMainData(name="Alice"), owner="test")
+        bob = self.dal.create_person(PersonMainData(name="Bob"), owner="test")
+        shady = self.dal.create_organization(OrganizationMainData(name="Shady"), owner="test")
+        known = self.dal.create_organization(OrganizationMainData(name="Known"), owner="test")
+        event = self.dal.create_event(EventMainData(title="Incident", happened_at=1000), owner="test")
+        lonely = self.dal.create_person(PersonMainData(name="Lonely"), owner="test")
+
+        def relate(name, from_entity, to_entity, confidence):
+            data = RelationMainData(name=name, from_id=from_entity.id, to_id=to_entity.id, confidence=confidence)
+            self.dal.create_relation(data, owner="test")
+
+        # Alice - Shady - Event is short but unreliable, Alice - Bob - Known - Event is longer but confident
+        relate("member", alice, shady, 0)
+        relate("involves", event, shady, 0)
+        relate("knows", alice, bob, 100)
+        relate("member", bob, known, 100)
+        relate("involves", event, known, 100)
+
+        paths = find_entity_paths(alice.id, event.id)
+        self.assertEqual(len(paths), 1)
+        self.assertEqual([v.id for v in paths[0].vertices], [alice.id, shady.id, event.id])
+        self.assertEqual(len(paths[0].edges), 2)
+        self.assertEqual(paths[0].weight, 2)
+
+        paths = find_entity_paths(alice.id, event.id, k=3)
+        self.assertEqual([len(p.edges) for p in paths], [2, 3])
+
+        weighted = find_entity_paths(alice.id, event.id, k=2, weighted=True)
+        self.assertEqual([v.id for v in weighted[0].vertices], [alice.id, bob.id, known.id, event.id])
+        self.assertLess(weighted[0].weight, weighted[1].weight)
+        # Only the unreliable path fits in two relations, the search stops there instead of timing out
+        weighted = find_entity_paths(alice.id, event.id, k=2, max_depth=2, weighted=True)
+        self.assertEqual([v.id for v in weighted[0].vertices], [alice.id, shady.id, event.id])
+        self.assertEqual(len(weighted), 1)
+
+        self.assertEqual(find_entity_paths(alice.id, event.id, max_depth=1), [])
+        self.assertEqual(find_entity_paths(alice.id, lonely.id), [])
+
 
 if __name__ == "__main__":
     unittest.main()